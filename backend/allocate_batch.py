@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Offline batch allocation: reads student and position files (CSV or Parquet,
+the data/*.csv formats), allocates without the API server or the database and
+writes the results as CSV or Parquet.
+
+    python allocate_batch.py --students ../data/students_profiles_with_city.csv \
+        --companies ../data/company_positions.csv --output allocations.csv
+"""
+import argparse
+import json
+import logging
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.schemas import AllocationParams
+from services.batch import BATCH_CHUNK_ROWS, allocate_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocate students to positions straight from CSV/Parquet files")
+    parser.add_argument("--students", required=True, help="students file (.csv, .csv.gz or .parquet)")
+    parser.add_argument("--companies", required=True, help="positions file (.csv, .csv.gz or .parquet)")
+    parser.add_argument("--output", required=True, help="results file (.csv, .csv.gz or .parquet)")
+    parser.add_argument("--params", default="{}", help="POST /allocate body as JSON; top_k defaults to 50")
+    parser.add_argument("--model", default=os.getenv("AI_MODEL_NAME", "all-MiniLM-L6-v2"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="encoding and scoring processes")
+    parser.add_argument("--chunk-rows", type=int, default=BATCH_CHUNK_ROWS, help="students read and scored per chunk")
+    parser.add_argument("--include-unallocated", action="store_true", help="also write unallocated students")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    params = AllocationParams.model_validate_json(args.params)
+    summary = allocate_files(
+        args.students,
+        args.companies,
+        args.output,
+        params,
+        args.model,
+        workers=max(args.workers, 1),
+        chunk_rows=args.chunk_rows,
+        include_unallocated=args.include_unallocated,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,165 +1,418 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.orm import Session
-from typing import List
-import io
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import os
 import time
-import numpy as np
+import logging
 
-from core.database import get_db
-from core.models import Student, Company, Allocation
-from core.schemas import AllocationResult, AllocationResponse, NotAllocatedStudent
+from core.database import SessionLocal, get_db
+from core.models import Allocation, AllocationRun, Student, Company
+from core.schemas import (
+    AllocationParams, AllocationResult, AllocationResponse, Candidate, NotAllocatedStudent, ScenarioRequest,
+    ScenarioResponse, StudentCandidates,
+)
 from services.ai_engine import AIAllocationEngine
+from services.candidates import CANDIDATE_DIR, run_key
+from services.allocation import load_companies, load_students
+from services.cohorts import Cohort, CohortRegistry
+from services.loader import Records, column
+from services.persistence import (
+    bulk_insert_matches, copy_run, create_run, current_run_id, load_run_matches, prune_runs, publish_run, republish_run,
+    run_exists,
+)
+from services.http_cache import cached_response
+from services.metrics import collect_stages, current_breakdown, stage_breakdown, timed
+from services.progress import ProgressChannel, sse_event
+from services.scenarios import run_scenarios
+from services.sharding import allocate_sharded
+from services.snapshots import SNAPSHOT_DIR
+from services.versioning import ALLOCATIONS, dataset_version, version_stamps
+from api.cohorts import cohort_scope
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/allocate", tags=["allocations"])
 
-# Initialize AI engine
-ai_engine = AIAllocationEngine()
+# Initialize the AI engine shared by all cohorts, and per cohort an allocator that keeps the latest run
+# for incremental updates, a result cache keyed by (dataset version, parameters) and a lock serialising its runs.
+# With SNAPSHOT_DIR set, embeddings and the index are shared with the other workers through memory-mapped snapshots.
+ai_engine = AIAllocationEngine(os.getenv("AI_MODEL_NAME", "all-MiniLM-L6-v2"))
+cohorts = CohortRegistry(ai_engine, SNAPSHOT_DIR or None, CANDIDATE_DIR or None)
+
+# Progress of the runs in flight by cache key, for GET /allocate/stream clients to attach to
+progress_channels: Dict[Tuple, ProgressChannel] = {}
+
+# Idle seconds between keep-alive comments on progress streams
+SSE_HEARTBEAT_SECONDS = 15.0
+
+results_adapter = TypeAdapter(List[AllocationResult])
 
 @router.post("/", response_model=AllocationResponse)
-async def run_allocation(db: Session = Depends(get_db)):
-    """Run AI allocation with cosine similarity and greedy one-student-per-opening assignment."""
+async def run_allocation(
+    background_tasks: BackgroundTasks,
+    params: Optional[AllocationParams] = None,
+    cohort_id: str = Depends(cohort_scope),
+    db: Session = Depends(get_db),
+    stages: Optional[Dict[str, float]] = Depends(stage_breakdown),
+):
+    """Run AI allocation with cosine similarity and one-student-per-opening assignment.
+
+    `algorithm` selects best-score-first greedy assignment (default) or
+    stable matching via student-proposing deferred acceptance.
+
+    With `incremental` set, a small change since the previous run (a few
+    students or positions added or removed) is repaired in place instead of
+    re-allocating everyone. Results are written as a new allocation run and
+    published atomically; readers keep seeing the previous run until then.
+
+    Results are memoized per (dataset version, parameters): repeating a
+    request without data changes re-publishes the cached run, and identical
+    concurrent requests share a single computation. With
+    `?include_stages=true` the response carries seconds spent per stage.
+    Each cohort only reads and writes its own rows, and runs of different
+    cohorts proceed in parallel.
+    """
     start_time = time.time()
+    params = params or AllocationParams()
+    key = (cohort_id, dataset_version(db, cohort_id), params.model_dump_json())
+    response = await _allocate_cached(cohorts.get(cohort_id), key, params, db)
+    background_tasks.add_task(prune_runs, cohort_id)
 
-    # Load data from DB
-    students = db.query(Student).all()
-    companies = db.query(Company).all()
+    return response.model_copy(update={"processing_time": time.time() - start_time, "stages": stages})
 
-    if not students:
-        raise HTTPException(status_code=400, detail="No students found. Please upload student data first.")
-    if not companies:
-        raise HTTPException(status_code=400, detail="No companies found. Please upload company data first.")
+@router.get("/stream")
+async def stream_allocation(
+    params: Optional[str] = Query(None, description="AllocationParams as JSON, as in the POST /allocate body"),
+    cohort_id: str = Depends(cohort_scope),
+    db: Session = Depends(get_db),
+):
+    """Run an allocation, or attach to an identical one in flight, streaming progress as Server-Sent Events.
 
-    # Prepare dicts for AI encoder
-    students_data = []
-    for s in students:
-        students_data.append({
-            "student_id": s.student_id,
-            "first_name": s.first_name,
-            "last_name": s.last_name,
-            "skills_text": s.skills_text,
-            "degree": s.degree,
-            "stream": s.stream,
-            "city": s.city,
-            "state": s.state,
-            "preferred_locations": s.preferred_locations,
-            "other_notes": s.other_notes,
-        })
+    `stage` events carry the stage, its phase (loading, encoding,
+    index_build, scoring, assignment, persisting), started/progress/finished
+    status, seconds since the run began and, when finished, the stage
+    duration; progress events add batch counts or the fill percentage. A
+    final `result` (or `error`) event summarises the run. The run continues
+    and is published even if the client disconnects.
+    """
+    try:
+        params = AllocationParams.model_validate_json(params) if params else AllocationParams()
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    key = (cohort_id, dataset_version(db, cohort_id), params.model_dump_json())
+    attached = key in progress_channels
+
+    task = asyncio.create_task(_allocate_detached(cohorts.get(cohort_id), key, params))
+    # Let the task start the run (or join the one in flight) so its progress channel exists
+    await asyncio.sleep(0)
+    channel = progress_channels.get(key)
 
-    companies_data = []
-    company_capacity = {}
-    for c in companies:
-        companies_data.append({
-            "company_id": c.company_id,
-            "company_name": c.company_name,
-            "position_title": c.position_title,
-            "req_skills_text": c.req_skills_text,
-            "job_description": c.job_description,
-            "location_city": c.location_city,
-            "location_state": c.location_state,
-            "priority_flags": c.priority_flags,
-            "other_notes": c.other_notes,
+    async def events():
+        yield sse_event("started", {"attached": attached, "cached": channel is None, "params": params.model_dump()})
+        if channel is not None:
+            async for event in channel.subscribe(heartbeat=SSE_HEARTBEAT_SECONDS):
+                # Comments keep proxies from timing out idle connections during long stages
+                yield ": keep-alive\n\n" if event is None else sse_event("stage", event)
+        try:
+            response = await asyncio.shield(task)
+        except HTTPException as e:
+            yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+            return
+        except Exception as e:
+            yield sse_event("error", {"status_code": 500, "detail": str(e)})
+            return
+        yield sse_event("result", {
+            "allocated_count": len(response.allocations),
+            "unallocated_count": response.unallocated_count,
+            "total_students": response.total_students,
+            "total_companies": response.total_companies,
+            "processing_time": response.processing_time,
+            "stages": dict(channel) if channel is not None else {},
         })
-        company_capacity[c.company_id] = max(int(c.openings or 1), 1)
-
-    # Build FAISS index on company embeddings and compute full score matrix
-    ai_engine.build_company_index(companies_data)
-    # Build student texts and embeddings
-    student_texts = [ai_engine.build_text_representation(s, "student") for s in students_data]
-    student_embeddings = ai_engine.encode_texts(student_texts)
-    company_embeddings = ai_engine.company_embeddings
-
-    # Compute cosine similarity scores for all pairs
-    scores_matrix = np.matmul(student_embeddings.astype('float32'), company_embeddings.astype('float32').T)
-
-    # Build candidate list of all pairs
-    candidates = []
-    company_ids = [c["company_id"] for c in companies_data]
-    company_name_by_id = {c["company_id"]: c["company_name"] for c in companies_data}
-    for i, s in enumerate(students_data):
-        for j, cid in enumerate(company_ids):
-            candidates.append({
-                "student_id": s["student_id"],
-                "student_name": f"{s['first_name']} {s['last_name']}",
-                "company_id": cid,
-                "score": float(scores_matrix[i, j]),
-            })
-
-    # Greedy assignment over all pairs
-    candidates.sort(key=lambda x: x["score"], reverse=True)
-    assigned_students = set()
-    remaining_capacity = dict(company_capacity)
-    final_matches: List[AllocationResult] = []
-
-    for cand in candidates:
-        if sum(remaining_capacity.values()) <= 0:
-            break
-        sid = cand["student_id"]
-        cid = cand["company_id"]
-        if sid in assigned_students:
-            continue
-        if remaining_capacity.get(cid, 0) <= 0:
-            continue
-        assigned_students.add(sid)
-        remaining_capacity[cid] = remaining_capacity.get(cid, 0) - 1
-        final_matches.append(AllocationResult(
-            student_id=sid,
-            student_name=cand["student_name"],
-            company_id=cid,
-            company_name=company_name_by_id.get(cid, ""),
-            score=float(cand["score"]),
-        ))
-
-    # Compute unallocated students (those not in assigned_students)
-    assigned_set = assigned_students
-    unallocated: List[NotAllocatedStudent] = []
-    for s in students:
-        if s.student_id not in assigned_set:
-            unallocated.append(NotAllocatedStudent(student_id=s.student_id, student_name=f"{s.first_name} {s.last_name}"))
-
-    # Persist results
-    db.query(Allocation).delete()
-    for m in final_matches:
-        db.add(Allocation(student_id=m.student_id, company_id=m.company_id, score=m.score))
-    db.commit()
-
-    processing_time = time.time() - start_time
-    return AllocationResponse(
-        allocations=final_matches,
-        unallocated_students=unallocated,
-        unallocated_count=len(unallocated),
-        total_students=len(students),
-        total_companies=len(companies),
-        processing_time=processing_time,
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _allocate_cached(cohort: Cohort, key: Tuple, params: AllocationParams, db: Session) -> AllocationResponse:
+    """Memoized allocation for (cohort, dataset version, parameters), published as the cohort's current run"""
+    compute = lambda: _compute_with_progress(cohort, key, params, db)
+    response, run_id = await cohort.cache.get_or_compute(key, compute)
+    if current_run_id(db, cohort.cohort_id) != run_id and not republish_run(db, run_id):
+        # The cached run was pruned in the meantime; compute it again
+        cohort.cache.discard(key)
+        response, run_id = await cohort.cache.get_or_compute(key, compute)
+    return response
+
+async def _compute_with_progress(
+    cohort: Cohort, key: Tuple, params: AllocationParams, db: Session
+) -> Tuple[AllocationResponse, int]:
+    """Compute a run in the threadpool, publishing its stages on a channel that stream clients can attach to"""
+    channel = ProgressChannel(asyncio.get_running_loop(), parent=current_breakdown())
+    progress_channels[key] = channel
+    try:
+        with collect_stages(channel):
+            return await run_in_threadpool(_allocate_and_publish, cohort, params, db)
+    finally:
+        channel.close()
+        progress_channels.pop(key, None)
+
+async def _allocate_detached(cohort: Cohort, key: Tuple, params: AllocationParams) -> AllocationResponse:
+    """Allocation for a stream client on its own session, so it outlives a disconnected client"""
+    db = SessionLocal()
+    try:
+        response = await _allocate_cached(cohort, key, params, db)
+    finally:
+        db.close()
+    await run_in_threadpool(prune_runs, cohort.cohort_id)
+    return response
+
+def _allocate_and_publish(cohort: Cohort, params: AllocationParams, db: Session) -> Tuple[AllocationResponse, int]:
+    """Blocking part of POST /allocate, run in the threadpool: allocate, then persist and publish a new run"""
+    allocator = cohort.allocator
+    with cohort.lock:
+        start_time = time.time()
+        changed_ids = None
+        if params.incremental and allocator.can_reallocate(params):
+            with timed("incremental_repair"):
+                changed_ids = _run_incremental(cohort, db)
+
+        if changed_ids is None:
+            # Load the cohort's data from DB
+            with timed("db_load"):
+                students_data = load_students(db, cohort_id=cohort.cohort_id)
+                companies_data = load_companies(db, cohort_id=cohort.cohort_id)
+
+            if not students_data:
+                raise HTTPException(status_code=400, detail="No students found. Please upload student data first.")
+            if not companies_data:
+                raise HTTPException(status_code=400, detail="No companies found. Please upload company data first.")
+            try:
+                if params.sharded:
+                    state = allocate_sharded(allocator, students_data, companies_data, params)
+                else:
+                    state = allocator.allocate(students_data, companies_data, params)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            # Persist results as a new run, invisible to readers until published
+            run = create_run(db, params.model_dump(), cohort.cohort_id)
+            bulk_insert_matches(db, run, ((s["student_id"], c["company_id"], score) for s, c, score in state.matches()))
+        else:
+            # Carry over the unchanged rows of the current run and write only the changed students
+            state = allocator.state
+            base_run_id = state.run_id if run_exists(db, state.run_id) else None
+            run = create_run(db, params.model_dump(), cohort.cohort_id)
+            if base_run_id is not None:
+                copy_run(db, base_run_id, run, changed_ids)
+                matches = []
+                for sid in changed_ids:
+                    row = state.student_row.get(sid)
+                    if row is not None and state.assignment[row] >= 0:
+                        company = state.companies[state.assignment[row]]
+                        matches.append((sid, company["company_id"], float(state.scores[row])))
+            else:
+                matches = [(s["student_id"], c["company_id"], score) for s, c, score in state.matches()]
+            bulk_insert_matches(db, run, matches)
+
+        final_matches: List[AllocationResult] = [
+            AllocationResult(
+                student_id=s["student_id"],
+                student_name=f"{s['first_name']} {s['last_name']}",
+                company_id=c["company_id"],
+                company_name=c["company_name"],
+                score=score,
+            )
+            for s, c, score in state.matches()
+        ]
+        unallocated: List[NotAllocatedStudent] = [
+            NotAllocatedStudent(student_id=s["student_id"], student_name=f"{s['first_name']} {s['last_name']}")
+            for s in state.unallocated()
+        ]
+
+        unfillable = [c["company_id"] for c in state.unfillable()]
+        if unfillable:
+            logger.warning(
+                f"{len(unfillable)} positions of cohort {cohort.cohort_id} have CGPA/experience minimums no student meets"
+            )
+
+        if cohort.candidates is not None and state.candidates is not None:
+            cohort.candidates.write(run_key(run.run_id, run.created_at), *state.candidate_table())
+
+        processing_time = time.time() - start_time
+        publish_run(
+            db,
+            run,
+            total_students=state.total_students,
+            total_companies=state.total_companies,
+            allocated_count=len(final_matches),
+            processing_time=processing_time,
+        )
+        state.run_id = run.run_id
+
+        return AllocationResponse(
+            allocations=final_matches,
+            unallocated_students=unallocated,
+            unallocated_count=len(unallocated),
+            total_students=state.total_students,
+            total_companies=state.total_companies,
+            processing_time=processing_time,
+            rescoring=state.rescoring,
+            unfillable_company_ids=unfillable,
+        ), run.run_id
+
+def _run_incremental(cohort: Cohort, db: Session) -> Optional[List[int]]:
+    """Repair the cohort's retained allocation from the rows added or removed since; None if a full run is needed"""
+    allocator = cohort.allocator
+    student_ids = [sid for (sid,) in db.query(Student.student_id).filter(Student.cohort_id == cohort.cohort_id)]
+    company_ids = [cid for (cid,) in db.query(Company.company_id).filter(Company.cohort_id == cohort.cohort_id)]
+    if not student_ids or not company_ids:
+        return None
+    added_students, removed_students, added_companies, removed_companies = allocator.diff(student_ids, company_ids)
+    if not allocator.is_small_change(
+        len(added_students) + len(removed_students), len(added_companies) + len(removed_companies)
+    ):
+        return None
+
+    new_students = (
+        load_students(db, Student.student_id.in_(added_students), cohort_id=cohort.cohort_id) if added_students else []
+    )
+    new_companies = (
+        load_companies(db, Company.company_id.in_(added_companies), cohort_id=cohort.cohort_id) if added_companies else []
+    )
+    changed = allocator.reallocate(new_students, removed_students, new_companies, removed_companies)
+    return changed + removed_students
+
+@router.post("/scenarios", response_model=ScenarioResponse)
+async def compare_scenarios(
+    request: ScenarioRequest,
+    cohort_id: str = Depends(cohort_scope),
+    db: Session = Depends(get_db),
+    stages: Optional[Dict[str, float]] = Depends(stage_breakdown),
+):
+    """Compare allocation outcomes under several parameter sets; the published allocation is not touched"""
+    start_time = time.time()
+    with timed("db_load"):
+        students_data = load_students(db, cohort_id=cohort_id)
+        companies_data = load_companies(db, cohort_id=cohort_id)
+    if not students_data:
+        raise HTTPException(status_code=400, detail="No students found. Please upload student data first.")
+    if not companies_data:
+        raise HTTPException(status_code=400, detail="No companies found. Please upload company data first.")
+    try:
+        results = await run_in_threadpool(
+            run_scenarios, cohorts.get(cohort_id).allocator, students_data, companies_data, request.scenarios, request.workers
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ScenarioResponse(
+        scenarios=results,
+        total_students=len(students_data),
+        total_companies=len(companies_data),
+        processing_time=time.time() - start_time,
+        stages=stages,
     )
 
 @router.get("/", response_model=List[AllocationResult])
-async def get_allocations(db: Session = Depends(get_db)):
-    """Return all allocation results (no pagination)."""
-    rows = db.query(Allocation).join(Student).join(Company).all()
-    results: List[AllocationResult] = []
-    for a in rows:
-        results.append(AllocationResult(
-            student_id=a.student_id,
-            student_name=f"{a.student.first_name} {a.student.last_name}",
-            company_id=a.company_id,
-            company_name=a.company.company_name,
-            score=a.score,
-        ))
-    return results
+async def get_allocations(request: Request, cohort_id: str = Depends(cohort_scope), db: Session = Depends(get_db)):
+    """Return all allocation results of the cohort's current run (no pagination).
+
+    Supports conditional GET against the cohort's allocations version, which
+    changes whenever a run is published.
+    """
+    def render() -> bytes:
+        rows = load_run_matches(db, current_run_id(db, cohort_id), cohort_id)
+        return results_adapter.dump_json([
+            AllocationResult(
+                student_id=student_id,
+                student_name=f"{first_name} {last_name}",
+                company_id=company_id,
+                company_name=company_name,
+                score=score,
+            )
+            for student_id, first_name, last_name, company_id, company_name, score in _match_rows(rows)
+        ])
+
+    stamp = version_stamps.get(db, cohort_id, ALLOCATIONS)
+    return cached_response(request, ALLOCATIONS, ("allocations", cohort_id), stamp, render)
+
+@router.get("/students/{student_id}/candidates", response_model=StudentCandidates)
+async def get_student_candidates(
+    student_id: int,
+    run_id: Optional[int] = None,
+    cohort_id: str = Depends(cohort_scope),
+    db: Session = Depends(get_db),
+):
+    """A student's best-scoring candidate positions in the current (or a given) run, and the one assigned.
+
+    Candidates are read from the run's persisted candidate table in O(1),
+    without recomputing or re-encoding anything.
+    """
+    store = cohorts.get(cohort_id).candidates
+    if run_id is None:
+        run_id = current_run_id(db, cohort_id)
+    created_at = db.query(AllocationRun.created_at).filter(
+        AllocationRun.cohort_id == cohort_id, AllocationRun.run_id == run_id
+    ).scalar() if run_id is not None else None
+    table = store.table(run_key(run_id, created_at)) if store is not None and created_at is not None else None
+    if table is None:
+        raise HTTPException(status_code=404, detail="No candidate table stored for this allocation run")
+    candidates = table.get(student_id)
+    if candidates is None:
+        raise HTTPException(status_code=404, detail="Student not found in this allocation run")
+
+    assigned = db.query(Allocation.company_id, Allocation.score).filter(
+        Allocation.cohort_id == cohort_id, Allocation.run_id == run_id, Allocation.student_id == student_id
+    ).first()
+    assigned_company_id, assigned_score = assigned if assigned is not None else (None, None)
+    names = dict(
+        db.query(Company.company_id, Company.company_name).filter(
+            Company.company_id.in_([company_id for company_id, _ in candidates])
+        )
+    )
+    return StudentCandidates(
+        student_id=student_id,
+        run_id=run_id,
+        assigned_company_id=assigned_company_id,
+        assigned_score=assigned_score,
+        candidates=[
+            Candidate(
+                company_id=company_id,
+                company_name=names.get(company_id),
+                score=score,
+                assigned=company_id == assigned_company_id,
+            )
+            for company_id, score in candidates
+        ],
+    )
 
 @router.get("/export")
-async def export_allocations(db: Session = Depends(get_db)):
-    """Export allocations as CSV"""
-    allocations = db.query(Allocation).join(Student).join(Company).all()
-    
-    # Create CSV content
-    csv_content = "student_id,student_name,company_id,company_name,score\n"
-    for allocation in allocations:
-        csv_content += f"{allocation.student_id},{allocation.student.first_name} {allocation.student.last_name},{allocation.company_id},{allocation.company.company_name},{allocation.score}\n"
-    
-    return StreamingResponse(
-        io.StringIO(csv_content),
+async def export_allocations(request: Request, cohort_id: str = Depends(cohort_scope), db: Session = Depends(get_db)):
+    """Export allocations of the cohort's current run as CSV, with the same validators as GET /allocate"""
+    def render() -> bytes:
+        rows = load_run_matches(db, current_run_id(db, cohort_id), cohort_id)
+
+        # Create CSV content
+        lines = ["student_id,student_name,company_id,company_name,score\n"]
+        for student_id, first_name, last_name, company_id, company_name, score in _match_rows(rows):
+            lines.append(f"{student_id},{first_name} {last_name},{company_id},{company_name},{score}\n")
+        return "".join(lines).encode()
+
+    stamp = version_stamps.get(db, cohort_id, ALLOCATIONS)
+    return cached_response(
+        request, ALLOCATIONS, ("allocations.csv", cohort_id), stamp, render,
         media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=allocations.csv"}
+        headers={"Content-Disposition": "attachment; filename=allocations.csv"},
     )
+
+def _match_rows(rows: Records):
+    """(student_id, first_name, last_name, company_id, company_name, score) tuples from the stored columns"""
+    return zip(*(column(rows, name) for name in rows.columns))
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List
+
+from core.database import get_db
+from core.models import DEFAULT_COHORT, AllocationRun, Company, Student
+from core.schemas import CohortSummary
+from services.cohorts import valid_cohort_id
+
+router = APIRouter(prefix="/cohorts", tags=["cohorts"])
+
+def cohort_scope(cohort_id: str = DEFAULT_COHORT) -> str:
+    """Dependency: the request's cohort, from the /cohorts/{cohort_id} prefix; the default cohort elsewhere"""
+    if not valid_cohort_id(cohort_id):
+        raise HTTPException(
+            status_code=400,
+            detail="Cohort ids are 1-64 letters, digits, '.', '_' or '-', starting with a letter or digit",
+        )
+    return cohort_id
+
+@router.get("/", response_model=List[CohortSummary])
+async def get_cohorts(db: Session = Depends(get_db)):
+    """Cohorts with data, their student and company counts and current allocation run"""
+    students = dict(db.query(Student.cohort_id, func.count()).group_by(Student.cohort_id))
+    companies = dict(db.query(Company.cohort_id, func.count()).group_by(Company.cohort_id))
+    runs = {
+        cohort_id: (run_id, allocated_count)
+        for cohort_id, run_id, allocated_count in db.query(
+            AllocationRun.cohort_id, AllocationRun.run_id, AllocationRun.allocated_count
+        ).filter(AllocationRun.status == "current")
+    }
+    return [
+        CohortSummary(
+            cohort_id=cohort_id,
+            students=students.get(cohort_id, 0),
+            companies=companies.get(cohort_id, 0),
+            current_run_id=runs.get(cohort_id, (None, None))[0],
+            allocated_count=runs.get(cohort_id, (None, None))[1],
+        )
+        for cohort_id in sorted(set(students) | set(companies) | set(runs))
+    ]
@@ -1,32 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 
 from core.database import get_db
 from core.models import Company
-from core.schemas import CompanyCreate, Company as CompanySchema
+from core.schemas import CompanyCreate, Company as CompanySchema, CompanySearchPage
+from services.http_cache import cached_response
+from services.search import COMPANY_SEARCH, index_skills, query_skills, search_indexes
+from services.versioning import bump_version, version_stamps, COMPANIES, COMPANIES_REPLACED
+from api.cohorts import cohort_scope
 
 router = APIRouter(prefix="/companies", tags=["companies"])
 
+companies_adapter = TypeAdapter(List[CompanySchema])
+
 @router.post("/", response_model=CompanySchema)
-async def create_company(company: CompanyCreate, db: Session = Depends(get_db)):
-    """Create a new company record"""
-    db_company = Company(**company.dict())
+async def create_company(
+    company: CompanyCreate, cohort_id: str = Depends(cohort_scope), db: Session = Depends(get_db)
+):
+    """Create a new company record in the cohort"""
+    # Taking the version row lock first keeps ids committed in increasing order, which search indexes rely on
+    bump_version(db, COMPANIES, cohort_id=cohort_id)
+    db_company = Company(**company.dict(), cohort_id=cohort_id)
     db.add(db_company)
+    db.flush()
+    index_skills(db, COMPANY_SEARCH, cohort_id, [(db_company.company_id, db_company.req_skills_text)])
     db.commit()
     db.refresh(db_company)
     return db_company
 
 @router.get("/", response_model=List[CompanySchema])
-async def get_companies(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all companies"""
-    companies = db.query(Company).offset(skip).limit(limit).all()
-    return companies
+async def get_companies(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    cohort_id: str = Depends(cohort_scope),
+    db: Session = Depends(get_db),
+):
+    """Get all companies of the cohort.
+
+    Supports conditional GET: the ETag and Last-Modified follow the cohort's
+    companies version, and an unchanged poll answers 304 without a query.
+    """
+    def render() -> bytes:
+        companies = (
+            db.query(Company).filter(Company.cohort_id == cohort_id)
+            .order_by(Company.company_id).offset(skip).limit(limit).all()
+        )
+        return companies_adapter.dump_json(companies_adapter.validate_python(companies, from_attributes=True))
+
+    stamp = version_stamps.get(db, cohort_id, COMPANIES)
+    return cached_response(request, COMPANIES, ("companies", cohort_id, skip, limit), stamp, render)
+
+@router.get("/search", response_model=CompanySearchPage)
+async def search_companies(
+    skills: Optional[str] = None,
+    match: Literal["all", "any"] = "all",
+    state: Optional[str] = None,
+    after: Optional[int] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    cohort_id: str = Depends(cohort_scope),
+    db: Session = Depends(get_db),
+):
+    """Positions of the cohort by required skills and location state, in id order with keyset pagination.
+
+    `skills` is a comma-separated list matched as normalised skill names,
+    all of them (`match=all`) or any (`match=any`). Answered from an
+    in-memory posting-list index of the cohort, extended with appended rows
+    and rebuilt after an upload replaces them.
+    """
+    stamp = version_stamps.get(db, cohort_id, COMPANIES)
+    generation = version_stamps.get(db, cohort_id, COMPANIES_REPLACED)
+    index = await run_in_threadpool(search_indexes.get, db, COMPANY_SEARCH, cohort_id, stamp, generation)
+    ids, next_after, total = index.search(query_skills(skills), match, {"state": state}, after, limit)
+    rows = db.query(Company).filter(Company.cohort_id == cohort_id, Company.company_id.in_(ids)).order_by(Company.company_id).all() if ids else []
+    return CompanySearchPage(items=rows, next_after=next_after, total=total)
 
 @router.get("/{company_id}", response_model=CompanySchema)
-async def get_company(company_id: int, db: Session = Depends(get_db)):
-    """Get a specific company by ID"""
-    company = db.query(Company).filter(Company.company_id == company_id).first()
+async def get_company(company_id: int, cohort_id: str = Depends(cohort_scope), db: Session = Depends(get_db)):
+    """Get a specific company of the cohort by ID"""
+    company = db.query(Company).filter(Company.cohort_id == cohort_id, Company.company_id == company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     return company
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from typing import List
+import os
+
+from core.schemas import ProfileInfo
+from services.profiling import PROFILE_DIR, list_profiles
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+@router.get("/profiles", response_model=List[ProfileInfo])
+async def get_profiles():
+    """List stored request profiles, newest first"""
+    return list_profiles(PROFILE_DIR)
+
+@router.get("/profiles/{name}")
+async def get_profile(name: str):
+    """Download one profile as folded stacks (flamegraph.pl, inferno or speedscope input)"""
+    if name not in {profile["name"] for profile in list_profiles(PROFILE_DIR)}:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(os.path.join(PROFILE_DIR, name), media_type="text/plain", filename=name)
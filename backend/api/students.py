@@ -1,32 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 
 from core.database import get_db
 from core.models import Student
-from core.schemas import StudentCreate, Student as StudentSchema
+from core.schemas import StudentCreate, Student as StudentSchema, StudentSearchPage
+from services.http_cache import cached_response
+from services.search import STUDENT_SEARCH, index_skills, query_skills, search_indexes
+from services.versioning import bump_version, version_stamps, STUDENTS, STUDENTS_REPLACED
+from api.cohorts import cohort_scope
 
 router = APIRouter(prefix="/students", tags=["students"])
 
+students_adapter = TypeAdapter(List[StudentSchema])
+
 @router.post("/", response_model=StudentSchema)
-async def create_student(student: StudentCreate, db: Session = Depends(get_db)):
-    """Create a new student record"""
-    db_student = Student(**student.dict())
+async def create_student(
+    student: StudentCreate, cohort_id: str = Depends(cohort_scope), db: Session = Depends(get_db)
+):
+    """Create a new student record in the cohort"""
+    # Taking the version row lock first keeps ids committed in increasing order, which search indexes rely on
+    bump_version(db, STUDENTS, cohort_id=cohort_id)
+    db_student = Student(**student.dict(), cohort_id=cohort_id)
     db.add(db_student)
+    db.flush()
+    index_skills(db, STUDENT_SEARCH, cohort_id, [(db_student.student_id, db_student.skills_text)])
     db.commit()
     db.refresh(db_student)
     return db_student
 
 @router.get("/", response_model=List[StudentSchema])
-async def get_students(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all students"""
-    students = db.query(Student).offset(skip).limit(limit).all()
-    return students
+async def get_students(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    cohort_id: str = Depends(cohort_scope),
+    db: Session = Depends(get_db),
+):
+    """Get all students of the cohort.
+
+    Supports conditional GET: the ETag and Last-Modified follow the cohort's
+    students version, and an unchanged poll answers 304 without a query.
+    """
+    def render() -> bytes:
+        students = (
+            db.query(Student).filter(Student.cohort_id == cohort_id)
+            .order_by(Student.student_id).offset(skip).limit(limit).all()
+        )
+        return students_adapter.dump_json(students_adapter.validate_python(students, from_attributes=True))
+
+    stamp = version_stamps.get(db, cohort_id, STUDENTS)
+    return cached_response(request, STUDENTS, ("students", cohort_id, skip, limit), stamp, render)
+
+@router.get("/search", response_model=StudentSearchPage)
+async def search_students(
+    skills: Optional[str] = None,
+    match: Literal["all", "any"] = "all",
+    state: Optional[str] = None,
+    branch: Optional[str] = None,
+    after: Optional[int] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    cohort_id: str = Depends(cohort_scope),
+    db: Session = Depends(get_db),
+):
+    """Students of the cohort by skills, state and branch, in id order with keyset pagination.
+
+    `skills` is a comma-separated list matched as normalised skill names,
+    all of them (`match=all`) or any (`match=any`). Answered from an
+    in-memory posting-list index of the cohort, extended with appended rows
+    and rebuilt after an upload replaces them.
+    """
+    stamp = version_stamps.get(db, cohort_id, STUDENTS)
+    generation = version_stamps.get(db, cohort_id, STUDENTS_REPLACED)
+    index = await run_in_threadpool(search_indexes.get, db, STUDENT_SEARCH, cohort_id, stamp, generation)
+    ids, next_after, total = index.search(query_skills(skills), match, {"state": state, "branch": branch}, after, limit)
+    rows = db.query(Student).filter(Student.cohort_id == cohort_id, Student.student_id.in_(ids)).order_by(Student.student_id).all() if ids else []
+    return StudentSearchPage(items=rows, next_after=next_after, total=total)
 
 @router.get("/{student_id}", response_model=StudentSchema)
-async def get_student(student_id: int, db: Session = Depends(get_db)):
-    """Get a specific student by ID"""
-    student = db.query(Student).filter(Student.student_id == student_id).first()
+async def get_student(student_id: int, cohort_id: str = Depends(cohort_scope), db: Session = Depends(get_db)):
+    """Get a specific student of the cohort by ID"""
+    student = db.query(Student).filter(Student.cohort_id == cohort_id, Student.student_id == student_id).first()
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     return student
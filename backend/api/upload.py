@@ -1,24 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
-import pandas as pd
 import io
+from typing import Dict, Optional
 
 from core.database import get_db
-from core.models import Student, Company, Allocation
+from core.models import Student, Company, Allocation, AllocationRun, StudentSkill, CompanySkill
 from core.schemas import CSVUploadResponse
+from services.ingest import company_from_row, student_from_row
+from services.metrics import stage_breakdown, timed
+from services.search import COMPANY_SEARCH, STUDENT_SEARCH, index_skills
+from services.versioning import bump_version, STUDENTS, STUDENTS_REPLACED, COMPANIES, COMPANIES_REPLACED, ALLOCATIONS
+from api.allocations import cohorts
+from api.cohorts import cohort_scope
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
 @router.post("/students", response_model=CSVUploadResponse)
-async def upload_students_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Upload students CSV file"""
+async def upload_students_csv(
+    file: UploadFile = File(...),
+    cohort_id: str = Depends(cohort_scope),
+    db: Session = Depends(get_db),
+    stages: Optional[Dict[str, float]] = Depends(stage_breakdown),
+):
+    """Upload students CSV file, replacing the cohort's students"""
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
+    # pandas is only imported once a CSV is actually uploaded
+    import pandas as pd
+
     try:
         # Read CSV content
         content = await file.read()
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')))
+        with timed("csv_parse", len(content)):
+            df = pd.read_csv(io.StringIO(content.decode('utf-8')))
         
         # Validate required columns - check for either new format or old format
         required_columns_old = ['first_name', 'last_name']
@@ -38,14 +53,24 @@ async def upload_students_csv(file: UploadFile = File(...), db: Session = Depend
                 detail=f"Missing required columns: {missing_columns}. Available columns: {list(df.columns)}"
             )
         
-        # Reset students and dependent allocations only
-        db.query(Allocation).delete()
-        db.query(Student).delete()
+        # Reset the cohort's students and dependent allocations only; other cohorts are untouched
+        db.query(Allocation).filter(Allocation.cohort_id == cohort_id).delete(synchronize_session=False)
+        db.query(AllocationRun).filter(AllocationRun.cohort_id == cohort_id).delete(synchronize_session=False)
+        db.query(StudentSkill).filter(StudentSkill.cohort_id == cohort_id).delete(synchronize_session=False)
+        db.query(Student).filter(Student.cohort_id == cohort_id).delete(synchronize_session=False)
+        bump_version(db, STUDENTS, STUDENTS_REPLACED, ALLOCATIONS, cohort_id=cohort_id)
         db.commit()
+        cohort = cohorts.get(cohort_id)
+        cohort.allocator.reset()
+        if cohort.candidates is not None:
+            cohort.candidates.clear()
 
         accepted = 0
         rejected = 0
         errors = []
+        added = []
+        # Version row lock before the inserts, so their ids commit in increasing order
+        bump_version(db, STUDENTS, cohort_id=cohort_id)
         
         # Process each row
         for index, row in df.iterrows():
@@ -60,62 +85,53 @@ async def upload_students_csv(file: UploadFile = File(...), db: Session = Depend
                         student_data[col] = str(value)
                 
                 # Map CSV columns to database columns
-                mapped_data = {}
-                
-                # Handle name field
-                if 'name' in student_data and student_data['name']:
-                    # Split name into first and last name
-                    name_parts = student_data['name'].split(' ', 1)
-                    mapped_data['first_name'] = name_parts[0]
-                    mapped_data['last_name'] = name_parts[1] if len(name_parts) > 1 else ''
-                else:
-                    mapped_data['first_name'] = student_data.get('first_name', '')
-                    mapped_data['last_name'] = student_data.get('last_name', '')
-                
-                # Map other fields
-                mapped_data['skills_text'] = student_data.get('skills', '')
-                mapped_data['degree'] = student_data.get('branch', '')
-                mapped_data['stream'] = student_data.get('branch', '')
-                mapped_data['city'] = student_data.get('district', '')
-                mapped_data['state'] = student_data.get('state', '')
-                mapped_data['pincode'] = None
-                mapped_data['caste'] = student_data.get('caste_category', '')
-                mapped_data['gender'] = student_data.get('gender', '')
-                mapped_data['financial_status'] = 'Low' if student_data.get('family_income') and float(student_data.get('family_income', 0)) < 50000 else 'Medium'
-                mapped_data['preferred_locations'] = student_data.get('City', '')
-                mapped_data['other_notes'] = f"CGPA: {student_data.get('cgpa', '')}, Internships: {student_data.get('internships_count', '')}, Projects: {student_data.get('projects_count', '')}, Certifications: {student_data.get('certifications', '')}"
+                mapped_data = student_from_row(student_data)
                 
                 # Create student record
-                db_student = Student(**mapped_data)
+                db_student = Student(**mapped_data, cohort_id=cohort_id)
                 db.add(db_student)
+                added.append(db_student)
                 accepted += 1
                 
             except Exception as e:
                 rejected += 1
                 errors.append(f"Row {index + 2}: {str(e)}")
         
-        db.commit()
+        with timed("upload_insert", accepted):
+            db.flush()
+            index_skills(db, STUDENT_SEARCH, cohort_id, [(db_student.student_id, db_student.skills_text) for db_student in added])
+            db.commit()
         
         return CSVUploadResponse(
             message=f"Successfully processed {accepted} students",
             accepted=accepted,
             rejected=rejected,
-            errors=errors
+            errors=errors,
+            stages=stages
         )
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing CSV: {str(e)}")
 
 @router.post("/companies", response_model=CSVUploadResponse)
-async def upload_companies_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Upload companies CSV file"""
+async def upload_companies_csv(
+    file: UploadFile = File(...),
+    cohort_id: str = Depends(cohort_scope),
+    db: Session = Depends(get_db),
+    stages: Optional[Dict[str, float]] = Depends(stage_breakdown),
+):
+    """Upload companies CSV file, replacing the cohort's companies"""
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
+    # pandas is only imported once a CSV is actually uploaded
+    import pandas as pd
+
     try:
         # Read CSV content
         content = await file.read()
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')))
+        with timed("csv_parse", len(content)):
+            df = pd.read_csv(io.StringIO(content.decode('utf-8')))
         
         # Validate required columns
         required_columns = ['company_name']
@@ -126,14 +142,24 @@ async def upload_companies_csv(file: UploadFile = File(...), db: Session = Depen
                 detail=f"Missing required columns: {missing_columns}. Available columns: {list(df.columns)}"
             )
         
-        # Reset companies and dependent allocations only
-        db.query(Allocation).delete()
-        db.query(Company).delete()
+        # Reset the cohort's companies and dependent allocations only; other cohorts are untouched
+        db.query(Allocation).filter(Allocation.cohort_id == cohort_id).delete(synchronize_session=False)
+        db.query(AllocationRun).filter(AllocationRun.cohort_id == cohort_id).delete(synchronize_session=False)
+        db.query(CompanySkill).filter(CompanySkill.cohort_id == cohort_id).delete(synchronize_session=False)
+        db.query(Company).filter(Company.cohort_id == cohort_id).delete(synchronize_session=False)
+        bump_version(db, COMPANIES, COMPANIES_REPLACED, ALLOCATIONS, cohort_id=cohort_id)
         db.commit()
+        cohort = cohorts.get(cohort_id)
+        cohort.allocator.reset()
+        if cohort.candidates is not None:
+            cohort.candidates.clear()
 
         accepted = 0
         rejected = 0
         errors = []
+        added = []
+        # Version row lock before the inserts, so their ids commit in increasing order
+        bump_version(db, COMPANIES, cohort_id=cohort_id)
         
         # Process each row
         for index, row in df.iterrows():
@@ -148,46 +174,29 @@ async def upload_companies_csv(file: UploadFile = File(...), db: Session = Depen
                         company_data[col] = str(value)
                 
                 # Map CSV columns to database columns
-                mapped_data = {}
-                mapped_data['company_name'] = company_data.get('company_name', '')
-                mapped_data['position_title'] = company_data.get('role_title', '')
-                mapped_data['req_skills_text'] = company_data.get('skills_required', '')
-                mapped_data['job_description'] = company_data.get('description', '')
-                mapped_data['location_city'] = company_data.get('location_city', '')
-                mapped_data['location_state'] = company_data.get('location_state', '')
-                
-                # Handle salary range - extract numeric value
-                salary_range = company_data.get('salary_range', '')
-                if salary_range and 'LPA' in salary_range:
-                    try:
-                        # Extract number from "11 LPA" format
-                        salary_num = float(salary_range.split()[0])
-                        mapped_data['stipend'] = salary_num * 10000  # Convert LPA to monthly
-                    except:
-                        mapped_data['stipend'] = None
-                else:
-                    mapped_data['stipend'] = None
-                
-                mapped_data['openings'] = 1  # Default to 1 opening
-                mapped_data['priority_flags'] = company_data.get('experience_required', '')
-                mapped_data['other_notes'] = f"Experience Required: {company_data.get('experience_required', '')}, Salary Range: {company_data.get('salary_range', '')}"
+                mapped_data = company_from_row(company_data)
                 
                 # Create company record
-                db_company = Company(**mapped_data)
+                db_company = Company(**mapped_data, cohort_id=cohort_id)
                 db.add(db_company)
+                added.append(db_company)
                 accepted += 1
                 
             except Exception as e:
                 rejected += 1
                 errors.append(f"Row {index + 2}: {str(e)}")
         
-        db.commit()
+        with timed("upload_insert", accepted):
+            db.flush()
+            index_skills(db, COMPANY_SEARCH, cohort_id, [(db_company.company_id, db_company.req_skills_text) for db_company in added])
+            db.commit()
         
         return CSVUploadResponse(
             message=f"Successfully processed {accepted} companies",
             accepted=accepted,
             rejected=rejected,
-            errors=errors
+            errors=errors,
+            stages=stages
         )
         
     except Exception as e:
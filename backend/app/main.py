@@ -1,10 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 import os
+import threading
 from dotenv import load_dotenv
 
-from core.database import create_tables
-from api import students, companies, upload, allocations
+from core.database import SessionLocal, create_tables, engine
+from api import students, companies, upload, allocations, cohorts, debug
+from services.admission import AdmissionMiddleware
+from services.metrics import METRICS_CONTENT_TYPE, render_metrics
+from services.profiling import PROFILE_DIR, ProfilingMiddleware
+from services.search import skill_backfill
 
 load_dotenv()
 
@@ -14,6 +21,11 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control: separate concurrency limits and priority wait queues for heavy compute and light reads.
+# Added before CORS so that 429 responses still carry the CORS headers.
+if os.getenv("ADMISSION_CONTROL", "on").lower() != "off":
+    app.add_middleware(AdmissionMiddleware)
+
 # CORS middleware
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
 app.add_middleware(
@@ -22,11 +34,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id", "X-Profile-Concurrent"],
 )
 
+# Request profiling: "header" profiles requests sending X-Profile: 1, "all" every request.
+# When off neither the middleware nor the /debug/profiles routes are installed.
+profile_mode = os.getenv("PROFILE_REQUESTS", "off").lower()
+profiling_enabled = profile_mode in ("header", "all")
+if profiling_enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        mode=profile_mode,
+        directory=PROFILE_DIR,
+        interval=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+    )
+
+# Model preload: "background" loads and warms the model in a thread at startup, "off" on the first allocation
+model_preload = os.getenv("MODEL_PRELOAD", "background").lower()
+
 @app.on_event("startup")
 async def startup_event():
     create_tables()
+    # Filling the skill tables of an existing database scans every row; /ready reports when it is done
+    threading.Thread(target=skill_backfill.run, args=(SessionLocal,), name="skill-backfill", daemon=True).start()
+    if model_preload == "background":
+        threading.Thread(target=allocations.ai_engine.warm_up, name="model-preload", daemon=True).start()
 
 @app.get("/")
 async def root():
@@ -34,13 +66,44 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness: answers as soon as the process serves requests"""
     return {"status": "healthy", "message": "API is running"}
 
-# Include routers
-app.include_router(students.router)
-app.include_router(companies.router)
-app.include_router(upload.router)
-app.include_router(allocations.router)
+@app.get("/ready")
+def readiness_check():
+    """Readiness: the database answers, the skill tables are backfilled and, when preloading, the model is warmed up"""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        database = "ok"
+    except Exception as e:
+        database = f"error: {e}"
+    model = allocations.ai_engine.model_status
+    search_index = skill_backfill.status
+    ready = database == "ok" and search_index == "done" and (model_preload != "background" or model == "ready")
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "database": database,
+            "model": model,
+            "search_index": search_index,
+        },
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Stage timings and counters in the Prometheus text format"""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+# Include routers; the data routers are mounted once for the default cohort and once per cohort,
+# e.g. /students and /cohorts/{cohort_id}/students
+for router in (students.router, companies.router, upload.router, allocations.router):
+    app.include_router(router)
+    app.include_router(router, prefix="/cohorts/{cohort_id}")
+app.include_router(cohorts.router)
+if profiling_enabled:
+    app.include_router(debug.router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Synthetic student and position data in the data/*.csv schemas, at any scale
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+STATES = [
+    "Andhra Pradesh", "Assam", "Bihar", "Chhattisgarh", "Delhi", "Goa", "Gujarat", "Haryana", "Jharkhand",
+    "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra", "Odisha", "Punjab", "Rajasthan", "Tamil Nadu",
+    "Telangana", "Uttar Pradesh", "West Bengal",
+]
+CITIES = [
+    "Ahmedabad", "Bengaluru", "Bhopal", "Chandigarh", "Chennai", "Hyderabad", "Jaipur", "Kochi", "Kolkata",
+    "Lucknow", "Mumbai", "Mysuru", "Nagpur", "Patna", "Pune", "Visakhapatnam",
+]
+UNIVERSITIES = [
+    "Amity University", "Anna University", "BITS Pilani", "Banaras Hindu University", "Christ University",
+    "Delhi University", "IIT Bombay", "IIT Delhi", "IIT Kanpur", "IIT Kharagpur", "IIT Madras", "JNTU Hyderabad",
+    "NIT Trichy", "NIT Warangal", "Osmania University", "SRM University", "Symbiosis Pune", "VIT Vellore",
+]
+BRANCHES = ["CSE", "CIVIL", "IT", "MECH", "EEE", "ECE"]
+SKILLS = [
+    "Python", "Java", "C++", "JavaScript", "React", "Node.js", "Django", "Flask", "HTML", "CSS", "SQL",
+    "Cloud", "DevOps", "Machine Learning", "Data Analysis",
+]
+CERTIFICATIONS = ["Oracle SQL", "Azure Fundamentals", "RedHat", "AWS Certified", "GCP Certified", "None"]
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Krishna", "Ishaan", "Rohan", "Deepak",
+    "Rahul", "Ananya", "Diya", "Saanvi", "Aadhya", "Kavya", "Priya", "Sneha", "Pooja", "Meera", "Neha",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Gupta", "Singh", "Kumar", "Patel", "Reddy", "Nair", "Iyer", "Deshmukh", "Joshi",
+    "Mehta", "Chopra", "Das", "Banerjee", "Rao", "Pillai", "Menon",
+]
+GENDERS = ["Male", "Female", "Other"]
+CASTES = ["General", "OBC", "SC", "ST", "EWS"]
+CASTE_SHARES = [0.30, 0.40, 0.16, 0.06, 0.08]
+COMPANIES = [
+    "Accenture India", "Axis Bank", "Byju's", "Capgemini India", "Cognizant India", "Flipkart",
+    "HCL Technologies", "HDFC Bank", "ICICI Bank", "Infosys", "L&T Infotech", "Mindtree", "Ola", "Paytm",
+    "PhonePe", "Reliance Jio", "TCS", "Tech Mahindra", "Wipro", "Zomato",
+]
+ROLES = ["Backend Developer", "Business Analyst", "Data Scientist", "DevOps Engineer", "Frontend Developer", "Software Engineer"]
+
+
+def _skill_lists(rng: np.random.Generator, n: int, low: int, high: int) -> list:
+    """n comma-separated lists of low..high distinct skills"""
+    counts = rng.integers(low, high + 1, n)
+    picks = np.argsort(rng.random((n, len(SKILLS))), axis=1)
+    return [", ".join(SKILLS[j] for j in row[:k]) for row, k in zip(picks, counts)]
+
+
+def generate_students(n: int, seed: int = 0) -> pd.DataFrame:
+    """Students in the students_profiles_with_city.csv schema"""
+    rng = np.random.default_rng(seed)
+    first = rng.choice(FIRST_NAMES, n)
+    last = rng.choice(LAST_NAMES, n)
+    return pd.DataFrame({
+        "student_id": np.arange(1, n + 1),
+        "name": [f"{a} {b}" for a, b in zip(first, last)],
+        "age": rng.integers(18, 26, n),
+        "gender": rng.choice(GENDERS, n),
+        "caste_category": rng.choice(CASTES, n, p=CASTE_SHARES),
+        "pwd_flag": rng.choice(["Y", "N"], n, p=[0.05, 0.95]),
+        "family_income": rng.integers(5000, 200000, n),
+        "state": rng.choice(STATES, n),
+        "district": rng.choice(CITIES, n),
+        "university": rng.choice(UNIVERSITIES, n),
+        "branch": rng.choice(BRANCHES, n),
+        "cgpa": np.round(rng.uniform(5.0, 10.0, n), 2),
+        "skills": _skill_lists(rng, n, 3, 6),
+        "internships_count": rng.integers(0, 4, n),
+        "projects_count": rng.integers(1, 6, n),
+        "certifications": rng.choice(CERTIFICATIONS, n),
+        "City": rng.choice(["Metropolitan City", "Non-Metro City"], n, p=[0.4, 0.6]),
+    })
+
+
+def generate_positions(n: int, seed: int = 0) -> pd.DataFrame:
+    """Positions in the company_positions.csv schema"""
+    rng = np.random.default_rng(seed + 1)
+    roles = rng.choice(ROLES, n)
+    mentioned = _skill_lists(rng, n, 2, 2)
+    return pd.DataFrame({
+        "position_id": np.arange(1, n + 1),
+        "company_name": rng.choice(COMPANIES, n),
+        "location_state": rng.choice(STATES, n),
+        "location_city": rng.choice(CITIES, n),
+        "role_title": roles,
+        "skills_required": _skill_lists(rng, n, 3, 6),
+        "experience_required": [f"{years} years" for years in rng.integers(0, 6, n)],
+        "salary_range": [f"{lpa} LPA" for lpa in rng.integers(3, 13, n)],
+        "description": [f"Hiring for {role} role with skills in {skills}." for role, skills in zip(roles, mentioned)],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic students and positions CSVs")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--positions", type=int, default=None, help="default: students / 10")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=".", help="output directory")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    positions = args.positions or max(args.students // 10, 1)
+    generate_students(args.students, args.seed).to_csv(os.path.join(args.out, "students.csv"), index=False)
+    generate_positions(positions, args.seed).to_csv(os.path.join(args.out, "positions.csv"), index=False)
+    print(f"Wrote {args.students} students and {positions} positions to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Concurrent HTTP load test with per-endpoint throughput and latency percentiles
+
+Virtual users are started linearly over the ramp-up period and then issue
+requests back to back, each picking an endpoint from a weighted mix, until the
+duration is over. Without --base-url the API runs in-process on a scratch
+database seeded with synthetic data, e.g.
+
+    python -m benchmarks.load --concurrency 32 --duration 30
+    python -m benchmarks.load --base-url http://localhost:8000 --mix students=80,results=20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from benchmarks.datagen import generate_positions, generate_students
+from benchmarks.run import _check, in_process_app
+
+DEFAULT_MIX = "students=50,results=20,export=10,allocate=15,upload=5"
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name.strip()}'. Choose from: {', '.join(ENDPOINTS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+class LoadTest:
+    """Shared state of one run: the client, seed payloads and the recorded samples"""
+
+    def __init__(self, client, students_csv: bytes, n_students: int, params: Dict[str, Any]):
+        self.client = client
+        self.students_csv = students_csv
+        self.n_students = n_students
+        self.params = params
+        # (endpoint, seconds since start, latency seconds, status code or 0 on a transport error)
+        self.samples: List[Tuple[str, float, float, int]] = []
+
+    async def request(self, endpoint: str):
+        return await ENDPOINTS[endpoint](self)
+
+    async def user(self, rng: random.Random, names: List[str], weights: List[float], start: float, deadline: float):
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(names, weights)[0]
+            sent = time.perf_counter()
+            try:
+                status = (await self.request(endpoint)).status_code
+            except Exception:
+                status = 0
+            self.samples.append((endpoint, sent - start, time.perf_counter() - sent, status))
+
+
+async def _students(test: LoadTest):
+    skip = random.randrange(max(test.n_students - 100, 1))
+    return await test.client.get("/students/", params={"skip": skip, "limit": 100})
+
+
+async def _results(test: LoadTest):
+    return await test.client.get("/allocate/")
+
+
+async def _export(test: LoadTest):
+    return await test.client.get("/allocate/export")
+
+
+async def _allocate(test: LoadTest):
+    return await test.client.post("/allocate/", json=test.params)
+
+
+async def _upload(test: LoadTest):
+    return await test.client.post("/upload/students", files={"file": ("students.csv", test.students_csv, "text/csv")})
+
+
+ENDPOINTS = {
+    "students": _students,
+    "results": _results,
+    "export": _export,
+    "allocate": _allocate,
+    "upload": _upload,
+}
+
+
+def summarize(samples: List[Tuple[str, float, float, int]], elapsed: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles per endpoint and overall"""
+    groups: Dict[str, List[Tuple[float, int]]] = {}
+    for endpoint, _, latency, status in samples:
+        groups.setdefault(endpoint, []).append((latency, status))
+    groups["all"] = [(latency, status) for _, _, latency, status in samples]
+
+    report = {}
+    for endpoint, rows in groups.items():
+        latencies = np.array([latency for latency, _ in rows]) * 1000
+        errors = sum(1 for _, status in rows if not 200 <= status < 400)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        report[endpoint] = {
+            "requests": len(rows),
+            "errors": errors,
+            "throughput_rps": round(len(rows) / elapsed, 2),
+            "mean_ms": round(float(latencies.mean()), 2) if len(latencies) else 0.0,
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(latencies.max()), 2) if len(latencies) else 0.0,
+        }
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, row in report.items():
+        print(
+            f"{endpoint:<10} {row['requests']:>9} {row['errors']:>7} {row['throughput_rps']:>8.2f} "
+            f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}"
+        )
+
+
+async def load_test(args) -> Dict[str, Any]:
+    import httpx
+
+    mix = parse_mix(args.mix)
+    params = json.loads(args.params)
+    students_csv = generate_students(args.students, args.seed).to_csv(index=False).encode()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout)
+    else:
+        app, _ = in_process_app(args.dimension)
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://loadtest", limits=limits, timeout=args.timeout
+        )
+
+    async with client:
+        if not args.no_seed:
+            positions_csv = generate_positions(max(args.students // 10, 1), args.seed).to_csv(index=False).encode()
+            _check(await client.post("/upload/students", files={"file": ("students.csv", students_csv, "text/csv")}), "Student upload")
+            _check(await client.post("/upload/companies", files={"file": ("positions.csv", positions_csv, "text/csv")}), "Company upload")
+            _check(await client.post("/allocate/", json=params), "Allocation")
+
+        test = LoadTest(client, students_csv, args.students, params)
+        names, weights = list(mix), list(mix.values())
+        start = time.perf_counter()
+        deadline = start + args.ramp_up + args.duration
+        users = []
+        for i in range(args.concurrency):
+            users.append(asyncio.create_task(test.user(random.Random(args.seed + i), names, weights, start, deadline)))
+            if args.ramp_up:
+                await asyncio.sleep(args.ramp_up / args.concurrency)
+        await asyncio.gather(*users)
+        elapsed = time.perf_counter() - start
+
+    # Steady-state figures leave out the ramp-up period
+    steady = [sample for sample in test.samples if sample[1] >= args.ramp_up]
+    return {
+        "target": args.base_url or "in-process",
+        "concurrency": args.concurrency,
+        "ramp_up": args.ramp_up,
+        "duration": args.duration,
+        "mix": mix,
+        "params": params,
+        "students": args.students,
+        "endpoints": summarize(steady, max(elapsed - args.ramp_up, 1e-9)),
+        "including_ramp_up": summarize(test.samples, elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API with a weighted endpoint mix")
+    parser.add_argument("--base-url", default=None, help="default: run the app in-process")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint=weight list from: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds over which users are started")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds at full concurrency")
+    parser.add_argument("--students", type=int, default=2000, help="rows in the seed and upload CSVs")
+    parser.add_argument("--params", default='{"top_k": 20}', help="POST /allocate body as JSON")
+    parser.add_argument("--no-seed", action="store_true", help="use the data already in the target")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--database-url", default=None, help="in-process database; default: a scratch SQLite file")
+    parser.add_argument("--dimension", type=int, default=384, help="stub embedding dimension (in-process)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="also write the report as JSON")
+    args = parser.parse_args()
+
+    if not args.base_url:
+        # The database URL is read when the app is imported
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/loadtest.db"
+    results = asyncio.run(load_test(args))
+
+    print_report(results["endpoints"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
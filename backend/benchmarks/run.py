@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+End-to-end scale benchmark: upload -> encode -> score -> assign -> persist -> export
+
+Runs the real API in-process against a scratch database with a deterministic
+hashing encoder in place of the sentence transformer, and records time and
+peak RSS per pipeline step and per internal stage into a JSON file, e.g.
+
+    python -m benchmarks.run --scales 1000,10000,100000 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List
+
+import numpy as np
+
+from benchmarks.datagen import generate_positions, generate_students
+from services.metrics import StageBreakdown, collect_stages
+
+_TOKEN = re.compile(r"[a-z0-9+#.]+")
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux), or the process peak where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class HashingEncoder:
+    """Deterministic stand-in for the sentence transformer: signed feature hashing of word tokens"""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def encode(self, texts: List[str], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        rows, columns, signs = [], [], []
+        for i, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                h = zlib.crc32(token.encode())
+                rows.append(i)
+                columns.append(h % self.dimension)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        np.add.at(embeddings, (np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64)), signs)
+        return embeddings
+
+
+class MemoryBreakdown(StageBreakdown):
+    """Stage timings plus the peak RSS sampled while each stage was running"""
+
+    def __init__(self, interval: float = 0.01):
+        super().__init__()
+        self.interval = interval
+        self.peaks: Dict[str, int] = {}
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _record(self, stage: str, rss: int):
+        self.peaks[stage] = max(self.peaks.get(stage, 0), rss)
+
+    def enter(self, stage: str):
+        with self._lock:
+            self._active[stage] = self._active.get(stage, 0) + 1
+            self._record(stage, rss_bytes())
+
+    def exit(self, stage: str, elapsed: float):
+        super().exit(stage, elapsed)
+        with self._lock:
+            self._record(stage, rss_bytes())
+            self._active[stage] -= 1
+            if not self._active[stage]:
+                del self._active[stage]
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = rss_bytes()
+            with self._lock:
+                for stage in self._active:
+                    self._record(stage, rss)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {"seconds": round(seconds, 4), "peak_rss_mb": round(self.peaks.get(stage, 0) / 2**20, 1)}
+            for stage, seconds in self.items()
+        }
+
+
+@contextmanager
+def step(recorder: MemoryBreakdown, name: str):
+    recorder.enter(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.exit(name, time.perf_counter() - start)
+
+
+def _check(response, what: str):
+    if response.status_code != 200:
+        raise RuntimeError(f"{what} failed with {response.status_code}: {response.text[:500]}")
+    return response
+
+
+async def run_scale(client, engine, n_students: int, n_positions: int, params: Dict[str, Any], seed: int) -> Dict[str, Any]:
+    """One pass of the pipeline at a given scale"""
+    engine.embedding_cache.clear()
+    steps, stages = MemoryBreakdown(), MemoryBreakdown()
+    steps.start()
+    stages.start()
+    try:
+        with collect_stages(stages):
+            with step(steps, "generate"):
+                students_csv = generate_students(n_students, seed).to_csv(index=False).encode()
+                positions_csv = generate_positions(n_positions, seed).to_csv(index=False).encode()
+            with step(steps, "upload_students"):
+                _check(await client.post("/upload/students", files={"file": ("students.csv", students_csv, "text/csv")}), "Student upload")
+            with step(steps, "upload_companies"):
+                _check(await client.post("/upload/companies", files={"file": ("positions.csv", positions_csv, "text/csv")}), "Company upload")
+            with step(steps, "allocate"):
+                allocation = _check(await client.post("/allocate/", json=params), "Allocation").json()
+            with step(steps, "export"):
+                export = _check(await client.get("/allocate/export"), "Export")
+    finally:
+        steps.stop()
+        stages.stop()
+
+    result = {
+        "students": n_students,
+        "positions": n_positions,
+        "allocated": len(allocation["allocations"]),
+        "export_bytes": len(export.content),
+        "steps": steps.report(),
+        "stages": stages.report(),
+    }
+    print(
+        f"{n_students} students / {n_positions} positions: "
+        + ", ".join(f"{name} {values['seconds']:.2f}s" for name, values in result["steps"].items())
+    )
+    return result
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def in_process_app(dimension: int = 384):
+    """The API app on the configured database, with the hashing encoder in place of the model.
+
+    DATABASE_URL must be set before this is called.
+    """
+    from core.database import create_tables
+    from app.main import app
+    from api.allocations import ai_engine
+
+    create_tables()
+    ai_engine.model = HashingEncoder(dimension)
+    return app, ai_engine
+
+
+async def benchmark(args) -> Dict[str, Any]:
+    import httpx
+
+    app, ai_engine = in_process_app(args.dimension)
+    params = json.loads(args.params)
+
+    runs = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for n_students in (int(s) for s in args.scales.split(",")):
+            n_positions = max(int(n_students * args.positions_ratio), 1)
+            runs.append(await run_scale(client, ai_engine, n_students, n_positions, params, args.seed))
+
+    return {
+        "commit": _commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "encoder": f"hashing-{args.dimension}",
+        "params": params,
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the end-to-end allocation benchmark")
+    parser.add_argument("--scales", default="1000,10000,100000", help="comma-separated student counts")
+    parser.add_argument("--positions-ratio", type=float, default=0.1, help="positions per student")
+    parser.add_argument("--params", default='{"top_k": 20}', help="POST /allocate body as JSON")
+    parser.add_argument("--dimension", type=int, default=384, help="stub embedding dimension")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", default=None, help="default: a scratch SQLite file")
+    parser.add_argument("--output", default=None, help="default: benchmark-<commit>.json")
+    args = parser.parse_args()
+
+    # The database URL is read when the app is imported
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/benchmark.db"
+    results = asyncio.run(benchmark(args))
+
+    output = args.output or f"benchmark-{results['commit']}.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
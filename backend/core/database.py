@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -10,6 +10,11 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./internship.db")
 
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        # WAL lets readers keep serving the published allocation run while a new one is written
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
 else:
     engine = create_engine(DATABASE_URL)
 
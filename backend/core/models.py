@@ -1,14 +1,19 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 Base = declarative_base()
 
+# Cohort (placement drive) of rows written without one; every table is partitioned by cohort_id
+DEFAULT_COHORT = "default"
+
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = (Index("ix_students_cohort_student", "cohort_id", "student_id"),)
     
     student_id = Column(Integer, primary_key=True, index=True)
+    cohort_id = Column(String(64), nullable=False, default=DEFAULT_COHORT, server_default=DEFAULT_COHORT)
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
     skills_text = Column(Text)
@@ -21,13 +26,20 @@ class Student(Base):
     gender = Column(String(20))
     financial_status = Column(String(50))
     preferred_locations = Column(Text)
+    prefers_metro = Column(Boolean)
+    cgpa = Column(Float)
+    internships_count = Column(Integer)
+    projects_count = Column(Integer)
+    experience_years = Column(Float)
     other_notes = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class Company(Base):
     __tablename__ = "companies"
+    __table_args__ = (Index("ix_companies_cohort_company", "cohort_id", "company_id"),)
     
     company_id = Column(Integer, primary_key=True, index=True)
+    cohort_id = Column(String(64), nullable=False, default=DEFAULT_COHORT, server_default=DEFAULT_COHORT)
     company_name = Column(String(200), nullable=False)
     position_title = Column(String(200))
     req_skills_text = Column(Text)
@@ -36,14 +48,52 @@ class Company(Base):
     location_state = Column(String(100))
     stipend = Column(Float)
     openings = Column(Integer, default=1)
+    min_cgpa = Column(Float)
+    min_experience_years = Column(Float)
+    salary_lpa = Column(Float)
     priority_flags = Column(Text)
     other_notes = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class StudentSkill(Base):
+    """Normalised skill of a student (services.skills.parse_skills), written at ingest for indexed search"""
+    __tablename__ = "student_skills"
+
+    cohort_id = Column(String(64), primary_key=True, default=DEFAULT_COHORT)
+    skill = Column(String(100), primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.student_id"), primary_key=True, index=True)
+
+class CompanySkill(Base):
+    """Normalised required skill of a position, written at ingest for indexed search"""
+    __tablename__ = "company_skills"
+
+    cohort_id = Column(String(64), primary_key=True, default=DEFAULT_COHORT)
+    skill = Column(String(100), primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.company_id"), primary_key=True, index=True)
+
+class AllocationRun(Base):
+    __tablename__ = "allocation_runs"
+    __table_args__ = (Index("ix_allocation_runs_cohort_status", "cohort_id", "status"),)
+    
+    run_id = Column(Integer, primary_key=True, index=True)
+    cohort_id = Column(String(64), nullable=False, default=DEFAULT_COHORT, server_default=DEFAULT_COHORT)
+    # building -> current -> superseded; readers only ever see the single "current" run of each cohort
+    status = Column(String(20), nullable=False, default="building", index=True)
+    params = Column(Text)
+    total_students = Column(Integer)
+    total_companies = Column(Integer)
+    allocated_count = Column(Integer)
+    processing_time = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    published_at = Column(DateTime)
+
 class Allocation(Base):
     __tablename__ = "allocations"
+    __table_args__ = (Index("ix_allocations_cohort_run_student", "cohort_id", "run_id", "student_id"),)
     
     allocation_id = Column(Integer, primary_key=True, index=True)
+    cohort_id = Column(String(64), nullable=False, default=DEFAULT_COHORT, server_default=DEFAULT_COHORT)
+    run_id = Column(Integer, ForeignKey("allocation_runs.run_id"), nullable=False)
     student_id = Column(Integer, ForeignKey("students.student_id"))
     company_id = Column(Integer, ForeignKey("companies.company_id"))
     score = Column(Float, nullable=False)
@@ -51,3 +101,11 @@ class Allocation(Base):
     
     student = relationship("Student")
     company = relationship("Company")
+
+class DatasetVersion(Base):
+    __tablename__ = "dataset_versions"
+
+    cohort_id = Column(String(64), primary_key=True, default=DEFAULT_COHORT)
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Dict, Literal
 from datetime import datetime
 
 class StudentBase(BaseModel):
@@ -15,6 +15,11 @@ class StudentBase(BaseModel):
     gender: Optional[str] = Field(None, max_length=20)
     financial_status: Optional[str] = Field(None, max_length=50)
     preferred_locations: Optional[str] = None
+    prefers_metro: Optional[bool] = None
+    cgpa: Optional[float] = Field(None, ge=0)
+    internships_count: Optional[int] = Field(None, ge=0)
+    projects_count: Optional[int] = Field(None, ge=0)
+    experience_years: Optional[float] = Field(None, ge=0)
     other_notes: Optional[str] = None
 
 class StudentCreate(StudentBase):
@@ -22,6 +27,7 @@ class StudentCreate(StudentBase):
 
 class Student(StudentBase):
     student_id: int
+    cohort_id: str
     created_at: datetime
     
     class Config:
@@ -36,6 +42,9 @@ class CompanyBase(BaseModel):
     location_state: Optional[str] = Field(None, max_length=100)
     stipend: Optional[float] = None
     openings: int = Field(default=1, ge=1)
+    min_cgpa: Optional[float] = Field(None, ge=0)
+    min_experience_years: Optional[float] = Field(None, ge=0)
+    salary_lpa: Optional[float] = Field(None, ge=0)
     priority_flags: Optional[str] = None
     other_notes: Optional[str] = None
 
@@ -44,11 +53,91 @@ class CompanyCreate(CompanyBase):
 
 class Company(CompanyBase):
     company_id: int
+    cohort_id: str
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class StudentSearchPage(BaseModel):
+    items: List[Student]
+    # Pass as `after` to fetch the next page; None on the last page
+    next_after: Optional[int] = None
+    total: int
+
+class CompanySearchPage(BaseModel):
+    items: List[Company]
+    next_after: Optional[int] = None
+    total: int
+
+class QuotaRule(BaseModel):
+    """Seats reserved for students of one category"""
+    attribute: Literal["caste", "gender", "financial_status"]
+    category: str
+    min_share: float = Field(gt=0, le=1)
+    # "position": ceil(min_share * the positions' seats) are reserved, apportioned
+    # to positions by largest remainder; "global": ceil(min_share * all seats)
+    # are reserved across positions
+    scope: Literal["position", "global"] = "position"
+    # Restrict a per-position rule to these companies
+    company_ids: Optional[List[int]] = None
+
+class AllocationParams(BaseModel):
+    """Tunable options for a single allocation run"""
+    enforce_eligibility: bool = True
+    require_same_state: bool = False
+    # When False, a missing student value (e.g. no CGPA on record) does not
+    # disqualify the student from positions that set a minimum.
+    strict_eligibility: bool = False
+    # Final score = semantic_weight * cosine + location_weight * location score
+    #               + skill_weight * exact skill overlap
+    semantic_weight: float = Field(default=1.0, ge=0)
+    location_weight: float = Field(default=0.2, ge=0)
+    skill_weight: float = Field(default=0.3, ge=0)
+    skill_metric: Literal["jaccard", "weighted"] = "jaccard"
+    # Only score pairs that share at least one skill
+    skill_prefilter: bool = False
+    # Share of the location score given to the metro/non-metro preference
+    metro_weight: float = Field(default=0.3, ge=0, le=1)
+    # Only consider each student's top-k semantic neighbours instead of every pair
+    top_k: Optional[int] = Field(default=None, ge=1)
+    # Repair the previous run for small changes instead of re-allocating everyone
+    incremental: bool = False
+    # Allocate region shards in parallel worker processes, then reconcile leftovers globally
+    sharded: bool = False
+    # Region name -> states; by default every state is its own shard
+    shard_regions: Optional[Dict[str, List[str]]] = None
+    shard_workers: Optional[int] = Field(default=None, ge=1)
+    # "greedy": best-score-first assignment; "stable": student-proposing deferred acceptance
+    algorithm: Literal["greedy", "stable"] = "greedy"
+    # Explicit preference lists for the stable algorithm: student_id -> company_ids, most preferred first
+    student_rankings: Optional[Dict[int, List[int]]] = None
+    # Reservation quotas, enforced by the greedy algorithm
+    quotas: Optional[List[QuotaRule]] = None
+    # Give reserved seats that no category member could take to everyone else
+    release_unfilled_quotas: bool = True
+    # Second-stage scorer run only on each student's shortlist (top_k, default 20):
+    # "cross_encoder" (joint text relevance) or "features" (skills, CGPA, location)
+    rescorer: Optional[Literal["cross_encoder", "features"]] = None
+    # Final score of a re-scored pair = (1 - rescore_weight) * first-stage score + rescore_weight * second-stage score,
+    # the latter mapped onto the range of the student's first-stage scores
+    rescore_weight: float = Field(default=0.5, ge=0, le=1)
+    # Re-scoring budget: stop after this many milliseconds or candidate pairs; later students keep first-stage scores
+    rescore_budget_ms: Optional[int] = Field(default=None, ge=1)
+    rescore_max_pairs: Optional[int] = Field(default=None, ge=1)
+
+    @field_validator("quotas")
+    @classmethod
+    def quotas_fit_seats(cls, quotas):
+        # Rules on different attributes (e.g. caste and gender) overlap, so only shares of one attribute add up
+        shares: Dict[str, float] = {}
+        for rule in quotas or []:
+            shares[rule.attribute] = shares.get(rule.attribute, 0.0) + rule.min_share
+        for attribute, share in shares.items():
+            if share > 1:
+                raise ValueError(f"Quota shares of {attribute} add up to more than 100% of seats")
+        return quotas
+
 class AllocationResult(BaseModel):
     student_id: int
     student_name: str
@@ -64,6 +153,19 @@ class AllocationResponse(BaseModel):
     # Added fields for not allocated students
     # short lightweight structure to display in UI
     
+class RescoringSummary(BaseModel):
+    """How much of the candidate space the second-stage scorer covered"""
+    rescorer: str
+    candidate_pairs: int
+    rescored_pairs: int
+    shortlisted_students: int
+    rescored_students: int
+    # rescored_pairs / candidate_pairs (the shortlist) and / (students x positions)
+    rescored_fraction: float
+    candidate_space_fraction: float
+    budget_exhausted: bool
+    seconds: float
+
 class NotAllocatedStudent(BaseModel):
     student_id: int
     student_name: str
@@ -75,6 +177,65 @@ class AllocationResponse(BaseModel):
     total_students: int
     total_companies: int
     processing_time: float
+    # Seconds per stage, with ?include_stages=true
+    stages: Optional[Dict[str, float]] = None
+    # Second-stage coverage, when a re-scorer was selected
+    rescoring: Optional[RescoringSummary] = None
+    # Positions whose CGPA/experience minimums no student in the cohort meets
+    unfillable_company_ids: List[int] = []
+
+class Candidate(BaseModel):
+    company_id: int
+    company_name: Optional[str] = None
+    score: float
+    assigned: bool = False
+
+class StudentCandidates(BaseModel):
+    """A student's best-scoring positions in an allocation run, best first"""
+    student_id: int
+    run_id: int
+    assigned_company_id: Optional[int] = None
+    assigned_score: Optional[float] = None
+    candidates: List[Candidate]
+
+class Scenario(BaseModel):
+    """One what-if variant for POST /allocate/scenarios"""
+    name: Optional[str] = None
+    params: AllocationParams = Field(default_factory=AllocationParams)
+    # company_id -> openings, overriding the stored values for this scenario only
+    openings: Optional[Dict[int, int]] = None
+
+class ScenarioRequest(BaseModel):
+    scenarios: List[Scenario] = Field(min_length=1, max_length=32)
+    workers: Optional[int] = Field(default=None, ge=1)
+
+class ScenarioResult(BaseModel):
+    name: str
+    allocated_count: int
+    unallocated_count: int
+    total_seats: int
+    fill_rate: float
+    mean_score: float
+    processing_time: float
+
+class ScenarioResponse(BaseModel):
+    scenarios: List[ScenarioResult]
+    total_students: int
+    total_companies: int
+    processing_time: float
+    stages: Optional[Dict[str, float]] = None
+
+class CohortSummary(BaseModel):
+    cohort_id: str
+    students: int
+    companies: int
+    current_run_id: Optional[int] = None
+    allocated_count: Optional[int] = None
+
+class ProfileInfo(BaseModel):
+    name: str
+    size_bytes: int
+    created_at: datetime
 
 class UploadResponse(BaseModel):
     accepted: int
@@ -86,3 +247,4 @@ class CSVUploadResponse(BaseModel):
     accepted: int
     rejected: int
     errors: List[str]
+    stages: Optional[Dict[str, float]] = None
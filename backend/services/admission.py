@@ -0,0 +1,192 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import re
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from services.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+HEAVY = "heavy"
+LIGHT = "light"
+
+# Concurrent requests, waiting requests and seconds a request may wait, per endpoint class
+ADMISSION_HEAVY_CONCURRENCY = int(os.getenv("ADMISSION_HEAVY_CONCURRENCY", "2"))
+ADMISSION_HEAVY_QUEUE = int(os.getenv("ADMISSION_HEAVY_QUEUE", "16"))
+ADMISSION_HEAVY_TIMEOUT = float(os.getenv("ADMISSION_HEAVY_TIMEOUT", "60"))
+ADMISSION_LIGHT_CONCURRENCY = int(os.getenv("ADMISSION_LIGHT_CONCURRENCY", "64"))
+ADMISSION_LIGHT_QUEUE = int(os.getenv("ADMISSION_LIGHT_QUEUE", "256"))
+ADMISSION_LIGHT_TIMEOUT = float(os.getenv("ADMISSION_LIGHT_TIMEOUT", "2"))
+
+# X-Priority header values; lower is served first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+# Allocation runs, what-if scenarios, progress streams (which start runs) and CSV uploads
+_HEAVY_ROUTES = [
+    ("POST", re.compile(r"^/allocate/?$")),
+    ("POST", re.compile(r"^/allocate/scenarios/?$")),
+    ("GET", re.compile(r"^/allocate/stream/?$")),
+    ("POST", re.compile(r"^/upload/")),
+]
+# Probes and metrics are never queued
+_EXEMPT_PATHS = {"/health", "/ready", "/metrics"}
+_COHORT_PREFIX = re.compile(r"^/cohorts/[^/]+(?=/)")
+
+
+def endpoint_class(method: str, path: str) -> Optional[str]:
+    """HEAVY or LIGHT for a request, or None for requests that bypass admission control"""
+    if path in _EXEMPT_PATHS:
+        return None
+    path = _COHORT_PREFIX.sub("", path)
+    for route_method, pattern in _HEAVY_ROUTES:
+        if method == route_method and pattern.match(path):
+            return HEAVY
+    return LIGHT
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionGate:
+    """Concurrency limit with a bounded priority wait queue for one endpoint class.
+
+    Up to `limit` requests run at once; up to `queue_size` more wait, served
+    by priority and then arrival. When the queue is full a newcomer with a
+    better priority evicts the worst waiter, otherwise it is rejected; a
+    waiter is also rejected after `timeout` seconds. Runs on the event loop
+    only, so no lock is needed.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        # Moving average of request durations, for Retry-After
+        self.service_seconds = 1.0
+
+    @property
+    def depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: the queue ahead drained at `limit` requests per average duration"""
+        return max(1, math.ceil((self.depth + 1) * self.service_seconds / max(self.limit, 1)))
+
+    async def acquire(self, priority: int) -> float:
+        """Wait for a slot; returns the seconds waited or raises Rejected"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._update_gauges()
+            return 0.0
+        if len(self._waiters) >= self.queue_size:
+            worst = max(self._waiters, default=None)
+            if worst is None or worst[0] <= priority:
+                raise Rejected("queue_full")
+            self._remove(worst)
+            worst[2].set_exception(Rejected("evicted"))
+
+        start = time.perf_counter()
+        entry = (priority, next(self._order), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, entry)
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(entry[2], self.timeout)
+        except asyncio.TimeoutError:
+            self._remove(entry)
+            raise Rejected("timeout")
+        except BaseException:
+            # Client gone: give back a slot handed over in the meantime, or leave the queue
+            if entry[2].done() and not entry[2].cancelled() and entry[2].exception() is None:
+                self.release()
+            else:
+                self._remove(entry)
+            raise
+        return time.perf_counter() - start
+
+    def release(self, elapsed: Optional[float] = None):
+        """Free a slot, handing it straight to the best waiter if there is one"""
+        if elapsed is not None:
+            self.service_seconds = 0.8 * self.service_seconds + 0.2 * elapsed
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                self._update_gauges()
+                return
+        self.active -= 1
+        self._update_gauges()
+
+    def _remove(self, entry: Tuple[int, int, asyncio.Future]):
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+            self._update_gauges()
+
+    def _update_gauges(self):
+        ADMISSION_IN_FLIGHT.labels(self.name).set(self.active)
+        ADMISSION_QUEUE_DEPTH.labels(self.name).set(len(self._waiters))
+
+
+def default_gates() -> Dict[str, AdmissionGate]:
+    return {
+        HEAVY: AdmissionGate(HEAVY, ADMISSION_HEAVY_CONCURRENCY, ADMISSION_HEAVY_QUEUE, ADMISSION_HEAVY_TIMEOUT),
+        LIGHT: AdmissionGate(LIGHT, ADMISSION_LIGHT_CONCURRENCY, ADMISSION_LIGHT_QUEUE, ADMISSION_LIGHT_TIMEOUT),
+    }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting requests per endpoint class.
+
+    Heavy compute (allocation runs, scenarios, progress streams, uploads)
+    and light reads have separate concurrency limits, so a few allocations
+    never take the slots reads need. Requests over the limit wait in a
+    bounded priority queue (`X-Priority: high|normal|low`); when it is full
+    or the wait times out the client gets 429 with a Retry-After estimate.
+    """
+
+    def __init__(self, app, gates: Optional[Dict[str, AdmissionGate]] = None):
+        self.app = app
+        self.gates = gates or default_gates()
+
+    async def __call__(self, scope, receive, send):
+        name = endpoint_class(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        gate = self.gates[name]
+        header = dict(scope["headers"]).get(b"x-priority", b"normal").decode("latin-1").lower()
+        priority = PRIORITIES.get(header, PRIORITIES["normal"])
+        try:
+            waited = await gate.acquire(priority)
+        except Rejected as e:
+            ADMISSION_REJECTED.labels(name, e.reason).inc()
+            logger.warning(f"Rejected {scope['method']} {scope['path']} ({name}: {e.reason}, {gate.depth} waiting)")
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": f"Server busy ({name} requests: {e.reason.replace('_', ' ')}), retry later"},
+                headers={"Retry-After": str(gate.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+        ADMISSION_WAIT_SECONDS.labels(name).observe(waited)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release(time.perf_counter() - start)
@@ -1,12 +1,24 @@
 import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
-from typing import List, Tuple, Dict, Any
+from collections import OrderedDict
+from typing import List, Tuple, Dict, Any, Optional
+import os
+import threading
 import time
 import logging
 
+from services.metrics import EMBEDDING_CACHE, report_progress, timed
+
 logger = logging.getLogger(__name__)
 
+# Texts whose embeddings are kept between calls; 0 disables the cache
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "100000"))
+
+# Texts per model.encode call; progress is reported after each chunk
+ENCODE_CHUNK_SIZE = int(os.getenv("ENCODE_CHUNK_SIZE", "8192"))
+
+# faiss and sentence_transformers (torch) are imported on first use, so the
+# API answers /health before they have been loaded
+
 class AIAllocationEngine:
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
         self.model_name = model_name
@@ -14,16 +26,59 @@ class AIAllocationEngine:
         self.company_embeddings = None
         self.company_ids = None
         self.index = None
+        self.embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.warmed_up = False
+        self.load_error: Optional[str] = None
+        self._load_lock = threading.Lock()
+        # Allocations of different cohorts encode concurrently and share the embedding cache
+        self._cache_lock = threading.Lock()
         
     def load_model(self):
-        """Load the sentence transformer model"""
-        if self.model is None:
-            logger.info(f"Loading model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
-            logger.info("Model loaded successfully")
+        """Load the sentence transformer model; concurrent callers wait for a single load"""
+        if self.model is not None:
+            return
+        with self._load_lock:
+            if self.model is None:
+                logger.info(f"Loading model: {self.model_name}")
+                start_time = time.time()
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self.model = SentenceTransformer(self.model_name)
+                except Exception as e:
+                    self.load_error = str(e)
+                    raise
+                self.load_error = None
+                logger.info(f"Model loaded in {time.time() - start_time:.2f} seconds")
+
+    def warm_up(self):
+        """Load the model and run one dummy encode so the first real request pays neither"""
+        try:
+            self.load_model()
+            with timed("warm_up"):
+                self.model.encode(["warm up"], convert_to_numpy=True)
+            self.warmed_up = True
+            logger.info("Model warmed up")
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error(f"Model warm-up failed: {e}")
+
+    @property
+    def model_status(self) -> str:
+        """'ready' once warmed up, 'loaded', 'loading' while a load is in progress, 'failed' or 'not_loaded'"""
+        if self.warmed_up:
+            return "ready"
+        if self.model is not None:
+            return "loaded"
+        if self._load_lock.locked():
+            return "loading"
+        return "failed" if self.load_error else "not_loaded"
     
     def build_text_representation(self, data: Dict[str, Any], data_type: str) -> str:
-        """Build text representation for embedding"""
+        """Build text representation for embedding
+
+        Location is deliberately left out; it is scored separately by
+        services.location instead of through the embedding.
+        """
         if data_type == "student":
             text_parts = []
             if data.get("skills_text"):
@@ -32,10 +87,6 @@ class AIAllocationEngine:
                 text_parts.append(f"Degree: {data['degree']}")
             if data.get("stream"):
                 text_parts.append(f"Stream: {data['stream']}")
-            if data.get("city") and data.get("state"):
-                text_parts.append(f"Location: {data['city']}, {data['state']}")
-            if data.get("preferred_locations"):
-                text_parts.append(f"Preferred Locations: {data['preferred_locations']}")
             if data.get("other_notes"):
                 text_parts.append(f"Notes: {data['other_notes']}")
             return " | ".join(text_parts)
@@ -48,8 +99,6 @@ class AIAllocationEngine:
                 text_parts.append(f"Job Description: {data['job_description']}")
             if data.get("position_title"):
                 text_parts.append(f"Position: {data['position_title']}")
-            if data.get("location_city") and data.get("location_state"):
-                text_parts.append(f"Location: {data['location_city']}, {data['location_state']}")
             if data.get("priority_flags"):
                 text_parts.append(f"Priority: {data['priority_flags']}")
             if data.get("other_notes"):
@@ -59,18 +108,51 @@ class AIAllocationEngine:
         return ""
     
     def encode_texts(self, texts: List[str]) -> np.ndarray:
-        """Encode texts to embeddings"""
+        """Encode texts to embeddings
+
+        Embeddings of recently seen texts are served from an LRU cache and
+        duplicate texts are only encoded once. Safe to call from several
+        threads; the model runs outside the cache lock.
+        """
         if not texts:
             return np.array([])
-        
-        self.load_model()
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
-        
-        # L2 normalize embeddings for cosine similarity
-        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-        embeddings = embeddings / (norms + 1e-8)
-        
-        return embeddings
+
+        with self._cache_lock:
+            cached = {t: self.embedding_cache[t] for t in texts if t in self.embedding_cache}
+        missing = list(dict.fromkeys(t for t in texts if t not in cached))
+        EMBEDDING_CACHE.labels("hit").inc(len(texts) - len(missing))
+        EMBEDDING_CACHE.labels("miss").inc(len(missing))
+        encoded = {}
+        if missing:
+            self.load_model()
+            with timed("encode", len(missing)):
+                # Encoded in chunks so long runs can report progress between them
+                batches = (len(missing) + ENCODE_CHUNK_SIZE - 1) // ENCODE_CHUNK_SIZE
+                chunks = []
+                for batch, start in enumerate(range(0, len(missing), ENCODE_CHUNK_SIZE), start=1):
+                    chunks.append(self.model.encode(missing[start:start + ENCODE_CHUNK_SIZE], convert_to_numpy=True))
+                    report_progress(
+                        "encode", batch=batch, batches=batches,
+                        texts=min(start + ENCODE_CHUNK_SIZE, len(missing)), total_texts=len(missing),
+                    )
+                embeddings = np.concatenate(chunks)
+
+                # L2 normalize embeddings for cosine similarity
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                embeddings = (embeddings / (norms + 1e-8)).astype(np.float32)
+            encoded = dict(zip(missing, embeddings))
+
+        rows = [encoded[t] if t in encoded else cached[t] for t in texts]
+        if EMBEDDING_CACHE_SIZE > 0:
+            with self._cache_lock:
+                for text in cached:
+                    if text in self.embedding_cache:
+                        self.embedding_cache.move_to_end(text)
+                for text, embedding in encoded.items():
+                    self.embedding_cache[text] = embedding
+                while len(self.embedding_cache) > EMBEDDING_CACHE_SIZE:
+                    self.embedding_cache.popitem(last=False)
+        return np.stack(rows)
     
     def build_company_index(self, companies: List[Dict[str, Any]]):
         """Build FAISS index for companies"""
@@ -79,11 +161,12 @@ class AIAllocationEngine:
         company_texts = []
         self.company_ids = []
         
-        for company in companies:
-            text = self.build_text_representation(company, "company")
-            if text.strip():
-                company_texts.append(text)
-                self.company_ids.append(company["company_id"])
+        with timed("text_build", len(companies)):
+            for company in companies:
+                text = self.build_text_representation(company, "company")
+                if text.strip():
+                    company_texts.append(text)
+                    self.company_ids.append(company["company_id"])
         
         if not company_texts:
             logger.warning("No valid company texts found")
@@ -93,12 +176,18 @@ class AIAllocationEngine:
         self.company_embeddings = self.encode_texts(company_texts)
         
         # Build FAISS index
-        dimension = self.company_embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
-        self.index.add(self.company_embeddings.astype('float32'))
+        self.index = self.build_index(self.company_embeddings)
         
         logger.info(f"Index built with {self.index.ntotal} vectors")
     
+    def build_index(self, embeddings: np.ndarray):
+        """Inner-product FAISS index (cosine similarity on normalised rows) over the given embeddings"""
+        import faiss
+        with timed("index_build", len(embeddings)):
+            index = faiss.IndexFlatIP(embeddings.shape[1])
+            index.add(np.ascontiguousarray(embeddings, dtype=np.float32))
+        return index
+
     def find_matches(self, students: List[Dict[str, Any]], top_k: int = 5) -> List[Dict[str, Any]]:
         """Find matches for students"""
         if self.index is None or len(students) == 0:
@@ -0,0 +1,663 @@
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+import time
+import logging
+
+from core.models import DEFAULT_COHORT, Student, Company
+from core.schemas import AllocationParams
+from services.ai_engine import AIAllocationEngine
+from services.assignment import greedy_assign, quota_assign, stable_assign
+from services.candidates import Candidates
+from services.eligibility import EligibilityConstraints
+from services.loader import Records, column, load_columns
+from services.location import LocationScorer
+from services.metrics import report_progress, timed
+from services.quotas import QuotaBuckets
+from services.rescoring import RESCORE_TOP_K, get_rescorer, rescore_shortlist
+from services.skills import SkillIndex
+from services.snapshots import Embeddings, SnapshotStore, snapshot_key
+
+logger = logging.getLogger(__name__)
+
+# Above this share of changed students/positions a full re-run is cheaper than a repair
+INCREMENTAL_MAX_CHANGE_FRACTION = 0.05
+
+# Preference list length for the stable algorithm when no top_k is given
+STABLE_TOP_K = 50
+
+# Students per FAISS search call on the top-k path
+SEARCH_BLOCK_ROWS = 65536
+
+STUDENT_FIELDS = (
+    "student_id", "first_name", "last_name", "skills_text", "degree", "stream", "city", "state",
+    "preferred_locations", "prefers_metro", "cgpa", "experience_years", "caste", "gender", "financial_status",
+    "other_notes",
+)
+COMPANY_FIELDS = (
+    "company_id", "company_name", "position_title", "req_skills_text", "job_description",
+    "location_city", "location_state", "openings", "min_cgpa", "min_experience_years",
+    "priority_flags", "other_notes",
+)
+
+
+def load_students(db: Session, *criteria, cohort_id: str = DEFAULT_COHORT) -> Records:
+    """Matching fields of a cohort's students (all, or those meeting `criteria`) in id order, loaded column-wise"""
+    statement = (
+        select(*[getattr(Student, f) for f in STUDENT_FIELDS])
+        .where(Student.cohort_id == cohort_id, *criteria)
+        .order_by(Student.student_id)
+    )
+    return load_columns(db, statement, arrays={"student_id": np.int64})
+
+
+def load_companies(db: Session, *criteria, cohort_id: str = DEFAULT_COHORT) -> Records:
+    """Matching fields of a cohort's companies (all, or those meeting `criteria`) in id order, loaded column-wise"""
+    statement = (
+        select(*[getattr(Company, f) for f in COMPANY_FIELDS])
+        .where(Company.cohort_id == cohort_id, *criteria)
+        .order_by(Company.company_id)
+    )
+    return load_columns(db, statement, arrays={"company_id": np.int64})
+
+
+def company_capacity(companies: List[Dict[str, Any]]) -> np.ndarray:
+    return np.array([max(int(openings or 1), 1) for openings in column(companies, "openings")], dtype=np.int64)
+
+
+def assign(
+    params: AllocationParams,
+    student_idx: np.ndarray,
+    company_idx: np.ndarray,
+    scores: np.ndarray,
+    capacity: np.ndarray,
+    n_students: int,
+    preference: Optional[np.ndarray] = None,
+    quotas: Optional[QuotaBuckets] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Run the assignment algorithm selected by `params.algorithm` over scored candidate pairs"""
+    with timed("assignment", len(scores)):
+        assignment, assigned_scores = _assign(
+            params, student_idx, company_idx, scores, capacity, n_students, preference, quotas
+        )
+        allocated, seats = int((assignment >= 0).sum()), int(capacity.sum())
+        report_progress(
+            "assignment", allocated=allocated, seats=seats, fill_percent=round(100.0 * allocated / seats, 2) if seats else 0.0
+        )
+        return assignment, assigned_scores
+
+
+def _assign(
+    params: AllocationParams,
+    student_idx: np.ndarray,
+    company_idx: np.ndarray,
+    scores: np.ndarray,
+    capacity: np.ndarray,
+    n_students: int,
+    preference: Optional[np.ndarray],
+    quotas: Optional[QuotaBuckets],
+) -> Tuple[np.ndarray, np.ndarray]:
+    if quotas is not None:
+        if params.algorithm == "stable":
+            raise ValueError("Quotas are only supported with the greedy algorithm.")
+        return quota_assign(
+            student_idx, company_idx, scores, capacity, n_students,
+            quotas.groups, quotas.reserved, quotas.global_reserved, params.release_unfilled_quotas, quotas.layers,
+        )
+    if params.algorithm == "stable":
+        return stable_assign(student_idx, company_idx, scores, capacity, n_students, preference)
+    return greedy_assign(student_idx, company_idx, scores, capacity, n_students)
+
+
+def ranked_pairs(
+    rankings: Dict[int, List[int]], students: List[Dict[str, Any]], companies: List[Dict[str, Any]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(student row, company row, rank) for explicit student rankings; unknown ids are skipped"""
+    student_row = {s["student_id"]: i for i, s in enumerate(students)}
+    company_row = {c["company_id"]: j for j, c in enumerate(companies)}
+    student_idx, company_idx, rank = [], [], []
+    for student_id, company_ids in rankings.items():
+        row = student_row.get(student_id)
+        if row is None:
+            continue
+        for position, company_id in enumerate(dict.fromkeys(company_ids)):
+            if company_id in company_row:
+                student_idx.append(row)
+                company_idx.append(company_row[company_id])
+                rank.append(position)
+    return (
+        np.array(student_idx, dtype=np.int64),
+        np.array(company_idx, dtype=np.int64),
+        np.array(rank, dtype=np.float32),
+    )
+
+
+def search_pairs(
+    index, indexed_rows: np.ndarray, queries: np.ndarray, top_k: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(student row, company row, similarity) of each student's top-k index neighbours.
+
+    The index is searched in blocks of students, reporting progress after
+    each block; index positions are mapped back to company rows.
+    """
+    sims, positions = [], []
+    for start in range(0, len(queries), SEARCH_BLOCK_ROWS):
+        block_sims, block_positions = index.search(queries[start:start + SEARCH_BLOCK_ROWS], top_k)
+        sims.append(block_sims)
+        positions.append(block_positions)
+        report_progress("scoring", students=min(start + SEARCH_BLOCK_ROWS, len(queries)), total_students=len(queries))
+    sims, positions = np.concatenate(sims), np.concatenate(positions)
+    student_idx, rank = np.nonzero(positions >= 0)
+    return student_idx, indexed_rows[positions[student_idx, rank]], sims[student_idx, rank]
+
+
+class CandidateScorer:
+    """Blended match score for (student row, company row) pairs under one set of AllocationParams.
+
+    Holds the embeddings and the eligibility, location and skill components
+    for the whole cohort so any subset of pairs can be scored without
+    re-encoding; students and companies can be appended for incremental runs.
+    """
+
+    def __init__(
+        self,
+        students: List[Dict[str, Any]],
+        companies: List[Dict[str, Any]],
+        student_embeddings: np.ndarray,
+        company_embeddings: np.ndarray,
+        company_has_text: np.ndarray,
+        params: AllocationParams,
+    ):
+        self.params = params
+        # asarray rather than astype: memory-mapped snapshot arrays are used in place, not copied
+        self.student_embeddings = np.asarray(student_embeddings, dtype=np.float32)
+        self.company_embeddings = np.asarray(company_embeddings, dtype=np.float32)
+        self.company_has_text = np.asarray(company_has_text, dtype=bool)
+        self.constraints = None
+        if params.enforce_eligibility:
+            self.constraints = EligibilityConstraints(
+                students, companies, require_same_state=params.require_same_state, strict=params.strict_eligibility
+            )
+        self.location = None
+        if params.location_weight:
+            self.location = LocationScorer(students, companies, metro_weight=params.metro_weight)
+        self.skills = None
+        if params.skill_weight or params.skill_prefilter:
+            self.skills = SkillIndex(column(students, "skills_text"), column(companies, "req_skills_text"))
+
+    @property
+    def n_companies(self) -> int:
+        return len(self.company_has_text)
+
+    def add_students(self, students: List[Dict[str, Any]], embeddings: np.ndarray):
+        self.student_embeddings = np.vstack([self.student_embeddings, embeddings.astype(np.float32)])
+        if self.constraints is not None:
+            self.constraints.add_students(students)
+        if self.location is not None:
+            self.location.add_students(students)
+        if self.skills is not None:
+            self.skills.add_students(column(students, "skills_text"))
+
+    def add_companies(self, companies: List[Dict[str, Any]], embeddings: np.ndarray, has_text: np.ndarray):
+        self.company_embeddings = np.vstack([self.company_embeddings, embeddings.astype(np.float32)])
+        self.company_has_text = np.concatenate([self.company_has_text, np.asarray(has_text, dtype=bool)])
+        if self.constraints is not None:
+            self.constraints.add_companies(companies)
+        if self.location is not None:
+            self.location.add_companies(companies)
+        if self.skills is not None:
+            self.skills.add_positions(column(companies, "req_skills_text"))
+
+    def eligibility_mask(self) -> np.ndarray:
+        """Dense (n_students, n_companies) mask of pairs passing the eligibility rules"""
+        mask = np.broadcast_to(self.company_has_text[None, :], (len(self.student_embeddings), self.n_companies))
+        if self.constraints is not None:
+            mask = mask & self.constraints.mask()
+        return mask
+
+    def eligible(self, student_idx: np.ndarray, company_idx: np.ndarray) -> np.ndarray:
+        """Hard filters for candidate pairs: company has text, eligibility rules, skill pre-filter"""
+        keep = self.company_has_text[company_idx]
+        if self.constraints is not None:
+            keep &= self.constraints.pair_mask(student_idx, company_idx)
+        if self.params.skill_prefilter:
+            keep &= self.skills.pair_overlap(student_idx, company_idx) > 0
+        return keep
+
+    def score(self, student_idx: np.ndarray, company_idx: np.ndarray, semantic: Optional[np.ndarray] = None) -> np.ndarray:
+        """Blended scores for candidate pairs; semantic similarity is computed if not supplied"""
+        if semantic is None:
+            semantic = np.einsum(
+                "ij,ij->i", self.student_embeddings[student_idx], self.company_embeddings[company_idx]
+            )
+        scores = self.params.semantic_weight * semantic
+        if self.location is not None:
+            scores = scores + self.params.location_weight * self.location.pair_scores(student_idx, company_idx)
+        if self.params.skill_weight:
+            skill_scores = self.skills.pair_similarity(student_idx, company_idx, self.params.skill_metric)
+            scores = scores + self.params.skill_weight * skill_scores
+        return scores.astype(np.float32)
+
+    def score_block(self, rows: np.ndarray, columns: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dense (len(rows), len(columns)) blended scores with -inf for pairs that fail a hard filter"""
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.arange(self.n_companies) if columns is None else np.asarray(columns, dtype=np.int64)
+        student_idx = rows[:, None]
+        company_idx = columns[None, :]
+        semantic = self.student_embeddings[rows] @ self.company_embeddings[columns].T
+        if self.params.top_k and len(columns) > self.params.top_k:
+            kth = np.partition(semantic, -self.params.top_k, axis=1)[:, -self.params.top_k][:, None]
+            in_top_k = semantic >= kth
+        else:
+            in_top_k = np.ones(semantic.shape, dtype=bool)
+
+        scores = self.params.semantic_weight * semantic
+        if self.location is not None:
+            scores = scores + self.params.location_weight * self.location.pair_scores(student_idx, company_idx)
+        if self.params.skill_weight:
+            similarity = self.skills.similarity(self.params.skill_metric, rows=rows, columns=columns).toarray()
+            scores = scores + self.params.skill_weight * similarity
+
+        keep = in_top_k & self.company_has_text[company_idx]
+        if self.constraints is not None:
+            keep &= self.constraints.pair_mask(student_idx, company_idx)
+        if self.params.skill_prefilter:
+            keep &= self.skills.overlap(rows, columns).toarray() > 0
+        return np.where(keep, scores, -np.inf).astype(np.float32)
+
+
+class AllocationState:
+    """Result of the latest allocation plus everything needed to repair it incrementally"""
+
+    def __init__(
+        self,
+        students: List[Dict[str, Any]],
+        companies: List[Dict[str, Any]],
+        scorer: Optional[CandidateScorer],
+        capacity: np.ndarray,
+        assignment: np.ndarray,
+        scores: np.ndarray,
+        params: AllocationParams,
+    ):
+        self.students = students
+        self.companies = companies
+        self.scorer = scorer
+        self.capacity = capacity
+        self.assignment = assignment
+        self.scores = scores
+        self.params = params
+        self.run_id: Optional[int] = None
+        self.student_row = {sid: i for i, sid in enumerate(column(students, "student_id"))}
+        self.company_row = {cid: j for j, cid in enumerate(column(companies, "company_id"))}
+        self.student_active = np.ones(len(students), dtype=bool)
+        self.company_active = np.ones(len(companies), dtype=bool)
+        # Each student's best-scoring candidates, persisted with the run for explanations and re-ranking
+        self.candidates: Optional[Candidates] = None
+        # Second-stage re-scoring summary, when params.rescorer is set
+        self.rescoring: Optional[Dict[str, Any]] = None
+
+    @property
+    def total_students(self) -> int:
+        return int(self.student_active.sum())
+
+    @property
+    def total_companies(self) -> int:
+        return int(self.company_active.sum())
+
+    def remaining_capacity(self) -> np.ndarray:
+        assigned = self.assignment[self.assignment >= 0]
+        return self.capacity - np.bincount(assigned, minlength=len(self.capacity))
+
+    def matches(self) -> Iterable[Tuple[Dict[str, Any], Dict[str, Any], float]]:
+        """(student, company, score) for every assigned student, best scores first"""
+        assigned = np.nonzero(self.assignment >= 0)[0]
+        for i in assigned[np.argsort(-self.scores[assigned], kind="stable")]:
+            yield self.students[i], self.companies[self.assignment[i]], float(self.scores[i])
+
+    def unallocated(self) -> Iterable[Dict[str, Any]]:
+        for i in np.nonzero(self.student_active & (self.assignment < 0))[0]:
+            yield self.students[i]
+
+    def unfillable(self) -> List[Dict[str, Any]]:
+        """Active positions whose CGPA and experience minimums no active student meets"""
+        if not self.params.enforce_eligibility:
+            return []
+        if self.scorer is not None and self.scorer.constraints is not None:
+            constraints = self.scorer.constraints
+        else:
+            constraints = EligibilityConstraints(self.students, self.companies, strict=self.params.strict_eligibility)
+        blocked = constraints.unfillable(self.student_active) & self.company_active
+        return [self.companies[j] for j in np.nonzero(blocked)[0]]
+
+    def candidate_table(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(student ids, (n, k) candidate company ids with -1 padding, scores) of the active students"""
+        rows = np.nonzero(self.student_active)[0]
+        company_ids = np.append(np.asarray(column(self.companies, "company_id"), dtype=np.int64), -1)
+        # Padding (-1) indexes the appended -1
+        return (
+            np.asarray(column(self.students, "student_id"), dtype=np.int64)[rows],
+            company_ids[self.candidates.rows[rows]],
+            self.candidates.scores[rows],
+        )
+
+
+class Allocator:
+    """Runs allocations and keeps the latest state for incremental re-allocation"""
+
+    def __init__(self, engine: AIAllocationEngine, snapshots: Optional[SnapshotStore] = None):
+        self.engine = engine
+        self.snapshots = snapshots
+        self.state: Optional[AllocationState] = None
+
+    def reset(self):
+        """Forget the retained state, e.g. after a bulk upload replaced the data"""
+        self.state = None
+
+    def encode_students(self, students: List[Dict[str, Any]]) -> np.ndarray:
+        with timed("text_build", len(students)):
+            texts = [self.engine.build_text_representation(s, "student") for s in students]
+        return self.engine.encode_texts(texts).astype(np.float32)
+
+    def encode_companies(self, companies: List[Dict[str, Any]], dimension: int) -> Tuple[np.ndarray, np.ndarray]:
+        with timed("text_build", len(companies)):
+            texts = [self.engine.build_text_representation(c, "company") for c in companies]
+            has_text = np.array([bool(t.strip()) for t in texts], dtype=bool)
+        embeddings = np.zeros((len(companies), dimension), dtype=np.float32)
+        if has_text.any():
+            embeddings[has_text] = self.engine.encode_texts([t for t, ok in zip(texts, has_text) if ok])
+        return embeddings, has_text
+
+    def prepare(self, students: List[Dict[str, Any]], companies: List[Dict[str, Any]]) -> Embeddings:
+        """Student and company embeddings plus the company index, from the shared snapshot when configured"""
+        with timed("text_build", len(students) + len(companies)):
+            student_texts = [self.engine.build_text_representation(s, "student") for s in students]
+            company_texts = [self.engine.build_text_representation(c, "company") for c in companies]
+
+        def build() -> Embeddings:
+            student_embeddings = self.engine.encode_texts(student_texts).astype(np.float32)
+            has_text = np.array([bool(t.strip()) for t in company_texts], dtype=bool)
+            company_embeddings = np.zeros((len(companies), student_embeddings.shape[1]), dtype=np.float32)
+            if has_text.any():
+                company_embeddings[has_text] = self.engine.encode_texts([t for t, ok in zip(company_texts, has_text) if ok])
+            index = self.engine.build_index(company_embeddings[has_text])
+            return Embeddings(student_embeddings, company_embeddings, has_text, index)
+
+        if self.snapshots is None:
+            return build()
+        key = snapshot_key(self.engine.model_name, student_texts, company_texts)
+        return self.snapshots.get_or_build(key, build)
+
+    def allocate(
+        self, students: List[Dict[str, Any]], companies: List[Dict[str, Any]], params: AllocationParams
+    ) -> AllocationState:
+        """Full allocation: encode everyone, score candidate pairs and run the selected assignment algorithm"""
+        start_time = time.time()
+        top_k = params.top_k or (STABLE_TOP_K if params.algorithm == "stable" else None)
+        if params.rescorer:
+            # The second stage only ever sees a bounded shortlist per student
+            top_k = top_k or RESCORE_TOP_K
+
+        # Embeddings and the FAISS index over companies with text, encoded here or mapped from a snapshot
+        embeddings = self.prepare(students, companies)
+        if not embeddings.company_has_text.any():
+            raise ValueError("No company has any text to match against.")
+        student_embeddings = embeddings.students
+        company_embeddings = embeddings.companies
+        company_has_text = embeddings.company_has_text
+
+        # Companies without any text are left out of the index; map index positions back to rows
+        indexed_rows = embeddings.indexed_rows
+
+        with timed("scoring"):
+            scorer = CandidateScorer(students, companies, student_embeddings, company_embeddings, company_has_text, params)
+
+            if top_k:
+                # Sparse path: each student's top-k semantic neighbours are the only candidates
+                student_idx, company_idx, semantic = search_pairs(embeddings.index, indexed_rows, student_embeddings, top_k)
+            elif params.skill_prefilter:
+                # Lexical pre-filter: only pairs sharing at least one skill are scored semantically
+                student_idx, company_idx = scorer.skills.candidate_pairs()
+                semantic = None
+            else:
+                # Dense path: cosine similarity for every pair, pruned with the dense eligibility mask
+                scores_matrix = student_embeddings @ company_embeddings.T
+                student_idx, company_idx = np.nonzero(scorer.eligibility_mask())
+                semantic = scores_matrix[student_idx, company_idx]
+
+            if top_k or params.skill_prefilter:
+                # Prune ineligible candidate pairs
+                keep = scorer.eligible(student_idx, company_idx)
+                student_idx, company_idx = student_idx[keep], company_idx[keep]
+                if semantic is not None:
+                    semantic = semantic[keep]
+            # Blend location and skill overlap in as gathered lookups over the surviving pairs
+            pair_scores = scorer.score(student_idx, company_idx, semantic)
+
+            rescoring = None
+            if params.rescorer:
+                rescorer = get_rescorer(params.rescorer, self.engine)
+                with timed("rescoring", len(student_idx)):
+                    pair_scores, rescoring = rescore_shortlist(
+                        rescorer.bind(students, companies, scorer),
+                        student_idx, company_idx, pair_scores, len(students), len(companies), params,
+                    )
+
+            preference = None
+            if params.algorithm == "stable" and params.student_rankings:
+                # Explicit rankings replace the score-derived preference lists of the students who gave one
+                ranked_s, ranked_c, rank = ranked_pairs(params.student_rankings, students, companies)
+                keep = scorer.eligible(ranked_s, ranked_c)
+                ranked_s, ranked_c, rank = ranked_s[keep], ranked_c[keep], rank[keep]
+                ranked = np.zeros(len(students), dtype=bool)
+                ranked[ranked_s] = True
+                unranked = ~ranked[student_idx]
+                preference = np.concatenate([-pair_scores[unranked], rank])
+                student_idx = np.concatenate([student_idx[unranked], ranked_s])
+                company_idx = np.concatenate([company_idx[unranked], ranked_c])
+                pair_scores = np.concatenate([pair_scores[unranked], scorer.score(ranked_s, ranked_c)])
+
+        capacity = company_capacity(companies)
+        quotas = QuotaBuckets(params.quotas, students, companies, capacity) if params.quotas else None
+        assignment, assigned_scores = assign(
+            params, student_idx, company_idx, pair_scores, capacity, len(students), preference, quotas
+        )
+        if quotas is not None:
+            for bucket in quotas.summary(assignment):
+                logger.info(
+                    f"Quota {bucket['attribute']}={bucket['category']} ({bucket['scope']}): "
+                    f"{bucket['allocated']} allocated, {bucket['reserved']} seats reserved"
+                )
+
+        self.state = AllocationState(students, companies, scorer, capacity, assignment, assigned_scores, params)
+        self.state.rescoring = rescoring
+        with timed("candidates", len(students)):
+            self.state.candidates = Candidates.from_pairs(student_idx, company_idx, pair_scores, len(students))
+        logger.info(
+            f"Allocated {int((assignment >= 0).sum())} of {len(students)} students over "
+            f"{len(student_idx)} candidate pairs in {time.time() - start_time:.2f} seconds"
+        )
+        return self.state
+
+    def can_reallocate(self, params: AllocationParams) -> bool:
+        """Whether the retained state can be repaired and was produced with the same scoring parameters"""
+        if self.state is None or self.state.scorer is None:
+            return False
+        if params.algorithm == "stable" or params.quotas:
+            # The repair is a plain greedy displacement pass: it would not preserve stability or quotas
+            return False
+        if params.rescorer:
+            # Repairs score new pairs with the first stage only
+            return False
+        return self.state.params.model_dump(exclude={"incremental"}) == params.model_dump(exclude={"incremental"})
+
+    def diff(self, student_ids: Iterable[int], company_ids: Iterable[int]) -> Tuple[List[int], List[int], List[int], List[int]]:
+        """(added students, removed students, added companies, removed companies) against the retained state"""
+        state = self.state
+        current_students = set(student_ids)
+        current_companies = set(company_ids)
+        known_students = {sid for sid, row in state.student_row.items() if state.student_active[row]}
+        known_companies = {cid for cid, row in state.company_row.items() if state.company_active[row]}
+        return (
+            sorted(current_students - known_students),
+            sorted(known_students - current_students),
+            sorted(current_companies - known_companies),
+            sorted(known_companies - current_companies),
+        )
+
+    def is_small_change(self, changed_students: int, changed_companies: int) -> bool:
+        state = self.state
+        return (
+            changed_students <= INCREMENTAL_MAX_CHANGE_FRACTION * max(state.total_students, 1)
+            and changed_companies <= INCREMENTAL_MAX_CHANGE_FRACTION * max(state.total_companies, 1)
+        )
+
+    def reallocate(
+        self,
+        added_students: List[Dict[str, Any]],
+        removed_student_ids: List[int],
+        added_companies: List[Dict[str, Any]],
+        removed_company_ids: List[int],
+    ) -> List[int]:
+        """Repair the retained allocation after a small change instead of re-running everything.
+
+        Only the affected neighbourhood is re-scored: new students and students
+        displaced from removed positions compete for seats (taking free ones or
+        displacing a lower-scoring holder, who is then re-placed), and seats
+        left free afterwards are offered to unassigned students. Returns the ids
+        of students whose assignment changed.
+        """
+        start_time = time.time()
+        state = self.state
+        before = state.assignment.copy()
+        pending: List[int] = []
+        freed: List[int] = []
+
+        for sid in removed_student_ids:
+            row = state.student_row.pop(sid)
+            state.student_active[row] = False
+            if state.assignment[row] >= 0:
+                freed.append(int(state.assignment[row]))
+                state.assignment[row] = -1
+        removed_columns = []
+        for cid in removed_company_ids:
+            col = state.company_row.pop(cid)
+            removed_columns.append(col)
+            state.company_active[col] = False
+            state.capacity[col] = 0
+            displaced = np.nonzero(state.assignment == col)[0]
+            state.assignment[displaced] = -1
+            pending.extend(displaced.tolist())
+        added_columns = np.arange(len(state.companies), len(state.companies) + len(added_companies))
+        added_rows = np.arange(len(state.students), len(state.students) + len(added_students))
+
+        if added_companies:
+            embeddings, has_text = self.encode_companies(added_companies, state.scorer.company_embeddings.shape[1])
+            first = len(state.companies)
+            state.scorer.add_companies(added_companies, embeddings, has_text)
+            state.companies.extend(added_companies)
+            state.capacity = np.concatenate([state.capacity, company_capacity(added_companies)])
+            state.company_active = np.concatenate([state.company_active, np.ones(len(added_companies), dtype=bool)])
+            for j, c in enumerate(added_companies, start=first):
+                state.company_row[c["company_id"]] = j
+            freed.extend(range(first, len(state.companies)))
+
+        if added_students:
+            embeddings = self.encode_students(added_students)
+            first = len(state.students)
+            state.scorer.add_students(added_students, embeddings)
+            state.students.extend(added_students)
+            state.assignment = np.concatenate([state.assignment, np.full(len(added_students), -1, dtype=np.int64)])
+            state.scores = np.concatenate([state.scores, np.zeros(len(added_students), dtype=np.float32)])
+            state.student_active = np.concatenate([state.student_active, np.ones(len(added_students), dtype=bool)])
+            for i, s in enumerate(added_students, start=first):
+                state.student_row[s["student_id"]] = i
+            pending.extend(range(first, len(state.students)))
+            before = np.concatenate([before, np.full(len(added_students), -1, dtype=np.int64)])
+
+        self._place(pending)
+        self._fill_free_seats(sorted(set(freed)))
+        if state.candidates is not None:
+            self._update_candidates(np.array(removed_columns, dtype=np.int64), added_columns, added_rows)
+
+        changed_rows = np.nonzero(before != state.assignment)[0]
+        changed = [state.students[i]["student_id"] for i in changed_rows if state.student_active[i]]
+        logger.info(
+            f"Incremental allocation: +{len(added_students)}/-{len(removed_student_ids)} students, "
+            f"+{len(added_companies)}/-{len(removed_company_ids)} positions, {len(changed)} assignments changed "
+            f"in {time.time() - start_time:.3f} seconds"
+        )
+        return changed
+
+    def _place(self, rows: List[int]):
+        """Place students one by one, best candidates first, displacing weaker holders of full positions"""
+        state = self.state
+        remaining = state.remaining_capacity()
+        weakest = np.full(len(state.capacity), np.inf, dtype=np.float32)
+        assigned = np.nonzero(state.assignment >= 0)[0]
+        np.minimum.at(weakest, state.assignment[assigned], state.scores[assigned])
+
+        while rows:
+            block = state.scorer.score_block(np.asarray(rows))
+            block[:, ~state.company_active] = -np.inf
+            displaced: List[int] = []
+            for b in np.argsort(-block.max(axis=1), kind="stable"):
+                row = rows[b]
+                scores = block[b]
+                acceptable = (remaining > 0) | (scores > weakest)
+                best = int(np.argmax(np.where(acceptable, scores, -np.inf)))
+                if not acceptable[best] or not np.isfinite(scores[best]):
+                    continue
+                if remaining[best] <= 0:
+                    # Full position: the newcomer scores higher than its weakest holder
+                    members = np.nonzero(state.assignment == best)[0]
+                    loser = int(members[np.argmin(state.scores[members])])
+                    state.assignment[loser] = -1
+                    displaced.append(loser)
+                    remaining[best] += 1
+                state.assignment[row] = best
+                state.scores[row] = scores[best]
+                remaining[best] -= 1
+                members = np.nonzero(state.assignment == best)[0]
+                weakest[best] = state.scores[members].min()
+            rows = displaced
+
+    def _update_candidates(self, removed_columns: np.ndarray, added_columns: np.ndarray, added_rows: np.ndarray):
+        """Drop removed positions from the candidate lists and score new students and positions into them"""
+        state = self.state
+        candidates = state.candidates
+        if len(removed_columns):
+            candidates = candidates.without_columns(removed_columns)
+        pairs = []
+        if len(added_rows):
+            block = state.scorer.score_block(added_rows)
+            block[:, ~state.company_active] = -np.inf
+            local_s, local_c = np.nonzero(np.isfinite(block))
+            pairs.append((added_rows[local_s], local_c, block[local_s, local_c]))
+        if len(added_columns):
+            # New students were scored against every position above; score the others against the new positions
+            rows = np.nonzero(state.student_active[:len(state.students) - len(added_rows)])[0]
+            block = state.scorer.score_block(rows, added_columns)
+            local_s, local_c = np.nonzero(np.isfinite(block))
+            pairs.append((rows[local_s], added_columns[local_c], block[local_s, local_c]))
+        if pairs:
+            student_idx, company_idx, scores = (np.concatenate(part) for part in zip(*pairs))
+            candidates = candidates.merge(student_idx, company_idx, scores, len(state.students))
+        state.candidates = candidates
+
+    def _fill_free_seats(self, columns: List[int]):
+        """Offer seats still free on the given positions to the best unassigned students"""
+        state = self.state
+        remaining = state.remaining_capacity()
+        columns = np.array([c for c in columns if state.company_active[c] and remaining[c] > 0], dtype=np.int64)
+        free_students = np.nonzero(state.student_active & (state.assignment < 0))[0]
+        if len(columns) == 0 or len(free_students) == 0:
+            return
+        block = state.scorer.score_block(free_students, columns)
+        local_s, local_c = np.nonzero(np.isfinite(block))
+        assignment, scores = greedy_assign(
+            local_s, local_c, block[local_s, local_c], remaining[columns], len(free_students)
+        )
+        placed = assignment >= 0
+        state.assignment[free_students[placed]] = columns[assignment[placed]]
+        state.scores[free_students[placed]] = scores[placed]
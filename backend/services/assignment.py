@@ -0,0 +1,201 @@
+import numpy as np
+import heapq
+from typing import Optional, Tuple
+
+
+def greedy_assign(
+    student_idx: np.ndarray,
+    company_idx: np.ndarray,
+    scores: np.ndarray,
+    capacity: np.ndarray,
+    n_students: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Greedy one-student-per-opening assignment over candidate pairs.
+
+    Pairs are visited in descending score order (ties keep input order) and a
+    pair is accepted when the student is still free and the company has
+    openings left. Returns `(assignment, assigned_scores)` where
+    `assignment[i]` is the company index for student i or -1.
+    """
+    assignment = np.full(n_students, -1, dtype=np.int64)
+    assigned_scores = np.zeros(n_students, dtype=np.float32)
+    remaining = np.asarray(capacity, dtype=np.int64).copy()
+    seats_left = int(remaining.sum())
+    students_left = n_students
+
+    order = np.argsort(-scores, kind="stable")
+    for sid, cid, score in zip(student_idx[order].tolist(), company_idx[order].tolist(), scores[order].tolist()):
+        if seats_left <= 0 or students_left <= 0:
+            break
+        if assignment[sid] >= 0 or remaining[cid] <= 0:
+            continue
+        assignment[sid] = cid
+        assigned_scores[sid] = score
+        remaining[cid] -= 1
+        seats_left -= 1
+        students_left -= 1
+
+    return assignment, assigned_scores
+
+
+def stable_assign(
+    student_idx: np.ndarray,
+    company_idx: np.ndarray,
+    scores: np.ndarray,
+    capacity: np.ndarray,
+    n_students: int,
+    preference: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Capacity-aware, student-proposing deferred acceptance (Gale-Shapley) over candidate pairs.
+
+    Each student's preference list is their candidate pairs ordered by
+    ascending `preference` (default: descending score); companies rank
+    proposers by score, ties going to the lower student index. Lists are laid
+    out CSR-style with one proposal pointer per student, and each company
+    holds its tentative admits in a min-heap of size `capacity`, so the run is
+    O(proposals x log capacity). Returns `(assignment, assigned_scores)` like
+    `greedy_assign`.
+    """
+    assignment = np.full(n_students, -1, dtype=np.int64)
+    assigned_scores = np.zeros(n_students, dtype=np.float32)
+    if preference is None:
+        preference = -scores
+
+    order = np.lexsort((preference, student_idx))
+    choices = company_idx[order].tolist()
+    choice_scores = scores[order].tolist()
+    indptr = np.zeros(n_students + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(student_idx, minlength=n_students))
+    next_choice = indptr[:-1].tolist()
+    list_end = indptr[1:].tolist()
+    seats = np.asarray(capacity, dtype=np.int64).tolist()
+
+    # Heap entries are (score, -student) so the root is the admit a company likes least
+    held = [[] for _ in seats]
+    free = [s for s in range(n_students - 1, -1, -1) if next_choice[s] < list_end[s]]
+    while free:
+        s = free.pop()
+        p, end = next_choice[s], list_end[s]
+        while p < end:
+            c = choices[p]
+            entry = (choice_scores[p], -s)
+            p += 1
+            heap = held[c]
+            if len(heap) < seats[c]:
+                heapq.heappush(heap, entry)
+                break
+            if heap and entry > heap[0]:
+                _, rejected = heapq.heapreplace(heap, entry)
+                free.append(-rejected)
+                break
+        next_choice[s] = p
+
+    for c, heap in enumerate(held):
+        for score, neg_student in heap:
+            assignment[-neg_student] = c
+            assigned_scores[-neg_student] = score
+
+    return assignment, assigned_scores
+
+
+def quota_assign(
+    student_idx: np.ndarray,
+    company_idx: np.ndarray,
+    scores: np.ndarray,
+    capacity: np.ndarray,
+    n_students: int,
+    groups: np.ndarray,
+    reserved: np.ndarray,
+    global_reserved: np.ndarray,
+    release_unfilled: bool = True,
+    layers: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Greedy assignment with seats reserved per category (multi-bucket greedy).
+
+    `groups` is an (n_students, Q) membership matrix, `reserved` the (n_companies, Q)
+    seats each position holds back for every category and `global_reserved`
+    the (Q,) seats held back across all positions. `layers` gives each rule's
+    layer (its attribute; one layer when omitted): the rules of a layer split
+    the seats between them, while layers overlap, so an SC seat can also be a
+    Female seat. Pairs are visited in descending score order; in every layer
+    a student takes an open seat while there is one, otherwise a reserved
+    seat of one of their categories, and is placed only if every layer has
+    room. Reserved seats no category member could take are released to
+    everyone in a final greedy pass when `release_unfilled` is set.
+    """
+    n_rules = len(global_reserved)
+    layers = np.zeros(n_rules, dtype=np.int64) if layers is None else np.asarray(layers, dtype=np.int64)
+    n_layers = int(layers.max()) + 1 if n_rules else 0
+    remaining = np.asarray(capacity, dtype=np.int64).copy()
+    reserved_left = np.asarray(reserved, dtype=np.int64).copy()
+    global_left = np.asarray(global_reserved, dtype=np.int64).tolist()
+    open_seats = [(remaining - reserved_left[:, layers == layer].sum(axis=1)).tolist() for layer in range(n_layers)]
+    open_global = [
+        sum(open_seats[layer]) - sum(global_left[q] for q in range(n_rules) if layers[q] == layer)
+        for layer in range(n_layers)
+    ]
+    reserved_left = reserved_left.tolist()
+    member_rows, member_quotas = np.nonzero(groups)
+    member_of = {}
+    for row, quota in zip(member_rows.tolist(), member_quotas.tolist()):
+        member_of.setdefault(row, [[] for _ in range(n_layers)])[int(layers[quota])].append(quota)
+    no_membership = [[] for _ in range(n_layers)]
+
+    assignment = [-1] * n_students
+    assigned_scores = [0.0] * n_students
+    seats = remaining.tolist()
+    seats_left = sum(seats)
+    students_left = n_students
+
+    order = np.argsort(-scores, kind="stable")
+    for sid, cid, score in zip(student_idx[order].tolist(), company_idx[order].tolist(), scores[order].tolist()):
+        if seats_left <= 0 or students_left <= 0:
+            break
+        if assignment[sid] >= 0 or seats[cid] <= 0:
+            continue
+        # (layer, rule or None for an open seat, whether the rule's seat is a global one) per layer
+        picks = []
+        memberships = member_of.get(sid, no_membership)
+        for layer in range(n_layers):
+            if open_seats[layer][cid] > 0 and open_global[layer] > 0:
+                picks.append((layer, None, False))
+                continue
+            for quota in memberships[layer]:
+                if reserved_left[cid][quota] > 0:
+                    picks.append((layer, quota, False))
+                    break
+                if global_left[quota] > 0 and open_seats[layer][cid] > 0:
+                    picks.append((layer, quota, True))
+                    break
+            else:
+                break
+        if len(picks) < n_layers:
+            continue
+        for layer, quota, is_global in picks:
+            if quota is None:
+                open_seats[layer][cid] -= 1
+                open_global[layer] -= 1
+            elif is_global:
+                global_left[quota] -= 1
+                open_seats[layer][cid] -= 1
+            else:
+                reserved_left[cid][quota] -= 1
+        assignment[sid] = cid
+        assigned_scores[sid] = score
+        seats[cid] -= 1
+        seats_left -= 1
+        students_left -= 1
+
+    assignment = np.array(assignment, dtype=np.int64)
+    assigned_scores = np.array(assigned_scores, dtype=np.float32)
+    if release_unfilled and seats_left > 0 and students_left > 0:
+        seats = np.array(seats, dtype=np.int64)
+        keep = (assignment[student_idx] < 0) & (seats[company_idx] > 0)
+        released, released_scores = greedy_assign(
+            student_idx[keep], company_idx[keep], scores[keep], seats, n_students
+        )
+        placed = released >= 0
+        assignment[placed] = released[placed]
+        assigned_scores[placed] = released_scores[placed]
+
+    return assignment, assigned_scores
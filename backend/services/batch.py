@@ -0,0 +1,335 @@
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import csv
+import gzip
+import os
+import time
+import logging
+
+from core.schemas import AllocationParams
+from services.ai_engine import AIAllocationEngine
+from services.allocation import (
+    COMPANY_FIELDS, STUDENT_FIELDS, Allocator, CandidateScorer, assign, company_capacity, search_pairs,
+)
+from services.ingest import company_from_row, student_from_row
+from services.loader import Records, column
+from services.metrics import timed
+from services.quotas import QuotaBuckets
+from services.sharding import attach_array, share_array
+
+logger = logging.getLogger(__name__)
+
+# Rows read, encoded and scored per chunk; bounds the memory of one chunk in flight
+BATCH_CHUNK_ROWS = int(os.getenv("BATCH_CHUNK_ROWS", "50000"))
+
+# Candidates per student when the parameters give no top_k; batch runs always use the sparse path
+BATCH_TOP_K = 50
+
+# Rejected rows logged individually per file; the rest are only counted
+MAX_LOGGED_ERRORS = 20
+
+# Student fields kept after scoring, for the output and quota rules
+OUTPUT_STUDENT_FIELDS = ("student_id", "first_name", "last_name")
+
+# mapper, fields, id field, id column in the file
+_SOURCES = {
+    "student": (student_from_row, STUDENT_FIELDS, "student_id", "student_id"),
+    "company": (company_from_row, COMPANY_FIELDS, "company_id", "position_id"),
+}
+
+
+def is_parquet(path: str) -> bool:
+    return path.endswith((".parquet", ".pq"))
+
+
+def read_rows(path: str, chunk_rows: int = BATCH_CHUNK_ROWS) -> Iterator[List[Dict[str, Optional[str]]]]:
+    """Raw rows of a CSV (optionally compressed) or Parquet file in chunks, as strings with None for empty cells"""
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield [
+                {name: None if value is None else str(value) for name, value in row.items()}
+                for row in batch.to_pylist()
+            ]
+        return
+    import pandas as pd
+    for frame in pd.read_csv(path, chunksize=chunk_rows, dtype=str):
+        yield frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+def read_records(path: str, kind: str, chunk_rows: int = BATCH_CHUNK_ROWS) -> Iterator[Records]:
+    """Student or position rows mapped as by the CSV upload, in Records chunks of the matching fields.
+
+    Ids come from the file's `student_id` / `position_id` column when it
+    has one and are the 1-based row number otherwise. Rows that fail to map
+    are logged and skipped.
+    """
+    mapper, fields, id_field, id_column = _SOURCES[kind]
+    row_number = 0
+    rejected = 0
+    for rows in read_rows(path, chunk_rows):
+        with timed("csv_parse", len(rows)):
+            columns: Dict[str, Any] = {name: [] for name in fields}
+            for row in rows:
+                row_number += 1
+                try:
+                    mapped = mapper(row)
+                    mapped[id_field] = int(row[id_column]) if id_column in row else row_number
+                except Exception as e:
+                    rejected += 1
+                    if rejected <= MAX_LOGGED_ERRORS:
+                        logger.warning(f"{path}, row {row_number + 1}: {e}")
+                    continue
+                for name in fields:
+                    columns[name].append(mapped.get(name))
+            columns[id_field] = np.array(columns[id_field], dtype=np.int64)
+        yield Records(columns)
+    if rejected:
+        logger.warning(f"{path}: rejected {rejected} of {row_number} rows")
+
+
+# Scoring context of the current process, set once per worker by the pool initializer
+_context: Dict[str, Any] = {}
+
+
+def _set_context(
+    engine: AIAllocationEngine, companies: Records, company_embeddings: np.ndarray,
+    company_has_text: np.ndarray, params: AllocationParams, top_k: int,
+):
+    _context.update(
+        engine=engine,
+        companies=companies,
+        company_embeddings=company_embeddings,
+        company_has_text=company_has_text,
+        indexed_rows=np.nonzero(company_has_text)[0],
+        index=engine.build_index(company_embeddings[company_has_text]),
+        params=params,
+        top_k=top_k,
+    )
+
+
+def _init_worker(model_name: str, companies: Records, company_embeddings, company_has_text: np.ndarray, params: AllocationParams, top_k: int):
+    """Pool initializer: own model, company embeddings from shared memory and a local index"""
+    _set_context(AIAllocationEngine(model_name), companies, attach_array(company_embeddings), company_has_text, params, top_k)
+
+
+def score_chunk(students: Records) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Encode one chunk of students and score their top-k positions: (row in chunk, company row, score)"""
+    if not len(students):
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+    engine = _context["engine"]
+    with timed("text_build", len(students)):
+        texts = [engine.build_text_representation(s, "student") for s in students]
+    embeddings = engine.encode_texts(texts).astype(np.float32)
+    with timed("scoring", len(students)):
+        student_idx, company_idx, semantic = search_pairs(
+            _context["index"], _context["indexed_rows"], embeddings, _context["top_k"]
+        )
+        scorer = CandidateScorer(
+            students, _context["companies"], embeddings,
+            _context["company_embeddings"], _context["company_has_text"], _context["params"],
+        )
+        keep = scorer.eligible(student_idx, company_idx)
+        student_idx, company_idx, semantic = student_idx[keep], company_idx[keep], semantic[keep]
+        scores = scorer.score(student_idx, company_idx, semantic)
+    # Compact dtypes: these pairs are all that is kept of the chunk until assignment
+    return student_idx.astype(np.int32), company_idx.astype(np.int32), scores
+
+
+def _scored_chunks(chunks: Iterator[Records], workers: int, initargs: Tuple) -> Iterator[Tuple[Records, Tuple[np.ndarray, np.ndarray, np.ndarray]]]:
+    """(chunk, score_chunk result) in input order, with at most two chunks per worker in flight"""
+    # spawn rather than fork: the parent has torch loaded, and forked torch thread pools can deadlock
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"), initializer=_init_worker, initargs=initargs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(score_chunk, chunk)))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+def _results_writer(path: str):
+    if is_parquet(path):
+        return ParquetResultWriter(path)
+    return CSVResultWriter(path)
+
+
+class CSVResultWriter:
+    """Result rows appended to a CSV file (gzip-compressed for .gz), in the /allocate/export columns"""
+
+    COLUMNS = ("student_id", "student_name", "company_id", "company_name", "score")
+
+    def __init__(self, path: str):
+        self.file = gzip.open(path, "wt", newline="") if path.endswith(".gz") else open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.COLUMNS)
+
+    def write(self, columns: Dict[str, List[Any]]):
+        self.writer.writerows(zip(*(columns[name] for name in self.COLUMNS)))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetResultWriter:
+    """Result rows appended to a Parquet file, one row group per write"""
+
+    def __init__(self, path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.schema([
+            ("student_id", pa.int64()),
+            ("student_name", pa.string()),
+            ("company_id", pa.int64()),
+            ("company_name", pa.string()),
+            ("score", pa.float32()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, columns: Dict[str, List[Any]]):
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def write_results(
+    path: str, students: Records, companies: Records, assignment: np.ndarray, scores: np.ndarray,
+    include_unallocated: bool = False, chunk_rows: int = BATCH_CHUNK_ROWS,
+) -> int:
+    """Stream matches (best scores first) and optionally unallocated students to a CSV or Parquet file"""
+    assigned = np.nonzero(assignment >= 0)[0]
+    order = assigned[np.argsort(-scores[assigned], kind="stable")]
+    if include_unallocated:
+        order = np.concatenate([order, np.nonzero(assignment < 0)[0]])
+    student_ids, first_names, last_names = (students.column(name) for name in OUTPUT_STUDENT_FIELDS)
+    company_ids = companies.column("company_id")
+    company_names = column(companies, "company_name")
+
+    writer = _results_writer(path)
+    try:
+        with timed("batch_write", len(order)):
+            for start in range(0, len(order), chunk_rows):
+                rows = order[start:start + chunk_rows]
+                placed = assignment[rows]
+                writer.write({
+                    "student_id": student_ids[rows].tolist(),
+                    "student_name": [f"{first_names[i]} {last_names[i]}" for i in rows],
+                    "company_id": [int(company_ids[j]) if j >= 0 else None for j in placed],
+                    "company_name": [company_names[j] if j >= 0 else None for j in placed],
+                    "score": [float(scores[i]) if j >= 0 else None for i, j in zip(rows, placed)],
+                })
+    finally:
+        writer.close()
+    return len(order)
+
+
+def allocate_files(
+    students_path: str,
+    companies_path: str,
+    output_path: str,
+    params: AllocationParams,
+    model_name: str,
+    workers: int = 1,
+    chunk_rows: int = BATCH_CHUNK_ROWS,
+    include_unallocated: bool = False,
+) -> Dict[str, Any]:
+    """Allocate students to positions straight from files, without the server or the database.
+
+    Positions are read whole, encoded once and indexed in every worker.
+    Students are streamed in chunks: each chunk is mapped, encoded and scored
+    against its top-k positions in a worker process, and only the compact
+    candidate pairs plus the id and name columns are kept. The selected
+    assignment algorithm then runs over all pairs and the result is written
+    back out in chunks. Memory therefore grows with the pairs (students x
+    top_k) rather than with the texts or embeddings of the whole cohort.
+    """
+    start_time = time.time()
+    if params.incremental or params.sharded or params.student_rankings:
+        raise ValueError("incremental, sharded and student_rankings are not supported in batch runs.")
+    top_k = params.top_k or BATCH_TOP_K
+
+    companies: Optional[Records] = None
+    for chunk in read_records(companies_path, "company", chunk_rows):
+        if companies is None:
+            companies = chunk
+        else:
+            companies.extend(chunk)
+    if companies is None or not len(companies):
+        raise ValueError(f"No positions in {companies_path}")
+
+    engine = AIAllocationEngine(model_name)
+    engine.load_model()
+    company_embeddings, company_has_text = Allocator(engine).encode_companies(
+        companies, engine.model.get_sentence_embedding_dimension()
+    )
+    if not company_has_text.any():
+        raise ValueError("No company has any text to match against.")
+
+    kept_fields = OUTPUT_STUDENT_FIELDS + tuple(dict.fromkeys(rule.attribute for rule in params.quotas or []))
+    kept: Dict[str, List[Any]] = {name: [] for name in kept_fields}
+    student_idx, company_idx, pair_scores = [], [], []
+    offset = 0
+
+    students_in = read_records(students_path, "student", chunk_rows)
+    if workers > 1:
+        block, handle = share_array(company_embeddings)
+        scored = _scored_chunks(students_in, workers, (model_name, companies, handle, company_has_text, params, top_k))
+    else:
+        block = None
+        _set_context(engine, companies, company_embeddings, company_has_text, params, top_k)
+        scored = ((chunk, score_chunk(chunk)) for chunk in students_in)
+    try:
+        for chunk, (rows, columns, scores) in scored:
+            for name in kept_fields:
+                kept[name].append(chunk.column(name))
+            student_idx.append(rows.astype(np.int64) + offset)
+            company_idx.append(columns.astype(np.int64))
+            pair_scores.append(scores)
+            offset += len(chunk)
+            logger.info(f"Scored {offset} students, {sum(len(s) for s in pair_scores)} candidate pairs")
+    finally:
+        if block is not None:
+            block.close()
+            block.unlink()
+        _context.clear()
+
+    if not offset:
+        raise ValueError(f"No students in {students_path}")
+    students = Records({
+        name: np.concatenate(parts) if name == "student_id" else [value for part in parts for value in part]
+        for name, parts in kept.items()
+    })
+    student_idx, company_idx, pair_scores = (
+        np.concatenate(parts) for parts in (student_idx, company_idx, pair_scores)
+    )
+
+    capacity = company_capacity(companies)
+    quotas = QuotaBuckets(params.quotas, students, companies, capacity) if params.quotas else None
+    assignment, assigned_scores = assign(
+        params, student_idx, company_idx, pair_scores, capacity, len(students), None, quotas
+    )
+    written = write_results(output_path, students, companies, assignment, assigned_scores, include_unallocated, chunk_rows)
+
+    allocated = int((assignment >= 0).sum())
+    summary = {
+        "total_students": len(students),
+        "total_companies": len(companies),
+        "allocated_count": allocated,
+        "unallocated_count": len(students) - allocated,
+        "candidate_pairs": len(pair_scores),
+        "rows_written": written,
+        "processing_time": round(time.time() - start_time, 2),
+    }
+    logger.info(
+        f"Batch allocation: {allocated} of {len(students)} students placed over {len(pair_scores)} "
+        f"candidate pairs on {workers} workers in {summary['processing_time']:.2f} seconds"
+    )
+    return summary
@@ -0,0 +1,216 @@
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+import json
+import os
+import re
+import shutil
+import threading
+import logging
+
+from services.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Best-scoring candidate positions kept per student and run
+CANDIDATE_TOP_K = int(os.getenv("CANDIDATE_TOP_K", "10"))
+
+# Directory for the per-run candidate tables, one subdirectory per cohort; empty disables them
+CANDIDATE_DIR = os.getenv("CANDIDATE_DIR", "candidates")
+
+# Candidate tables kept on disk per cohort, newest runs first
+CANDIDATE_KEEP = int(os.getenv("CANDIDATE_KEEP", "4"))
+
+# Mapped tables kept open per cohort
+_MAPPED_TABLES = 4
+
+_TABLE_NAME = re.compile(r"^run-\d+(-\d+)?$")
+
+
+def run_key(run_id: int, created_at: datetime) -> str:
+    """Candidate table name of a run: run ids are reused once a cohort's runs are deleted, their creation times are not"""
+    return f"{run_id}-{int(created_at.replace(tzinfo=timezone.utc).timestamp() * 1e6)}"
+
+
+def _created(key: str) -> int:
+    # Tables of older versions are named by run id only and sort as the oldest
+    return int(key.rsplit("-", 1)[1]) if "-" in key else 0
+
+
+def _sort_key(student_idx: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """int64 keys ordering pairs by student row, then by descending score.
+
+    The float32 bit pattern is mapped to an order-preserving integer, so one
+    integer argsort replaces a much slower two-key lexsort.
+    """
+    bits = np.asarray(scores, dtype=np.float32).view(np.int32).astype(np.int64)
+    ordered = np.where(bits < 0, -(bits & 0x7FFFFFFF), bits)
+    return (np.asarray(student_idx, dtype=np.int64) << 33) + (2 ** 31 - ordered)
+
+
+class Candidates:
+    """Each student's best candidate positions of a run: (n_students, k) company rows and scores, best first.
+
+    Rows with fewer than k candidates are padded with -1 and -inf.
+    """
+
+    def __init__(self, rows: np.ndarray, scores: np.ndarray):
+        self.rows = rows
+        self.scores = scores
+
+    @property
+    def top_k(self) -> int:
+        return self.rows.shape[1]
+
+    @classmethod
+    def from_pairs(
+        cls, student_idx: np.ndarray, company_idx: np.ndarray, scores: np.ndarray, n_students: int, top_k: int = CANDIDATE_TOP_K
+    ) -> "Candidates":
+        """Top-k scored (student row, company row) pairs per student; each pair must occur at most once"""
+        order = np.argsort(_sort_key(student_idx, scores))
+        student_idx = student_idx[order]
+        rank = np.arange(len(student_idx)) - np.searchsorted(student_idx, student_idx)
+        top = rank < top_k
+        rows = np.full((n_students, top_k), -1, dtype=np.int64)
+        best = np.full((n_students, top_k), -np.inf, dtype=np.float32)
+        rows[student_idx[top], rank[top]] = company_idx[order[top]]
+        best[student_idx[top], rank[top]] = scores[order[top]]
+        return cls(rows, best)
+
+    def pairs(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(student row, company row, score) of every stored candidate"""
+        student_idx, rank = np.nonzero(self.rows >= 0)
+        return student_idx, self.rows[student_idx, rank], self.scores[student_idx, rank]
+
+    def merge(self, student_idx: np.ndarray, company_idx: np.ndarray, scores: np.ndarray, n_students: int) -> "Candidates":
+        """Candidates with newly scored pairs (new students or positions) folded in, grown to `n_students` rows"""
+        old_s, old_c, old_scores = self.pairs()
+        return Candidates.from_pairs(
+            np.concatenate([old_s, np.asarray(student_idx, dtype=np.int64)]),
+            np.concatenate([old_c, np.asarray(company_idx, dtype=np.int64)]),
+            np.concatenate([old_scores, np.asarray(scores, dtype=np.float32)]),
+            n_students,
+            self.top_k,
+        )
+
+    def without_columns(self, columns: np.ndarray) -> "Candidates":
+        """Candidates with the given company rows removed, e.g. deleted positions"""
+        student_idx, company_idx, scores = self.pairs()
+        keep = ~np.isin(company_idx, columns)
+        return Candidates.from_pairs(student_idx[keep], company_idx[keep], scores[keep], len(self.rows), self.top_k)
+
+
+class CandidateTable:
+    """Memory-mapped candidate table of one run, looked up by student id in O(1).
+
+    `lookup[student_id - base]` is the student's row in the (n, k)
+    `company_ids` and float16 `scores` matrices, or -1.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.base = json.load(f)["base"]
+        self.lookup = np.load(os.path.join(path, "lookup.npy"), mmap_mode="r")
+        self.company_ids = np.load(os.path.join(path, "company_ids.npy"), mmap_mode="r")
+        self.scores = np.load(os.path.join(path, "scores.npy"), mmap_mode="r")
+
+    def get(self, student_id: int) -> Optional[List[Tuple[int, float]]]:
+        """(company_id, score) candidates of a student, best first; None if the student was not in the run"""
+        offset = student_id - self.base
+        if offset < 0 or offset >= len(self.lookup) or self.lookup[offset] < 0:
+            return None
+        row = int(self.lookup[offset])
+        return [
+            (int(company_id), float(score))
+            for company_id, score in zip(self.company_ids[row], self.scores[row])
+            if company_id >= 0
+        ]
+
+    def pairs(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(student_id, company_id, score) of every stored candidate, for re-ranking or re-assignment without encoding"""
+        offsets = np.nonzero(self.lookup >= 0)[0]
+        student_ids = np.empty(len(self.company_ids), dtype=np.int64)
+        student_ids[self.lookup[offsets]] = offsets + self.base
+        rows, rank = np.nonzero(self.company_ids >= 0)
+        return student_ids[rows], self.company_ids[rows, rank], self.scores[rows, rank].astype(np.float32)
+
+
+class CandidateStore:
+    """Per-run candidate tables of one cohort, written once per run and mapped read-only by every worker.
+
+    Each table is a directory `run-<run key>` (see `run_key`) written under
+    a temporary name and renamed into place, so readers never see a partial
+    table.
+    """
+
+    def __init__(self, directory: str, keep: int = CANDIDATE_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self._mapped: "OrderedDict[str, CandidateTable]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"run-{key}")
+
+    def _keys(self) -> List[str]:
+        """Keys of the stored tables, newest run first"""
+        keys = [name[4:] for name in os.listdir(self.directory) if _TABLE_NAME.match(name)]
+        return sorted(keys, key=_created, reverse=True)
+
+    def write(self, key: str, student_ids: np.ndarray, company_ids: np.ndarray, scores: np.ndarray):
+        """Store a run's (n, k) candidate company ids and scores of the students `student_ids`, replacing any table under `key`"""
+        with timed("candidates_write", len(student_ids)):
+            student_ids = np.asarray(student_ids, dtype=np.int64)
+            base = int(student_ids.min()) if len(student_ids) else 0
+            span = int(student_ids.max()) - base + 1 if len(student_ids) else 0
+            lookup = np.full(span, -1, dtype=np.int32)
+            lookup[student_ids - base] = np.arange(len(student_ids), dtype=np.int32)
+
+            staging = os.path.join(self.directory, f".run-{key}.{os.getpid()}.tmp")
+            os.makedirs(staging, exist_ok=True)
+            np.save(os.path.join(staging, "lookup.npy"), lookup)
+            np.save(os.path.join(staging, "company_ids.npy"), np.ascontiguousarray(company_ids, dtype=np.int64))
+            np.save(os.path.join(staging, "scores.npy"), np.ascontiguousarray(scores, dtype=np.float16))
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump({"base": base, "top_k": int(company_ids.shape[1])}, f)
+            if os.path.isdir(self._path(key)):
+                # Move the old table aside first, so the name is missing only between two renames
+                retired = os.path.join(self.directory, f".run-{key}.{os.getpid()}.old")
+                os.rename(self._path(key), retired)
+                os.rename(staging, self._path(key))
+                shutil.rmtree(retired, ignore_errors=True)
+            else:
+                os.rename(staging, self._path(key))
+            with self._lock:
+                self._mapped.pop(key, None)
+        self.prune()
+
+    def table(self, key: str) -> Optional[CandidateTable]:
+        """The mapped candidate table of a run, or None if it was not stored or has been pruned"""
+        with self._lock:
+            table = self._mapped.get(key)
+            if table is not None:
+                self._mapped.move_to_end(key)
+                return table
+        if not os.path.isdir(self._path(key)):
+            return None
+        table = CandidateTable(self._path(key))
+        with self._lock:
+            self._mapped[key] = table
+            while len(self._mapped) > _MAPPED_TABLES:
+                self._mapped.popitem(last=False)
+        return table
+
+    def prune(self):
+        """Remove all but the newest `keep` tables; mappings held by readers outlive the unlinked files"""
+        for key in self._keys()[self.keep:]:
+            shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def clear(self):
+        """Remove every table, e.g. when the cohort's runs are deleted"""
+        for key in self._keys():
+            shutil.rmtree(self._path(key), ignore_errors=True)
+        with self._lock:
+            self._mapped.clear()
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from typing import Optional
+import os
+import re
+import threading
+import logging
+
+from core.models import DEFAULT_COHORT
+from services.ai_engine import AIAllocationEngine
+from services.allocation import Allocator
+from services.candidates import CandidateStore
+from services.result_cache import SingleFlightCache
+from services.snapshots import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+# Cohorts whose engine state (retained run, mapped snapshot) is kept in memory
+COHORT_CACHE_SIZE = int(os.getenv("COHORT_CACHE_SIZE", "16"))
+
+# Memoized allocation results kept per worker, shared by all cohorts and bounded by
+# count and by the allocation and unallocated rows they hold in total
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "64"))
+RESULT_CACHE_MAX_ROWS = int(os.getenv("RESULT_CACHE_MAX_ROWS", "1000000"))
+
+# Cohort ids appear in URLs and snapshot directory names
+COHORT_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+def valid_cohort_id(cohort_id: str) -> bool:
+    return bool(COHORT_ID_PATTERN.match(cohort_id))
+
+
+class Cohort:
+    """Engine state of one cohort (placement drive).
+
+    Each cohort has its own allocator (retained run for incremental repairs,
+    snapshot store under its own directory), its own run lock and candidate
+    tables, so drives allocate concurrently and never evict each other's
+    state. The model, its embedding cache and the result cache (keyed by
+    cohort) are shared.
+    """
+
+    def __init__(
+        self, cohort_id: str, allocator: Allocator, cache: SingleFlightCache, candidates: Optional[CandidateStore] = None
+    ):
+        self.cohort_id = cohort_id
+        self.allocator = allocator
+        self.candidates = candidates
+        self.lock = threading.Lock()
+        self.cache = cache
+
+
+def result_rows(value) -> int:
+    """Rows held by a cached (AllocationResponse, run_id) entry"""
+    response, _ = value
+    return len(response.allocations) + len(response.unallocated_students)
+
+
+class CohortRegistry:
+    """Per-cohort engine state, created on first use and kept for the most recently used cohorts.
+
+    A cohort dropped from the registry loses only in-memory state: its next
+    run is a full one and results are recomputed, its data stays in the
+    database.
+    """
+
+    def __init__(
+        self,
+        engine: AIAllocationEngine,
+        snapshot_dir: Optional[str] = None,
+        candidate_dir: Optional[str] = None,
+        max_cohorts: int = COHORT_CACHE_SIZE,
+    ):
+        self.engine = engine
+        self.snapshot_dir = snapshot_dir
+        self.candidate_dir = candidate_dir
+        self.max_cohorts = max_cohorts
+        self._cohorts: "OrderedDict[str, Cohort]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.results = SingleFlightCache(RESULT_CACHE_SIZE, RESULT_CACHE_MAX_ROWS, result_rows)
+
+    def get(self, cohort_id: str = DEFAULT_COHORT) -> Cohort:
+        with self._lock:
+            cohort = self._cohorts.get(cohort_id)
+            if cohort is None:
+                snapshots = SnapshotStore(os.path.join(self.snapshot_dir, cohort_id)) if self.snapshot_dir else None
+                candidates = CandidateStore(os.path.join(self.candidate_dir, cohort_id)) if self.candidate_dir else None
+                cohort = self._cohorts[cohort_id] = Cohort(cohort_id, Allocator(self.engine, snapshots), self.results, candidates)
+                while len(self._cohorts) > self.max_cohorts:
+                    evicted, _ = self._cohorts.popitem(last=False)
+                    logger.info(f"Dropped engine state of cohort {evicted}")
+            self._cohorts.move_to_end(cohort_id)
+            return cohort
@@ -0,0 +1,133 @@
+import numpy as np
+from typing import List, Dict, Any, Optional
+import logging
+
+from services.loader import column
+
+logger = logging.getLogger(__name__)
+
+
+def numeric_column(records: List[Dict[str, Any]], key: str) -> np.ndarray:
+    """Collect a numeric field into a float32 array, with NaN for missing values"""
+    values = column(records, key)
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float32)
+
+
+class EligibilityConstraints:
+    """Hard requirements compiled into vectorized student x company checks.
+
+    Student and company attributes are stored once as typed arrays; `mask()`
+    broadcasts them into a dense boolean matrix and `pair_mask()` evaluates an
+    arbitrary list of (student, company) index pairs, so both the dense and the
+    candidate-list scoring paths prune with the same rules. Rows can be
+    appended with `add_students` / `add_companies` without recompiling.
+
+    Minimums are always enforced, whoever is in the cohort; `unfillable()`
+    reports the positions whose minimums no student meets.
+    """
+
+    def __init__(
+        self,
+        students: List[Dict[str, Any]],
+        companies: List[Dict[str, Any]],
+        require_same_state: bool = False,
+        strict: bool = False,
+    ):
+        self.require_same_state = require_same_state
+        self.strict = strict
+        self._states: Dict[str, int] = {}
+
+        self.student_cgpa = np.zeros(0, dtype=np.float32)
+        self.student_experience = np.zeros(0, dtype=np.float32)
+        self.student_state = np.zeros(0, dtype=np.int32)
+        self.company_min_cgpa = np.zeros(0, dtype=np.float32)
+        self.company_min_experience = np.zeros(0, dtype=np.float32)
+        self.company_state = np.zeros(0, dtype=np.int32)
+        self.add_students(students)
+        self.add_companies(companies)
+
+    @property
+    def n_students(self) -> int:
+        return len(self.student_cgpa)
+
+    @property
+    def n_companies(self) -> int:
+        return len(self.company_min_cgpa)
+
+    def _state_codes(self, labels: List[Optional[str]]) -> np.ndarray:
+        """Case-insensitive integer codes for state names, -1 when missing"""
+        codes = np.full(len(labels), -1, dtype=np.int32)
+        for i, label in enumerate(labels):
+            key = (label or "").strip().lower()
+            if key:
+                codes[i] = self._states.setdefault(key, len(self._states))
+        return codes
+
+    def add_students(self, students: List[Dict[str, Any]]):
+        self.student_cgpa = np.concatenate([self.student_cgpa, numeric_column(students, "cgpa")])
+        self.student_experience = np.concatenate([self.student_experience, numeric_column(students, "experience_years")])
+        self.student_state = np.concatenate([self.student_state, self._state_codes(column(students, "state"))])
+
+    def add_companies(self, companies: List[Dict[str, Any]]):
+        self.company_min_cgpa = np.concatenate([self.company_min_cgpa, numeric_column(companies, "min_cgpa")])
+        self.company_min_experience = np.concatenate(
+            [self.company_min_experience, numeric_column(companies, "min_experience_years")]
+        )
+        self.company_state = np.concatenate(
+            [self.company_state, self._state_codes(column(companies, "location_state"))]
+        )
+
+    def _at_least(self, student_values: np.ndarray, company_minimums: np.ndarray) -> np.ndarray:
+        ok = student_values >= company_minimums
+        ok |= np.isnan(company_minimums)
+        if not self.strict:
+            ok |= np.isnan(student_values)
+        return ok
+
+    def _evaluate(self, student_idx: np.ndarray, company_idx: np.ndarray) -> np.ndarray:
+        ok = self._at_least(self.student_cgpa[student_idx], self.company_min_cgpa[company_idx])
+        ok &= self._at_least(self.student_experience[student_idx], self.company_min_experience[company_idx])
+        if self.require_same_state:
+            s_state = self.student_state[student_idx]
+            c_state = self.company_state[company_idx]
+            same = s_state == c_state
+            if not self.strict:
+                same |= (s_state < 0) | (c_state < 0)
+            ok &= same
+        return ok
+
+    def mask(self) -> np.ndarray:
+        """Dense (n_students, n_companies) boolean eligibility mask"""
+        student_idx = np.arange(self.n_students)[:, None]
+        company_idx = np.arange(self.n_companies)[None, :]
+        mask = np.broadcast_to(self._evaluate(student_idx, company_idx), (self.n_students, self.n_companies))
+        logger.info(f"Eligibility mask keeps {int(mask.sum())} of {mask.size} pairs")
+        return mask
+
+    def pair_mask(self, student_idx: np.ndarray, company_idx: np.ndarray) -> np.ndarray:
+        """Eligibility of explicit (student, company) index pairs"""
+        return self._evaluate(np.asarray(student_idx), np.asarray(company_idx))
+
+    def unfillable(self, students: Optional[np.ndarray] = None) -> np.ndarray:
+        """Per company, whether no student (of the `students` row mask, default all) meets both its minimums.
+
+        A 2-D dominance check in O((S + C) log S): students sorted by CGPA,
+        then the best experience among those meeting each CGPA minimum. Only
+        CGPA and experience are considered, not the state rule.
+        """
+        # A missing student value passes unless strict; a missing minimum is always met
+        missing = -np.inf if self.strict else np.inf
+        cgpa = np.where(np.isnan(self.student_cgpa), missing, self.student_cgpa)
+        experience = np.where(np.isnan(self.student_experience), missing, self.student_experience)
+        if students is not None:
+            cgpa, experience = cgpa[students], experience[students]
+        if len(cgpa) == 0:
+            return np.ones(self.n_companies, dtype=bool)
+        order = np.argsort(-cgpa, kind="stable")
+        best_experience = np.maximum.accumulate(experience[order])
+        min_cgpa = np.where(np.isnan(self.company_min_cgpa), -np.inf, self.company_min_cgpa)
+        min_experience = np.where(np.isnan(self.company_min_experience), -np.inf, self.company_min_experience)
+        # Students meeting each CGPA minimum form a prefix of the descending order
+        meeting = np.searchsorted(-cgpa[order], -min_cgpa, side="right")
+        best = best_experience[np.maximum(meeting - 1, 0)]
+        return ~((meeting > 0) & (best >= min_experience))
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, Hashable, Optional, Tuple
+import os
+import threading
+import logging
+
+from fastapi import Request, Response
+
+from services.versioning import Stamp
+
+logger = logging.getLogger(__name__)
+
+# Serialized GET bodies kept in memory, bounded by count and total size
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class ResponseCache:
+    """LRU of serialized response bodies keyed by (endpoint, cohort, query parameters, version stamp).
+
+    A write bumps the dataset version, so stale bodies are never served;
+    they simply age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: Hashable, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = body
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+response_cache = ResponseCache()
+
+
+def etag(name: str, stamp: Stamp) -> str:
+    """Weak validator of a dataset version; the write timestamp keeps it unique across database resets"""
+    version, updated_at = stamp
+    written = int(updated_at.replace(tzinfo=timezone.utc).timestamp() * 1e6) if updated_at else 0
+    return f'W/"{name}-{version}-{written}"'
+
+
+def _last_modified(updated_at: datetime) -> str:
+    return format_datetime(updated_at.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, tag: str, updated_at: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match (weak comparison) and, only without it, If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+        return "*" in candidates or _opaque(tag) in {_opaque(candidate) for candidate in candidates}
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or updated_at is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return updated_at.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def cached_response(
+    request: Request,
+    name: str,
+    key: Tuple,
+    stamp: Stamp,
+    render: Callable[[], bytes],
+    media_type: str = "application/json",
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Conditional GET over a versioned dataset.
+
+    Answers 304 when the client's validator matches `stamp`, otherwise
+    serves the body cached under (key, stamp) or renders and caches it.
+    Only a miss runs `render` and therefore queries the rows.
+    """
+    tag = etag(name, stamp)
+    headers = {**(headers or {}), "ETag": tag, "Cache-Control": "no-cache"}
+    if stamp[1] is not None:
+        headers["Last-Modified"] = _last_modified(stamp[1])
+    if not_modified(request, tag, stamp[1]):
+        return Response(status_code=304, headers=headers)
+
+    cache_key = (*key, stamp)
+    body = response_cache.get(cache_key)
+    if body is None:
+        body = render()
+        response_cache.put(cache_key, body)
+    else:
+        logger.debug(f"Response cache hit for {key}")
+    return Response(content=body, media_type=media_type, headers=headers)
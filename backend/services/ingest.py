@@ -0,0 +1,86 @@
+import os
+import re
+from typing import Any, Dict, Optional
+
+from services.location import parse_metro_preference
+
+# Column mapping from the data/*.csv formats to Student and Company fields,
+# shared by the CSV upload endpoints and the offline batch CLI. Rows are dicts
+# of the raw cell values as strings, with None for empty cells.
+
+# Years of experience credited per internship when a students CSV has no
+# experience_years column, so positions' experience_required can be checked.
+# Internships run a few months to a semester; 0.5 credits a six-month one.
+INTERNSHIP_EXPERIENCE_YEARS = float(os.getenv("INTERNSHIP_EXPERIENCE_YEARS", "0.5"))
+
+
+def parse_number(value: Optional[str]) -> Optional[float]:
+    """Extract the leading number from values such as '8.2', '5 years' or '11 LPA'"""
+    if value is None:
+        return None
+    match = re.search(r"\d+(?:\.\d+)?", value)
+    return float(match.group()) if match else None
+
+
+def parse_count(value: Optional[str]) -> Optional[int]:
+    number = parse_number(value)
+    return int(number) if number is not None else None
+
+
+def student_from_row(row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """Student fields for one CSV row, in either the `name` or the `first_name`/`last_name` format"""
+    mapped_data = {}
+
+    # Handle name field
+    if 'name' in row and row['name']:
+        # Split name into first and last name
+        name_parts = row['name'].split(' ', 1)
+        mapped_data['first_name'] = name_parts[0]
+        mapped_data['last_name'] = name_parts[1] if len(name_parts) > 1 else ''
+    else:
+        mapped_data['first_name'] = row.get('first_name', '')
+        mapped_data['last_name'] = row.get('last_name', '')
+
+    # Map other fields
+    mapped_data['skills_text'] = row.get('skills', '')
+    mapped_data['degree'] = row.get('branch', '')
+    mapped_data['stream'] = row.get('branch', '')
+    mapped_data['city'] = row.get('district', '')
+    mapped_data['state'] = row.get('state', '')
+    mapped_data['pincode'] = None
+    mapped_data['caste'] = row.get('caste_category', '')
+    mapped_data['gender'] = row.get('gender', '')
+    mapped_data['financial_status'] = 'Low' if row.get('family_income') and float(row.get('family_income', 0)) < 50000 else 'Medium'
+    mapped_data['preferred_locations'] = row.get('City', '')
+    mapped_data['prefers_metro'] = parse_metro_preference(row.get('City'))
+    mapped_data['cgpa'] = parse_number(row.get('cgpa'))
+    mapped_data['internships_count'] = parse_count(row.get('internships_count'))
+    mapped_data['projects_count'] = parse_count(row.get('projects_count'))
+    mapped_data['experience_years'] = parse_number(row.get('experience_years'))
+    if mapped_data['experience_years'] is None and mapped_data['internships_count'] is not None:
+        mapped_data['experience_years'] = mapped_data['internships_count'] * INTERNSHIP_EXPERIENCE_YEARS
+    mapped_data['other_notes'] = f"Certifications: {row.get('certifications', '')}"
+    return mapped_data
+
+
+def company_from_row(row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """Company (position) fields for one CSV row"""
+    mapped_data = {}
+    mapped_data['company_name'] = row.get('company_name', '')
+    mapped_data['position_title'] = row.get('role_title', '')
+    mapped_data['req_skills_text'] = row.get('skills_required', '')
+    mapped_data['job_description'] = row.get('description', '')
+    mapped_data['location_city'] = row.get('location_city', '')
+    mapped_data['location_state'] = row.get('location_state', '')
+
+    # Typed eligibility and compensation fields, e.g. "5 years" and "11 LPA"
+    mapped_data['min_experience_years'] = parse_number(row.get('experience_required'))
+    mapped_data['min_cgpa'] = parse_number(row.get('min_cgpa'))
+    salary_range = row.get('salary_range')
+    salary_lpa = parse_number(salary_range) if salary_range and 'LPA' in salary_range else None
+    mapped_data['salary_lpa'] = salary_lpa
+    mapped_data['stipend'] = salary_lpa * 10000 if salary_lpa is not None else None  # Convert LPA to monthly
+
+    mapped_data['openings'] = 1  # Default to 1 opening
+    mapped_data['priority_flags'] = row.get('experience_required', '')
+    return mapped_data
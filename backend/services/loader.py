@@ -0,0 +1,125 @@
+import numpy as np
+from collections.abc import Mapping, Sequence
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import os
+
+# Rows fetched per round trip when streaming query results
+LOAD_BATCH_SIZE = int(os.getenv("LOAD_BATCH_SIZE", "10000"))
+
+
+class Record(Mapping):
+    """Read-only mapping view of one row of a Records table"""
+
+    __slots__ = ("_records", "_row")
+
+    def __init__(self, records: "Records", row: int):
+        self._records = records
+        self._row = row
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._records.columns[key][self._row]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._records.columns)
+
+    def __len__(self) -> int:
+        return len(self._records.columns)
+
+    def __repr__(self) -> str:
+        return f"Record({dict(self)})"
+
+    def __reduce__(self):
+        # Pickle the row, not the whole table the view points into
+        return dict, (dict(self),)
+
+
+class Records(Sequence):
+    """Column-oriented table that also reads as a sequence of row mappings.
+
+    Id and other non-null numeric columns are NumPy arrays, the remaining
+    columns plain lists. `records[i]` returns a lightweight `Record` view, so
+    code written against lists of dicts works unchanged while only one list
+    or array per column is held in memory; hot paths read whole columns with
+    `column()`.
+    """
+
+    def __init__(self, columns: Dict[str, Any]):
+        self.columns = columns
+        self._length = len(next(iter(columns.values()))) if columns else 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Record(self, i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Records index out of range")
+        return Record(self, index)
+
+    def __iter__(self) -> Iterator[Record]:
+        for i in range(self._length):
+            yield Record(self, i)
+
+    def column(self, name: str) -> Any:
+        return self.columns[name]
+
+    def take(self, rows: Sequence[int]) -> "Records":
+        """New table of the given rows, holding copies of just those column values"""
+        rows = np.asarray(rows, dtype=np.int64)
+        return Records({
+            name: values[rows] if isinstance(values, np.ndarray) else [values[i] for i in rows]
+            for name, values in self.columns.items()
+        })
+
+    def extend(self, rows: Iterable[Mapping]):
+        """Append rows (another Records table or mappings with the same keys)"""
+        if not isinstance(rows, Records):
+            rows = list(rows)
+            rows = Records({name: [row.get(name) for row in rows] for name in self.columns})
+        for name, values in self.columns.items():
+            extra = rows.columns[name]
+            if isinstance(values, np.ndarray):
+                self.columns[name] = np.concatenate([values, np.asarray(extra, dtype=values.dtype)])
+            else:
+                self.columns[name] = values + list(extra)
+        self._length += len(rows)
+
+
+def column(records: Iterable[Mapping], name: str) -> List[Any]:
+    """One field of every record: the stored column for Records, collected otherwise"""
+    if isinstance(records, Records):
+        values = records.column(name)
+        return values.tolist() if isinstance(values, np.ndarray) else values
+    return [record.get(name) for record in records]
+
+
+def take(records: Sequence[Mapping], rows: Sequence[int]) -> Sequence[Mapping]:
+    """The given rows of a Records table (as a compact table of their own) or of a list of mappings"""
+    if isinstance(records, Records):
+        return records.take(rows)
+    return [records[i] for i in rows]
+
+
+def load_columns(
+    db: Session, statement, arrays: Optional[Dict[str, Any]] = None, batch_size: int = LOAD_BATCH_SIZE
+) -> Records:
+    """Run a column select, streaming rows with yield_per, and collect the result column-wise.
+
+    Only the selected columns are fetched; no ORM objects are built. Columns
+    named in `arrays` (ids, scores; name -> dtype) become NumPy arrays.
+    """
+    result = db.execute(statement.execution_options(yield_per=batch_size))
+    names = list(result.keys())
+    values: List[List[Any]] = [[] for _ in names]
+    for partition in result.partitions():
+        for i, batch in enumerate(zip(*partition)):
+            values[i].extend(batch)
+    columns: Dict[str, Any] = dict(zip(names, values))
+    for name, dtype in (arrays or {}).items():
+        columns[name] = np.array(columns[name], dtype=dtype)
+    return Records(columns)
@@ -0,0 +1,140 @@
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+
+from services.loader import column
+
+# Cities treated as metropolitan when matching the CSV "Metropolitan City" /
+# "Non-Metro City" preference against a position's location_city.
+METRO_CITIES = {
+    "mumbai", "delhi", "new delhi", "kolkata", "chennai", "bengaluru",
+    "bangalore", "hyderabad", "ahmedabad", "pune",
+}
+
+# Proximity component: same city, same state, anywhere else
+SAME_CITY_SCORE = 1.0
+SAME_STATE_SCORE = 0.6
+OTHER_SCORE = 0.0
+
+# Metro preference component indexed by [student preference + 1, company is metro]
+# (preference -1 = unknown, 0 = non-metro, 1 = metro)
+METRO_MATCH = np.array([
+    [0.5, 0.5],
+    [1.0, 0.2],
+    [0.2, 1.0],
+], dtype=np.float32)
+
+
+def parse_metro_preference(value: Optional[str]) -> Optional[bool]:
+    """Interpret the CSV `City` column ('Metropolitan City' / 'Non-Metro City')"""
+    if not value:
+        return None
+    text = value.strip().lower()
+    if text.startswith("non"):
+        return False
+    if text.startswith("metro"):
+        return True
+    return None
+
+
+def _normalise(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+
+class LocationTable:
+    """Integer-coded table of the distinct (city, state) locations in a run.
+
+    Students and companies are reduced to location codes once; the
+    compatibility between every pair of codes is precomputed into a small
+    (L, L) matrix so scoring any (student, company) pair is a single gather.
+    """
+
+    def __init__(self):
+        self._codes: Dict[Tuple[str, str], int] = {}
+        self._states: Dict[str, int] = {}
+        self._cities: Dict[Tuple[str, str], int] = {}
+        self.city_code: List[int] = []
+        self.state_code: List[int] = []
+        self.is_metro: List[bool] = []
+
+    def code(self, city: Optional[str], state: Optional[str]) -> int:
+        key = (_normalise(city), _normalise(state))
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self._codes)
+            self._codes[key] = code
+            city_key, state_key = key
+            self.state_code.append(self._states.setdefault(state_key, len(self._states)) if state_key else -1)
+            self.city_code.append(self._cities.setdefault(key, len(self._cities)) if city_key else -1)
+            self.is_metro.append(city_key in METRO_CITIES)
+        return code
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def compatibility_matrix(self) -> np.ndarray:
+        """(L, L) proximity scores between location codes"""
+        city = np.asarray(self.city_code)
+        state = np.asarray(self.state_code)
+        same_city = (city[:, None] == city[None, :]) & (city[:, None] >= 0)
+        same_state = (state[:, None] == state[None, :]) & (state[:, None] >= 0)
+        return np.where(same_city, SAME_CITY_SCORE, np.where(same_state, SAME_STATE_SCORE, OTHER_SCORE)).astype(np.float32)
+
+
+class LocationScorer:
+    """Location-compatibility component of the match score, in [0, 1].
+
+    Blends geographic proximity with the student's metro/non-metro preference;
+    `metro_weight` is the share given to the preference.
+    """
+
+    def __init__(self, students: List[Dict[str, Any]], companies: List[Dict[str, Any]], metro_weight: float = 0.3):
+        self.metro_weight = metro_weight
+        self.table = LocationTable()
+        self.student_location = np.zeros(0, dtype=np.int32)
+        self.student_preference = np.zeros(0, dtype=np.int8)
+        self.company_location = np.zeros(0, dtype=np.int32)
+        self._compatibility = None
+        self.add_students(students)
+        self.add_companies(companies)
+
+    def add_students(self, students: List[Dict[str, Any]]):
+        codes = np.array(
+            [self.table.code(city, state) for city, state in zip(column(students, "city"), column(students, "state"))],
+            dtype=np.int32,
+        )
+        preference = np.array(
+            [-1 if metro is None else int(bool(metro)) for metro in column(students, "prefers_metro")], dtype=np.int8
+        ) + 1
+        self.student_location = np.concatenate([self.student_location, codes])
+        self.student_preference = np.concatenate([self.student_preference, preference])
+
+    def add_companies(self, companies: List[Dict[str, Any]]):
+        cities, states = column(companies, "location_city"), column(companies, "location_state")
+        codes = np.array([self.table.code(city, state) for city, state in zip(cities, states)], dtype=np.int32)
+        self.company_location = np.concatenate([self.company_location, codes])
+
+    @property
+    def compatibility(self) -> np.ndarray:
+        """(L, L) proximity matrix, rebuilt only when new locations have been coded"""
+        if self._compatibility is None or len(self._compatibility) != len(self.table):
+            self._compatibility = self.table.compatibility_matrix()
+        return self._compatibility
+
+    def components(self, student_idx: np.ndarray, company_idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(proximity, metro preference match) for pairs, before blending with `metro_weight`"""
+        proximity = self.compatibility[self.student_location[student_idx], self.company_location[company_idx]]
+        company_metro = np.asarray(self.table.is_metro, dtype=np.int8)[self.company_location[company_idx]]
+        metro = METRO_MATCH[self.student_preference[student_idx], company_metro]
+        return proximity, metro
+
+    def _evaluate(self, student_idx: np.ndarray, company_idx: np.ndarray) -> np.ndarray:
+        proximity, metro = self.components(student_idx, company_idx)
+        return (1.0 - self.metro_weight) * proximity + self.metro_weight * metro
+
+    def matrix(self) -> np.ndarray:
+        """Dense (n_students, n_companies) location scores"""
+        return self._evaluate(np.arange(len(self.student_location))[:, None], np.arange(len(self.company_location))[None, :])
+
+    def pair_scores(self, student_idx: np.ndarray, company_idx: np.ndarray) -> np.ndarray:
+        """Location scores for explicit candidate pairs, O(number of pairs)"""
+        return self._evaluate(np.asarray(student_idx), np.asarray(company_idx))
@@ -0,0 +1,98 @@
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+import time
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+STAGE_SECONDS = Histogram(
+    "skillsync_stage_seconds", "Time spent in each hot-path stage", ["stage"], buckets=STAGE_BUCKETS
+)
+STAGE_ITEMS = Counter("skillsync_stage_items_total", "Rows, texts or pairs processed per stage", ["stage"])
+EMBEDDING_CACHE = Counter("skillsync_embedding_cache_total", "Embedding cache lookups", ["result"])
+
+# Admission control, per endpoint class (heavy compute vs light reads)
+ADMISSION_IN_FLIGHT = Gauge("skillsync_admission_in_flight", "Requests admitted and running", ["endpoint_class"])
+ADMISSION_QUEUE_DEPTH = Gauge("skillsync_admission_queue_depth", "Requests waiting for admission", ["endpoint_class"])
+ADMISSION_WAIT_SECONDS = Histogram(
+    "skillsync_admission_wait_seconds", "Time requests waited for admission", ["endpoint_class"], buckets=STAGE_BUCKETS
+)
+ADMISSION_REJECTED = Counter(
+    "skillsync_admission_rejected_total", "Requests answered 429 by admission control", ["endpoint_class", "reason"]
+)
+
+
+class StageBreakdown(dict):
+    """Seconds per stage for one request; subclasses can hook stage entry, exit and progress reports"""
+
+    def enter(self, stage: str):
+        pass
+
+    def exit(self, stage: str, elapsed: float):
+        self[stage] = self.get(stage, 0.0) + elapsed
+
+    def progress(self, stage: str, data: Dict[str, Any]):
+        pass
+
+
+# Stage timings of the current request, when the caller asked for a breakdown
+_breakdown: ContextVar[Optional[StageBreakdown]] = ContextVar("stage_breakdown", default=None)
+
+
+@contextmanager
+def timed(stage: str, items: Optional[int] = None) -> Iterator[None]:
+    """Observe the duration of a block in the stage histogram and the request breakdown"""
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        breakdown.enter(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        if items:
+            STAGE_ITEMS.labels(stage).inc(items)
+        if breakdown is not None:
+            breakdown.exit(stage, elapsed)
+
+
+def current_breakdown() -> Optional[StageBreakdown]:
+    """Stage collector of the current request, if any"""
+    return _breakdown.get()
+
+
+def report_progress(stage: str, **data: Any):
+    """Progress within a stage (batches done, fill rate) for whoever collects the current request's stages"""
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        breakdown.progress(stage, data)
+
+
+@contextmanager
+def collect_stages(breakdown: Optional[StageBreakdown] = None) -> Iterator[StageBreakdown]:
+    """Collect per-stage seconds for everything timed inside the block, including threadpool work"""
+    breakdown = StageBreakdown() if breakdown is None else breakdown
+    token = _breakdown.set(breakdown)
+    try:
+        yield breakdown
+    finally:
+        _breakdown.reset(token)
+
+
+def render_metrics() -> bytes:
+    """All registered metrics in the Prometheus text exposition format"""
+    return generate_latest()
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+async def stage_breakdown(include_stages: bool = False) -> AsyncIterator[Optional[Dict[str, float]]]:
+    """Dependency: per-stage seconds of the request when `?include_stages=true`, else None"""
+    if not include_stages:
+        yield None
+        return
+    with collect_stages() as stages:
+        yield stages
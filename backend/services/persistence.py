@@ -0,0 +1,184 @@
+from sqlalchemy import insert, select, literal
+from sqlalchemy.orm import Session
+from typing import Iterable, List, Optional, Tuple
+from datetime import datetime
+import io
+import json
+import logging
+
+from core.database import SessionLocal
+from core.models import DEFAULT_COHORT, Allocation, AllocationRun, Student, Company
+from services.loader import Records, load_columns
+from services.metrics import timed
+from services.versioning import ALLOCATIONS, bump_version
+
+logger = logging.getLogger(__name__)
+
+# Published runs kept after pruning, so readers still holding an older run id can finish
+KEEP_RUNS = 2
+
+# Rows per executemany batch on databases without COPY
+INSERT_BATCH_SIZE = 50000
+
+Match = Tuple[int, int, float]
+
+
+def current_run_id(db: Session, cohort_id: str = DEFAULT_COHORT) -> Optional[int]:
+    """Id of the cohort's currently published allocation run, if any"""
+    return db.query(AllocationRun.run_id).filter(
+        AllocationRun.cohort_id == cohort_id, AllocationRun.status == "current"
+    ).scalar()
+
+
+def load_run_matches(db: Session, run_id: Optional[int], cohort_id: str = DEFAULT_COHORT) -> Records:
+    """student_id, first_name, last_name, company_id, company_name and score of every match in a cohort's run, column-wise"""
+    statement = (
+        select(
+            Allocation.student_id, Student.first_name, Student.last_name,
+            Allocation.company_id, Company.company_name, Allocation.score,
+        )
+        .join(Student, Student.student_id == Allocation.student_id)
+        .join(Company, Company.company_id == Allocation.company_id)
+        .where(Allocation.cohort_id == cohort_id, Allocation.run_id == run_id)
+    )
+    return load_columns(db, statement, arrays={"student_id": "int64", "company_id": "int64"})
+
+
+def create_run(db: Session, params: Optional[dict] = None, cohort_id: str = DEFAULT_COHORT) -> AllocationRun:
+    """Register a new run of a cohort in the "building" state; its rows stay invisible until published"""
+    run = AllocationRun(
+        cohort_id=cohort_id, status="building", params=json.dumps(params) if params is not None else None
+    )
+    db.add(run)
+    db.flush()
+    return run
+
+
+def bulk_insert_matches(db: Session, run: AllocationRun, matches: Iterable[Match]):
+    """Insert (student_id, company_id, score) rows for a run in bulk.
+
+    PostgreSQL uses COPY, SQLite a driver-level executemany and other
+    databases batched executemany through SQLAlchemy.
+    """
+    with timed("bulk_insert"):
+        _bulk_insert(db, run.run_id, run.cohort_id, matches)
+
+
+def _bulk_insert(db: Session, run_id: int, cohort_id: str, matches: Iterable[Match]):
+    created_at = datetime.utcnow()
+    connection = db.connection()
+    if connection.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        for student_id, company_id, score in matches:
+            buffer.write(f"{cohort_id}\t{run_id}\t{student_id}\t{company_id}\t{score!r}\t{created_at.isoformat()}\n")
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                "COPY allocations (cohort_id, run_id, student_id, company_id, score, created_at) FROM STDIN", buffer
+            )
+        finally:
+            cursor.close()
+        return
+
+    rows = ((cohort_id, run_id, student_id, company_id, score, created_at) for student_id, company_id, score in matches)
+    if connection.dialect.name == "sqlite":
+        # Driver-level executemany over plain tuples avoids per-row parameter processing;
+        # the timestamp is pre-formatted in SQLAlchemy's SQLite storage format
+        stamp = created_at.isoformat(sep=" ")
+        rows = ((cohort_id, run_id, student_id, company_id, score, stamp) for _, _, student_id, company_id, score, _ in rows)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.executemany(
+                "INSERT INTO allocations (cohort_id, run_id, student_id, company_id, score, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+        finally:
+            cursor.close()
+        return
+
+    columns = ("cohort_id", "run_id", "student_id", "company_id", "score", "created_at")
+    batch: List[dict] = []
+    for row in rows:
+        batch.append(dict(zip(columns, row)))
+        if len(batch) >= INSERT_BATCH_SIZE:
+            connection.execute(insert(Allocation.__table__), batch)
+            batch = []
+    if batch:
+        connection.execute(insert(Allocation.__table__), batch)
+
+
+def copy_run(db: Session, source_run_id: int, target: AllocationRun, exclude_student_ids: List[int]):
+    """Server-side copy of a run's rows into another run of the same cohort, skipping the given students"""
+    table = Allocation.__table__
+    rows = select(
+        table.c.cohort_id, literal(target.run_id), table.c.student_id, table.c.company_id, table.c.score, table.c.created_at
+    ).where(table.c.cohort_id == target.cohort_id, table.c.run_id == source_run_id)
+    if exclude_student_ids:
+        rows = rows.where(table.c.student_id.not_in(exclude_student_ids))
+    with timed("copy_run"):
+        db.connection().execute(
+            insert(table).from_select(["cohort_id", "run_id", "student_id", "company_id", "score", "created_at"], rows)
+        )
+
+
+def publish_run(db: Session, run: AllocationRun, **stats):
+    """Atomically make `run` the current run of its cohort: one transaction flips the status pointer"""
+    for key, value in stats.items():
+        setattr(run, key, value)
+    with timed("publish"):
+        db.query(AllocationRun).filter(
+            AllocationRun.cohort_id == run.cohort_id, AllocationRun.status == "current"
+        ).update(
+            {AllocationRun.status: "superseded"}, synchronize_session=False
+        )
+        run.status = "current"
+        run.published_at = datetime.utcnow()
+        bump_version(db, ALLOCATIONS, cohort_id=run.cohort_id)
+        db.commit()
+
+
+def republish_run(db: Session, run_id: int) -> bool:
+    """Make an earlier, still stored run current again; False if it has been pruned"""
+    run = db.query(AllocationRun).filter(
+        AllocationRun.run_id == run_id, AllocationRun.status.in_(["current", "superseded"])
+    ).first()
+    if run is None:
+        return False
+    if run.status != "current":
+        publish_run(db, run)
+    return True
+
+
+def run_exists(db: Session, run_id: Optional[int]) -> bool:
+    """Whether a published run's rows are still stored"""
+    if run_id is None:
+        return False
+    return db.query(AllocationRun.run_id).filter(
+        AllocationRun.run_id == run_id, AllocationRun.status.in_(["current", "superseded"])
+    ).first() is not None
+
+
+def prune_runs(cohort_id: str = DEFAULT_COHORT, keep: int = KEEP_RUNS):
+    """Delete a cohort's superseded runs beyond the newest `keep`; meant to run as a background task"""
+    db = SessionLocal()
+    try:
+        keep_ids = [
+            run_id for (run_id,) in db.query(AllocationRun.run_id)
+            .filter(AllocationRun.cohort_id == cohort_id, AllocationRun.status.in_(["current", "superseded"]))
+            .order_by(AllocationRun.run_id.desc())
+            .limit(keep)
+        ]
+        stale = db.query(AllocationRun.run_id).filter(
+            AllocationRun.cohort_id == cohort_id, AllocationRun.run_id.not_in(keep_ids), AllocationRun.status == "superseded"
+        ).all()
+        stale_ids = [run_id for (run_id,) in stale]
+        if stale_ids:
+            db.query(Allocation).filter(
+                Allocation.cohort_id == cohort_id, Allocation.run_id.in_(stale_ids)
+            ).delete(synchronize_session=False)
+            db.query(AllocationRun).filter(AllocationRun.run_id.in_(stale_ids)).delete(synchronize_session=False)
+            db.commit()
+            logger.info(f"Pruned {len(stale_ids)} old allocation runs of cohort {cohort_id}")
+    finally:
+        db.close()
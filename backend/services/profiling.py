@@ -0,0 +1,188 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+import os
+import re
+import sys
+import threading
+import time
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Where request profiles are written and listed from
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Profiles kept on disk, newest first; older ones are deleted after each write
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+PROFILE_SUFFIX = ".folded"
+
+# Innermost frames of threads that are only waiting for work (idle pool workers, the event loop in select)
+_IDLE_FRAMES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get")}
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES
+
+
+class StackSampler:
+    """Sampling profiler over all threads of the process, aggregated as folded stacks.
+
+    A background thread reads `sys._current_frames()` every `interval`
+    seconds, so work handed to the threadpool or other threads is captured
+    too, including that of other requests. Threads that are only waiting for work are skipped. The result is in
+    the folded-stack format read by flamegraph.pl, inferno and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_folded(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def profile_name(method: str, path: str) -> str:
+    """File name for a request profile: timestamp, method and a filesystem-safe path"""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    return f"{datetime.utcnow():%Y%m%dT%H%M%S%f}_{method}_{slug}{PROFILE_SUFFIX}"
+
+
+def list_profiles(directory: str) -> List[Dict[str, Any]]:
+    """Stored profiles, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if not name.endswith(PROFILE_SUFFIX):
+            continue
+        stat = os.stat(os.path.join(directory, name))
+        profiles.append({
+            "name": name,
+            "size_bytes": stat.st_size,
+            "created_at": datetime.utcfromtimestamp(stat.st_mtime),
+        })
+    return sorted(profiles, key=lambda p: p["name"], reverse=True)
+
+
+def prune_profiles(directory: str, keep: int = PROFILE_KEEP):
+    """Delete all but the newest `keep` profiles"""
+    for profile in list_profiles(directory)[keep:]:
+        try:
+            os.remove(os.path.join(directory, profile["name"]))
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that runs a StackSampler around selected requests.
+
+    With `mode="all"` every HTTP request is profiled; with `mode="header"`
+    only requests sending `X-Profile: 1`. Profiles are written to
+    `directory`, at most `keep` are kept, and the file name is returned in
+    the `X-Profile-Id` header. The middleware is only installed when
+    profiling is enabled, so a disabled profiler costs nothing.
+
+    Samples are process-wide: other requests running at the same time show
+    up in the profile too. `X-Profile-Concurrent` reports how many did, so
+    a clean profile (0) is easy to tell apart.
+    """
+
+    def __init__(self, app, mode: str = "header", directory: str = "profiles", interval: float = 0.005, keep: int = PROFILE_KEEP):
+        self.app = app
+        self.mode = mode
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        # Requests in flight and requests started so far, to count those overlapping a profile
+        self._active = 0
+        self._started = 0
+
+    def _wanted(self, scope) -> bool:
+        if scope["path"].startswith("/debug/profiles"):
+            return False
+        if self.mode == "all":
+            return True
+        return dict(scope["headers"]).get(b"x-profile", b"").lower() in (b"1", b"true", b"yes")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self._active += 1
+        self._started += 1
+        try:
+            if self._wanted(scope):
+                await self._profile(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            self._active -= 1
+
+    def _concurrent(self, active_at_start: int, started_at_start: int) -> int:
+        return active_at_start - 1 + self._started - started_at_start
+
+    async def _profile(self, scope, receive, send):
+        name = profile_name(scope["method"], scope["path"])
+        active_at_start, started_at_start = self._active, self._started
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                concurrent = self._concurrent(active_at_start, started_at_start)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", name.encode()),
+                    (b"x-profile-concurrent", str(concurrent).encode()),
+                ]
+            await send(message)
+
+        sampler = StackSampler(self.interval)
+        start_time = time.time()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            concurrent = self._concurrent(active_at_start, started_at_start)
+            # Joining the sampler and writing the file would block the event loop
+            await run_in_threadpool(self._finish, sampler, name)
+            logger.info(
+                f"Profiled {scope['method']} {scope['path']}: {sampler.samples} samples over "
+                f"{time.time() - start_time:.2f} seconds, {concurrent} concurrent requests -> {name}"
+            )
+
+    def _finish(self, sampler: StackSampler, name: str):
+        sampler.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        sampler.write_folded(os.path.join(self.directory, name))
+        prune_profiles(self.directory, self.keep)
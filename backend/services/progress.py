@@ -0,0 +1,107 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+import json
+import time
+
+from services.metrics import StageBreakdown
+
+# User-facing phase of each timed stage
+PHASES = {
+    "db_load": "loading",
+    "text_build": "encoding",
+    "encode": "encoding",
+    "snapshot_load": "encoding",
+    "snapshot_write": "encoding",
+    "index_build": "index_build",
+    "scoring": "scoring",
+    "assignment": "assignment",
+    "incremental_repair": "assignment",
+    "shard_workers": "assignment",
+    "bulk_insert": "persisting",
+    "copy_run": "persisting",
+    "publish": "persisting",
+}
+
+
+class ProgressChannel(StageBreakdown):
+    """Stage breakdown of one allocation run that is also published as a stream of progress events.
+
+    Stage entry, exit and progress reports may come from worker threads;
+    they are handed to the event loop, recorded, and fanned out to every
+    subscriber. Late subscribers replay the events so far, so a client can
+    attach to a run that is already in flight. Stages are forwarded to the
+    breakdown of the request that started the run, if it collects one.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, parent: Optional[StageBreakdown] = None):
+        super().__init__()
+        self.loop = loop
+        self.parent = parent
+        self.events: List[Dict[str, Any]] = []
+        self.closed = False
+        self._subscribers: List[asyncio.Queue] = []
+        self._start = time.perf_counter()
+
+    def enter(self, stage: str):
+        if self.parent is not None:
+            self.parent.enter(stage)
+        self._emit(stage, "started")
+
+    def exit(self, stage: str, elapsed: float):
+        super().exit(stage, elapsed)
+        if self.parent is not None:
+            self.parent.exit(stage, elapsed)
+        self._emit(stage, "finished", seconds=round(elapsed, 4))
+
+    def progress(self, stage: str, data: Dict[str, Any]):
+        if self.parent is not None:
+            self.parent.progress(stage, data)
+        self._emit(stage, "progress", **data)
+
+    def _emit(self, stage: str, status: str, **data: Any):
+        event = {
+            "stage": stage,
+            "phase": PHASES.get(stage, stage),
+            "status": status,
+            "elapsed": round(time.perf_counter() - self._start, 4),
+            **data,
+        }
+        self.loop.call_soon_threadsafe(self._publish, event)
+
+    def _publish(self, event: Optional[Dict[str, Any]]):
+        if event is None:
+            self.closed = True
+        else:
+            self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def close(self):
+        """End of the run; queued after any events still in flight from worker threads"""
+        self.loop.call_soon_threadsafe(self._publish, None)
+
+    async def subscribe(self, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Events so far, then live events until the run ends; None after `heartbeat` idle seconds"""
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        if self.closed:
+            queue.put_nowait(None)
+        self._subscribers.append(queue)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._subscribers.remove(queue)
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,82 @@
+import numpy as np
+from typing import List, Dict, Any
+import logging
+
+from core.schemas import QuotaRule
+from services.loader import column
+
+logger = logging.getLogger(__name__)
+
+
+def apportion(share: float, capacity: np.ndarray, applies: np.ndarray, headroom: np.ndarray) -> np.ndarray:
+    """Seats per position for a share of the seats at `applies`, by largest remainder.
+
+    Every position gets the floor of its share of its openings; the seats
+    still needed to reach the ceiling of the share of all those seats go to
+    the positions with the largest fractional remainders (in position order
+    on ties). Without this a 30% rule would reserve nothing at positions
+    with a single opening. No position gets more than its `headroom`.
+    """
+    exact = np.where(applies, share * capacity, 0.0)
+    seats = np.minimum(np.floor(exact).astype(np.int64), headroom)
+    missing = int(np.ceil(share * capacity[applies].sum() - 1e-9)) - int(seats.sum())
+    if missing > 0:
+        open_rows = np.nonzero(applies & (seats < headroom))[0]
+        order = np.argsort(-(exact[open_rows] - np.floor(exact[open_rows])), kind="stable")
+        seats[open_rows[order[:missing]]] += 1
+    return seats
+
+
+class QuotaBuckets:
+    """Reservation rules compiled into seat buckets for one cohort.
+
+    `groups[i, q]` marks student i as a member of rule q's category (case
+    insensitive); `reserved[j, q]` is the number of seats position j holds
+    back for it (the share of the positions' seats, apportioned by largest
+    remainder) and `global_reserved[q]` the number held back across all
+    positions (ceiling of the share of all seats). `layers[q]` numbers rule
+    q's attribute: rules on one attribute share out the seats, rules on
+    different attributes reserve them independently. A rule that would
+    reserve no seat at all is rejected with ValueError.
+    """
+
+    def __init__(
+        self, rules: List[QuotaRule], students: List[Dict[str, Any]], companies: List[Dict[str, Any]], capacity: np.ndarray
+    ):
+        self.rules = rules
+        self.groups = np.zeros((len(students), len(rules)), dtype=bool)
+        self.reserved = np.zeros((len(companies), len(rules)), dtype=np.int64)
+        self.global_reserved = np.zeros(len(rules), dtype=np.int64)
+        attributes = list(dict.fromkeys(rule.attribute for rule in rules))
+        self.layers = np.array([attributes.index(rule.attribute) for rule in rules], dtype=np.int64)
+        capacity = np.asarray(capacity, dtype=np.int64)
+        for q, rule in enumerate(rules):
+            category = rule.category.strip().lower()
+            self.groups[:, q] = [(value or "").strip().lower() == category for value in column(students, rule.attribute)]
+            if rule.scope == "global":
+                self.global_reserved[q] = int(np.ceil(rule.min_share * capacity.sum() - 1e-9))
+            else:
+                applies = np.ones(len(companies), dtype=bool)
+                if rule.company_ids is not None:
+                    ids = set(rule.company_ids)
+                    applies = np.array([c["company_id"] in ids for c in companies], dtype=bool)
+                headroom = capacity - self.reserved[:, self.layers == self.layers[q]].sum(axis=1)
+                self.reserved[:, q] = apportion(rule.min_share, capacity, applies, headroom)
+            if self.reserved[:, q].sum() + self.global_reserved[q] == 0:
+                raise ValueError(
+                    f"Quota {rule.attribute}={rule.category} reserves no seats: its positions have no openings left."
+                )
+
+    def summary(self, assignment: np.ndarray) -> List[Dict[str, Any]]:
+        """Seats reserved and seats actually given to each rule's category"""
+        placed = assignment >= 0
+        return [
+            {
+                "attribute": rule.attribute,
+                "category": rule.category,
+                "scope": rule.scope,
+                "reserved": int(self.reserved[:, q].sum() + self.global_reserved[q]),
+                "allocated": int((placed & self.groups[:, q]).sum()),
+            }
+            for q, rule in enumerate(self.rules)
+        ]
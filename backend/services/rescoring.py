@@ -0,0 +1,220 @@
+from abc import ABC, abstractmethod
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import threading
+import time
+import logging
+
+from core.schemas import AllocationParams
+from services.ai_engine import AIAllocationEngine
+from services.candidates import Candidates
+from services.loader import column
+from services.location import LocationScorer
+from services.metrics import report_progress
+from services.skills import SkillIndex
+
+logger = logging.getLogger(__name__)
+
+# Cross-encoder used by the "cross_encoder" re-scorer; loaded on first use
+RESCORER_MODEL = os.getenv("RESCORER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+# Shortlist length per student when a re-scorer is selected without top_k
+RESCORE_TOP_K = int(os.getenv("RESCORE_TOP_K", "20"))
+
+# Candidate pairs per re-scoring batch; the budget is checked between batches
+RESCORE_BATCH_PAIRS = int(os.getenv("RESCORE_BATCH_PAIRS", "2048"))
+
+# Scores (student row, company row) pairs: arrays in, one score in [0, 1] per pair out
+PairScorer = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+class Rescorer(ABC):
+    """Second-stage scorer run only on each student's first-stage shortlist.
+
+    `bind` prepares whatever the scorer needs for one run's students and
+    positions and returns a function scoring batches of pairs. A subclass
+    without it cannot be instantiated.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def bind(self, students: List[Dict[str, Any]], companies: List[Dict[str, Any]], scorer) -> PairScorer:
+        """Function scoring batches of (student row, company row) pairs of this run"""
+
+
+class CrossEncoderRescorer(Rescorer):
+    """Joint (student text, position text) relevance from a cross-encoder, squashed to [0, 1]"""
+
+    name = "cross_encoder"
+
+    def __init__(self, engine: AIAllocationEngine, model_name: str = RESCORER_MODEL):
+        self.engine = engine
+        self.model_name = model_name
+        self.model = None
+        self._load_lock = threading.Lock()
+
+    def load_model(self):
+        if self.model is None:
+            with self._load_lock:
+                if self.model is None:
+                    logger.info(f"Loading re-scoring model: {self.model_name}")
+                    from sentence_transformers import CrossEncoder
+                    self.model = CrossEncoder(self.model_name)
+
+    def bind(self, students: List[Dict[str, Any]], companies: List[Dict[str, Any]], scorer) -> PairScorer:
+        self.load_model()
+        student_texts: Dict[int, str] = {}
+        company_texts: Dict[int, str] = {}
+
+        def score(student_idx: np.ndarray, company_idx: np.ndarray) -> np.ndarray:
+            pairs = []
+            for i, j in zip(student_idx.tolist(), company_idx.tolist()):
+                if i not in student_texts:
+                    student_texts[i] = self.engine.build_text_representation(students[i], "student")
+                if j not in company_texts:
+                    company_texts[j] = self.engine.build_text_representation(companies[j], "company")
+                pairs.append((student_texts[i], company_texts[j]))
+            logits = np.asarray(self.model.predict(pairs), dtype=np.float32)
+            return 1.0 / (1.0 + np.exp(-logits))
+
+        return score
+
+
+class FeatureRescorer(Rescorer):
+    """Hand-built features: IDF-weighted skill overlap, CGPA and location compatibility"""
+
+    name = "features"
+
+    SKILL_WEIGHT = 0.5
+    CGPA_WEIGHT = 0.25
+    LOCATION_WEIGHT = 0.25
+
+    def bind(self, students: List[Dict[str, Any]], companies: List[Dict[str, Any]], scorer) -> PairScorer:
+        skills = scorer.skills if scorer.skills is not None else SkillIndex(
+            column(students, "skills_text"), column(companies, "req_skills_text")
+        )
+        location = scorer.location if scorer.location is not None else LocationScorer(students, companies)
+        cgpa = np.array([np.nan if value is None else value for value in column(students, "cgpa")], dtype=np.float32)
+        # Unknown CGPA counts as average
+        cgpa = np.where(np.isnan(cgpa), 0.5, np.clip(cgpa / 10.0, 0.0, 1.0))
+
+        def score(student_idx: np.ndarray, company_idx: np.ndarray) -> np.ndarray:
+            return (
+                self.SKILL_WEIGHT * skills.pair_similarity(student_idx, company_idx, "weighted")
+                + self.CGPA_WEIGHT * cgpa[student_idx]
+                + self.LOCATION_WEIGHT * location.pair_scores(student_idx, company_idx)
+            ).astype(np.float32)
+
+        return score
+
+
+_rescorers: Dict[str, Rescorer] = {}
+_rescorers_lock = threading.Lock()
+
+
+def get_rescorer(name: str, engine: AIAllocationEngine) -> Rescorer:
+    """Shared re-scorer instance by name, so its model is loaded once per process"""
+    with _rescorers_lock:
+        if name not in _rescorers:
+            if name == CrossEncoderRescorer.name:
+                _rescorers[name] = CrossEncoderRescorer(engine)
+            elif name == FeatureRescorer.name:
+                _rescorers[name] = FeatureRescorer()
+            else:
+                raise ValueError(f"Unknown re-scorer: {name}")
+        return _rescorers[name]
+
+
+def to_first_stage_range(student_idx: np.ndarray, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Second-stage scores mapped linearly onto each student's range of first-stage scores.
+
+    Pairs are grouped by student (contiguous runs of `student_idx`). A
+    student's best second-stage pair gets their best first-stage score and
+    the worst their worst, so blended scores stay on the first-stage scale
+    and remain comparable with students that were not re-scored. A student
+    whose second-stage scores are all equal keeps the first-stage scores.
+    """
+    if not len(student_idx):
+        return np.asarray(second, dtype=np.float32)
+    starts = np.concatenate([[0], np.nonzero(np.diff(student_idx))[0] + 1])
+    sizes = np.diff(np.append(starts, len(student_idx)))
+    first_lo = np.repeat(np.minimum.reduceat(first, starts), sizes)
+    first_hi = np.repeat(np.maximum.reduceat(first, starts), sizes)
+    second_lo = np.repeat(np.minimum.reduceat(second, starts), sizes)
+    second_hi = np.repeat(np.maximum.reduceat(second, starts), sizes)
+    spread = second_hi - second_lo
+    scaled = first_lo + (second - second_lo) / np.where(spread > 0, spread, 1.0) * (first_hi - first_lo)
+    return np.where(spread > 0, scaled, first).astype(np.float32)
+
+
+def rescore_shortlist(
+    score: PairScorer,
+    student_idx: np.ndarray,
+    company_idx: np.ndarray,
+    scores: np.ndarray,
+    n_students: int,
+    n_companies: int,
+    params: AllocationParams,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Blend second-stage scores into the first-stage scores of shortlisted pairs, within the budget.
+
+    Students are re-scored whole, in batches of about RESCORE_BATCH_PAIRS
+    pairs, closest first-vs-second candidate first: that is where a better
+    score is most likely to change the assignment. Second-stage scores are
+    first mapped onto the student's own first-stage range, so a re-scored
+    student competes on the same scale as one the budget did not reach.
+    Batching stops once `rescore_budget_ms` or `rescore_max_pairs` is
+    exhausted; the remaining students keep their first-stage scores. Returns the new scores and a
+    summary of how much of the candidate space was re-scored.
+    """
+    start_time = time.time()
+    deadline = start_time + params.rescore_budget_ms / 1000 if params.rescore_budget_ms else None
+    max_pairs = params.rescore_max_pairs or len(student_idx)
+
+    # Students ordered by the margin between their two best first-stage candidates
+    top_two = Candidates.from_pairs(student_idx, company_idx, scores, n_students, 2).scores
+    margin = top_two[:, 0] - top_two[:, 1]
+    shortlisted = np.nonzero(np.isfinite(top_two[:, 0]))[0]
+    priority = shortlisted[np.argsort(margin[shortlisted], kind="stable")]
+    rank = np.empty(n_students, dtype=np.int64)
+    rank[priority] = np.arange(len(priority))
+
+    pair_order = np.argsort(rank[student_idx], kind="stable")
+    ends = np.cumsum(np.bincount(student_idx, minlength=n_students)[priority])
+
+    blended = scores.copy()
+    done_students = done_pairs = 0
+    exhausted = False
+    while done_students < len(priority):
+        if (deadline is not None and time.time() >= deadline) or ends[done_students] > max_pairs:
+            exhausted = True
+            break
+        # Whole students up to the batch size; a student with a longer shortlist forms a batch alone
+        limit = min(done_pairs + RESCORE_BATCH_PAIRS, max_pairs)
+        stop_student = max(int(np.searchsorted(ends, limit, side="right")), done_students + 1)
+        stop = int(ends[stop_student - 1])
+        batch = pair_order[done_pairs:stop]
+        second = to_first_stage_range(student_idx[batch], scores[batch], score(student_idx[batch], company_idx[batch]))
+        blended[batch] = (1 - params.rescore_weight) * scores[batch] + params.rescore_weight * second
+        done_students, done_pairs = stop_student, stop
+        report_progress("rescoring", pairs=done_pairs, total_pairs=len(student_idx))
+
+    seconds = time.time() - start_time
+    summary = {
+        "rescorer": params.rescorer,
+        "candidate_pairs": int(len(student_idx)),
+        "rescored_pairs": done_pairs,
+        "shortlisted_students": int(len(priority)),
+        "rescored_students": done_students,
+        "rescored_fraction": done_pairs / len(student_idx) if len(student_idx) else 0.0,
+        "candidate_space_fraction": done_pairs / (n_students * n_companies) if n_students and n_companies else 0.0,
+        "budget_exhausted": exhausted,
+        "seconds": seconds,
+    }
+    logger.info(
+        f"Re-scored {done_pairs} of {len(student_idx)} shortlisted pairs ({done_students} of {len(priority)} students) "
+        f"with {params.rescorer} in {seconds:.2f} seconds"
+    )
+    return blended.astype(np.float32), summary
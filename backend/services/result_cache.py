@@ -0,0 +1,73 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightCache:
+    """Small LRU of computed results with single-flight coalescing.
+
+    The first caller for a key runs `compute`; identical requests arriving
+    while it is in flight await the same future instead of starting their
+    own computation. Failures are handed to every waiter and not cached.
+    With `weigh`, entries are also evicted until their total weight is at
+    most `max_weight`; a result heavier than that is returned but not kept.
+    """
+
+    def __init__(self, max_entries: int = 8, max_weight: Optional[int] = None, weigh: Optional[Callable[[Any], int]] = None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._weights: Dict[Hashable, int] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            logger.info("Allocation result cache hit")
+            return self._entries[key]
+        if key in self._inflight:
+            logger.info("Joining in-flight allocation")
+            return await asyncio.shield(self._inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else is waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            self._put(key, value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def _put(self, key: Hashable, value: Any):
+        weight = self.weigh(value) if self.weigh is not None else 0
+        if self.max_weight is not None and weight > self.max_weight:
+            logger.info(f"Allocation result of weight {weight} exceeds the cache limit; not cached")
+            return
+        self.discard(key)
+        self._entries[key] = value
+        self._weights[key] = weight
+        self.weight += weight
+        while len(self._entries) > self.max_entries or (self.max_weight is not None and self.weight > self.max_weight):
+            evicted, _ = self._entries.popitem(last=False)
+            self.weight -= self._weights.pop(evicted)
+
+    def discard(self, key: Hashable):
+        if self._entries.pop(key, None) is not None:
+            self.weight -= self._weights.pop(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._weights.clear()
+        self.weight = 0
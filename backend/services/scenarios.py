@@ -0,0 +1,223 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from typing import List, Dict, Any, Optional, Tuple
+import os
+import time
+import logging
+
+from core.schemas import AllocationParams, Scenario
+from services.allocation import Allocator, STABLE_TOP_K, assign, company_capacity
+from services.eligibility import EligibilityConstraints
+from services.loader import column
+from services.location import LocationScorer
+from services.metrics import timed
+from services.quotas import QuotaBuckets
+from services.sharding import BLOCK_ROWS, SharedHandle, share_array
+from services.skills import SkillIndex
+
+logger = logging.getLogger(__name__)
+
+
+def _top_k(params: AllocationParams) -> Optional[int]:
+    return params.top_k or (STABLE_TOP_K if params.algorithm == "stable" else None)
+
+
+def _eligibility_key(params: AllocationParams) -> Optional[str]:
+    if not params.enforce_eligibility:
+        return None
+    return f"eligible_{int(params.require_same_state)}{int(params.strict_eligibility)}"
+
+
+def candidate_pairs(
+    student_embeddings: np.ndarray, company_embeddings: np.ndarray, company_has_text: np.ndarray,
+    top_k: Optional[int], with_rank: bool,
+) -> Dict[str, np.ndarray]:
+    """Each student's top-k (or all) positions with text, with semantic score and optionally rank.
+
+    `rank` is the position of the pair in the student's semantic ordering,
+    so scenarios with a smaller `top_k` keep the pairs with `rank < top_k`.
+    """
+    text_columns = np.nonzero(company_has_text)[0]
+    k = min(top_k, len(text_columns)) if top_k else len(text_columns)
+    student_idx, company_idx, semantic, rank = [], [], [], []
+    for start in range(0, len(student_embeddings), BLOCK_ROWS):
+        rows = np.arange(start, min(start + BLOCK_ROWS, len(student_embeddings)))
+        sims = student_embeddings[rows] @ company_embeddings[text_columns].T
+        if k < len(text_columns):
+            local = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            local = np.broadcast_to(np.arange(len(text_columns)), sims.shape)
+        values = np.take_along_axis(sims, local, axis=1)
+        if with_rank:
+            order = np.argsort(-values, axis=1, kind="stable")
+            local = np.take_along_axis(local, order, axis=1)
+            values = np.take_along_axis(values, order, axis=1)
+            rank.append(np.tile(np.arange(k, dtype=np.int32), len(rows)))
+        student_idx.append(np.repeat(rows, k))
+        company_idx.append(text_columns[local].ravel())
+        semantic.append(values.ravel())
+    pairs = {
+        "student_idx": np.concatenate(student_idx).astype(np.int64),
+        "company_idx": np.concatenate(company_idx).astype(np.int64),
+        "semantic": np.concatenate(semantic).astype(np.float32),
+    }
+    if with_rank:
+        pairs["rank"] = np.concatenate(rank)
+    return pairs
+
+
+def score_components(
+    students: List[Dict[str, Any]], companies: List[Dict[str, Any]], pairs: Dict[str, np.ndarray],
+    params_list: List[AllocationParams],
+) -> Dict[str, np.ndarray]:
+    """Per-pair score and filter components needed by any of the scenarios, computed once"""
+    student_idx, company_idx = pairs["student_idx"], pairs["company_idx"]
+    components = dict(pairs)
+    if any(p.location_weight for p in params_list):
+        location = LocationScorer(students, companies)
+        proximity, metro = location.components(student_idx, company_idx)
+        components["proximity"] = proximity.astype(np.float32)
+        components["metro"] = metro.astype(np.float32)
+    metrics = {p.skill_metric for p in params_list if p.skill_weight}
+    if metrics or any(p.skill_prefilter for p in params_list):
+        skills = SkillIndex(column(students, "skills_text"), column(companies, "req_skills_text"))
+        for metric in metrics:
+            components[f"skill_{metric}"] = skills.pair_similarity(student_idx, company_idx, metric)
+        if any(p.skill_prefilter for p in params_list):
+            components["skill_overlap"] = skills.pair_overlap(student_idx, company_idx) > 0
+    for params in params_list:
+        key = _eligibility_key(params)
+        if key is not None and key not in components:
+            constraints = EligibilityConstraints(
+                students, companies, require_same_state=params.require_same_state, strict=params.strict_eligibility
+            )
+            components[key] = constraints.pair_mask(student_idx, company_idx)
+    return components
+
+
+def _evaluate_scenario(arrays: Dict[str, np.ndarray], task: Dict[str, Any]) -> Dict[str, Any]:
+    params = task["params"]
+    keep = np.ones(len(arrays["semantic"]), dtype=bool)
+    top_k = _top_k(params)
+    if top_k and "rank" in arrays:
+        keep &= arrays["rank"] < top_k
+    key = _eligibility_key(params)
+    if key is not None:
+        keep &= arrays[key]
+    if params.skill_prefilter:
+        keep &= arrays["skill_overlap"]
+    idx = np.nonzero(keep)[0]
+
+    scores = params.semantic_weight * arrays["semantic"][idx]
+    if params.location_weight:
+        location = (1.0 - params.metro_weight) * arrays["proximity"][idx] + params.metro_weight * arrays["metro"][idx]
+        scores = scores + params.location_weight * location
+    if params.skill_weight:
+        scores = scores + params.skill_weight * arrays[f"skill_{params.skill_metric}"][idx]
+
+    capacity = task["capacity"]
+    assignment, assigned_scores = assign(
+        params, arrays["student_idx"][idx], arrays["company_idx"][idx], scores.astype(np.float32),
+        capacity, task["n_students"], quotas=task["quotas"],
+    )
+    placed = assignment >= 0
+    allocated = int(placed.sum())
+    total_seats = int(capacity.sum())
+    return {
+        "allocated_count": allocated,
+        "unallocated_count": task["n_students"] - allocated,
+        "total_seats": total_seats,
+        "fill_rate": allocated / total_seats if total_seats else 0.0,
+        "mean_score": float(assigned_scores[placed].mean()) if allocated else 0.0,
+    }
+
+
+def _run_scenario(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker: one scenario's assignment over score components read in place from shared memory"""
+    start_time = time.time()
+    handles: Dict[str, SharedHandle] = task["handles"]
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, (name, _, _) in handles.items()}
+    try:
+        result = _evaluate_scenario(
+            {key: np.ndarray(shape, dtype=dtype, buffer=blocks[key].buf) for key, (_, shape, dtype) in handles.items()},
+            task,
+        )
+    finally:
+        for block in blocks.values():
+            block.close()
+    result["name"] = task["name"]
+    result["processing_time"] = time.time() - start_time
+    return result
+
+
+def run_scenarios(
+    allocator: Allocator,
+    students: List[Dict[str, Any]],
+    companies: List[Dict[str, Any]],
+    scenarios: List[Scenario],
+    workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Compare several parameter sets on the same data without publishing anything.
+
+    Students and positions are encoded once and every score component a
+    scenario may need (semantic similarity, location, skill overlap,
+    eligibility) is computed once over a shared candidate set, then placed in
+    shared memory. Each scenario only re-weights, filters and assigns in its
+    own worker process. Incremental, sharded, explicit-ranking and
+    re-scoring options do not apply here.
+    """
+    start_time = time.time()
+    params_list = [scenario.params for scenario in scenarios]
+    embeddings = allocator.prepare(students, companies)
+    student_embeddings, company_embeddings = embeddings.students, embeddings.companies
+    company_has_text = embeddings.company_has_text
+    if not company_has_text.any():
+        raise ValueError("No company has any text to match against.")
+
+    # A scenario without top_k needs every pair; otherwise the largest k covers them all
+    top_ks = [_top_k(p) for p in params_list]
+    candidate_k = None if None in top_ks else max(top_ks)
+    with_rank = any(k is not None and k != candidate_k for k in top_ks)
+    with timed("scoring"):
+        pairs = candidate_pairs(student_embeddings, company_embeddings, company_has_text, candidate_k, with_rank)
+        components = score_components(students, companies, pairs, params_list)
+    encode_time = time.time() - start_time
+
+    company_row = {c["company_id"]: j for j, c in enumerate(companies)}
+    blocks, handles = [], {}
+    try:
+        for key, array in components.items():
+            block, handles[key] = share_array(array)
+            blocks.append(block)
+        tasks = []
+        for i, scenario in enumerate(scenarios):
+            capacity = company_capacity(companies)
+            for company_id, openings in (scenario.openings or {}).items():
+                if company_id in company_row:
+                    capacity[company_row[company_id]] = max(int(openings), 0)
+            quotas = None
+            if scenario.params.quotas:
+                quotas = QuotaBuckets(scenario.params.quotas, students, companies, capacity)
+            tasks.append({
+                "name": scenario.name or f"scenario {i + 1}",
+                "params": scenario.params,
+                "capacity": capacity,
+                "quotas": quotas,
+                "n_students": len(students),
+                "handles": handles,
+            })
+        max_workers = min(workers or os.cpu_count() or 1, len(tasks))
+        # spawn rather than fork: the server has torch loaded, and forked torch thread pools can deadlock
+        with timed("scenario_workers", len(tasks)), ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as pool:
+            results = list(pool.map(_run_scenario, tasks))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    logger.info(
+        f"Evaluated {len(scenarios)} scenarios over {len(pairs['semantic'])} candidate pairs on {max_workers} "
+        f"workers in {time.time() - start_time:.2f} seconds ({encode_time:.2f} seconds encoding and scoring)"
+    )
+    return results
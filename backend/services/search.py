@@ -0,0 +1,313 @@
+import numpy as np
+from collections import OrderedDict
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import os
+import threading
+import time
+import logging
+
+from core.models import Company, CompanySkill, Student, StudentSkill
+from services.loader import column, load_columns
+from services.metrics import timed
+from services.skills import parse_skills
+from services.versioning import COMPANIES, COMPANIES_REPLACED, STUDENTS, STUDENTS_REPLACED, Stamp, bump_version
+
+logger = logging.getLogger(__name__)
+
+# Cohort search indexes kept in memory per worker
+SEARCH_INDEX_CACHE_SIZE = int(os.getenv("SEARCH_INDEX_CACHE_SIZE", "4"))
+
+# Matches the skill columns of StudentSkill and CompanySkill
+MAX_SKILL_LENGTH = 100
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+class SearchTarget:
+    """What a search index covers: the entity, its skill table and its filterable attributes"""
+
+    def __init__(
+        self, name: str, replaced_name: str, model, id_column, skill_model, skill_id_column, skills_field: str,
+        attributes: Dict[str, Any],
+    ):
+        # Dataset versions bumped by every write and by writes to existing rows
+        self.name = name
+        self.replaced_name = replaced_name
+        self.model = model
+        self.id_column = id_column
+        self.skill_model = skill_model
+        self.skill_id_column = skill_id_column
+        self.skills_field = skills_field
+        # Query parameter -> column
+        self.attributes = attributes
+
+
+STUDENT_SEARCH = SearchTarget(
+    STUDENTS, STUDENTS_REPLACED, Student, Student.student_id, StudentSkill, StudentSkill.student_id, "skills_text",
+    {"state": Student.state, "branch": Student.stream},
+)
+COMPANY_SEARCH = SearchTarget(
+    COMPANIES, COMPANIES_REPLACED, Company, Company.company_id, CompanySkill, CompanySkill.company_id, "req_skills_text",
+    {"state": Company.location_state},
+)
+
+
+def normalize_value(value: Optional[str]) -> Optional[str]:
+    """Case- and whitespace-insensitive form of a state or branch"""
+    if value is None:
+        return None
+    return " ".join(str(value).lower().split()) or None
+
+
+def query_skills(text: Optional[str]) -> List[str]:
+    """Skills of a search query ('python, django'), normalised like the indexed ones"""
+    return list(dict.fromkeys(skill[:MAX_SKILL_LENGTH] for skill in parse_skills(text)))
+
+
+def index_skills(db: Session, target: SearchTarget, cohort_id: str, rows: Iterable[Tuple[int, Optional[str]]]):
+    """Write the normalised skills of (id, skills text) rows at ingest; the caller commits"""
+    id_name = target.skill_id_column.key
+    values = [
+        {"cohort_id": cohort_id, "skill": skill, id_name: entity_id}
+        for entity_id, text in rows
+        for skill in query_skills(text)
+    ]
+    if values:
+        db.execute(insert(target.skill_model), values)
+
+
+def backfill_skill_indexes(db: Session):
+    """Normalise the skills of rows stored before the skill tables existed; a no-op once they are filled.
+
+    Marks the backfilled cohorts' rows as replaced, so search indexes built
+    from the still empty tables in the meantime are rebuilt.
+    """
+    for target in (STUDENT_SEARCH, COMPANY_SEARCH):
+        if db.query(target.skill_model).first() is not None or db.query(target.model).first() is None:
+            continue
+        start_time = time.time()
+        rows = load_columns(
+            db, select(target.model.cohort_id, target.id_column, getattr(target.model, target.skills_field))
+        )
+        by_cohort: Dict[str, List[Tuple[int, Optional[str]]]] = {}
+        for cohort_id, entity_id, text in zip(*(column(rows, name) for name in rows.columns)):
+            by_cohort.setdefault(cohort_id, []).append((entity_id, text))
+        for cohort_id, cohort_rows in by_cohort.items():
+            index_skills(db, target, cohort_id, cohort_rows)
+            bump_version(db, target.name, target.replaced_name, cohort_id=cohort_id)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker (or a concurrent write) filled the table first
+            db.rollback()
+            logger.info(f"The {target.name} skill index was filled concurrently")
+            continue
+        logger.info(f"Backfilled the {target.name} skill index for {len(rows)} rows in {time.time() - start_time:.2f} seconds")
+
+
+class SkillIndexBackfill:
+    """Runs `backfill_skill_indexes` once in a background thread, so startup and /health do not wait for it"""
+
+    def __init__(self):
+        self.status = "pending"
+        self.error: Optional[str] = None
+
+    def run(self, session_factory: Callable[[], Session]):
+        self.status = "running"
+        db = session_factory()
+        try:
+            backfill_skill_indexes(db)
+            self.status = "done"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            logger.error(f"Skill index backfill failed: {e}")
+        finally:
+            db.close()
+
+
+skill_backfill = SkillIndexBackfill()
+
+
+def _intersect(postings: List[np.ndarray]) -> np.ndarray:
+    """Ids in every sorted posting list, probing the larger lists with the smallest by binary search"""
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for posting in postings[1:]:
+        if not len(result) or not len(posting):
+            return _EMPTY
+        positions = np.minimum(np.searchsorted(posting, result), len(posting) - 1)
+        result = result[posting[positions] == result]
+    return result
+
+
+def _union(postings: List[np.ndarray]) -> np.ndarray:
+    """Ids in any sorted posting list, merged through a bitmap over the id range"""
+    postings = [posting for posting in postings if len(posting)]
+    if not postings:
+        return _EMPTY
+    low = min(int(posting[0]) for posting in postings)
+    high = max(int(posting[-1]) for posting in postings)
+    bitmap = np.zeros(high - low + 1, dtype=bool)
+    for posting in postings:
+        bitmap[posting - low] = True
+    return np.flatnonzero(bitmap) + low
+
+
+class SearchIndex:
+    """Sorted id posting lists of one cohort's students or positions, per skill and per attribute value.
+
+    Built from the skill table and the attribute columns; AND filters are
+    posting-list intersections, OR a bitmap union, and keyset pagination a
+    binary search for the cursor in the sorted result. Rows appended later
+    are merged in with `extended()`.
+    """
+
+    def __init__(self, ids: np.ndarray, skills: Dict[str, np.ndarray], attributes: Dict[str, Dict[str, np.ndarray]]):
+        self.ids = ids
+        self.skills = skills
+        self.attributes = attributes
+
+    @classmethod
+    def build(cls, db: Session, target: SearchTarget, cohort_id: str) -> "SearchIndex":
+        return cls(*cls._load(db, target, cohort_id))
+
+    @staticmethod
+    def _load(
+        db: Session, target: SearchTarget, cohort_id: str, after: Optional[int] = None
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray], Dict[str, Dict[str, np.ndarray]]]:
+        """(ids, skill postings, attribute postings) of the cohort's rows, or of those with an id above `after`"""
+        skill_query = (
+            select(target.skill_model.skill, target.skill_id_column.label("id"))
+            .where(target.skill_model.cohort_id == cohort_id)
+            .order_by(target.skill_model.skill, target.skill_id_column)
+        )
+        entity_query = (
+            select(target.id_column.label("id"), *(col.label(name) for name, col in target.attributes.items()))
+            .where(target.model.cohort_id == cohort_id)
+            .order_by(target.id_column)
+        )
+        if after is not None:
+            skill_query = skill_query.where(target.skill_id_column > after)
+            entity_query = entity_query.where(target.id_column > after)
+
+        skill_rows = load_columns(db, skill_query, arrays={"id": np.int64})
+        skill_names = column(skill_rows, "skill")
+        skill_ids = skill_rows.column("id")
+        starts = [0] + [i for i in range(1, len(skill_names)) if skill_names[i] != skill_names[i - 1]]
+        ends = starts[1:] + [len(skill_names)]
+        skills = {skill_names[start]: skill_ids[start:end] for start, end in zip(starts, ends) if end > start}
+
+        entity_rows = load_columns(db, entity_query, arrays={"id": np.int64})
+        ids = entity_rows.column("id")
+        attributes = {}
+        for name in target.attributes:
+            groups: Dict[str, List[int]] = {}
+            for row, value in enumerate(column(entity_rows, name)):
+                key = normalize_value(value)
+                if key is not None:
+                    groups.setdefault(key, []).append(row)
+            attributes[name] = {key: ids[np.array(rows, dtype=np.int64)] for key, rows in groups.items()}
+        return ids, skills, attributes
+
+    def extended(self, db: Session, target: SearchTarget, cohort_id: str) -> "SearchIndex":
+        """A new index with the rows appended since this one was loaded; only their postings are read.
+
+        Appended rows have larger ids than every indexed one (writers take
+        the cohort's version row lock before inserting), so each posting
+        list stays sorted by concatenation. Unchanged lists are shared.
+        """
+        after = int(self.ids[-1]) if len(self.ids) else None
+        ids, skills, attributes = self._load(db, target, cohort_id, after)
+        if not len(ids):
+            return self
+        merged_skills = dict(self.skills)
+        for skill, posting in skills.items():
+            merged_skills[skill] = np.concatenate([self.skills[skill], posting]) if skill in self.skills else posting
+        merged_attributes = {}
+        for name, values in self.attributes.items():
+            merged = dict(values)
+            for key, posting in attributes[name].items():
+                merged[key] = np.concatenate([values[key], posting]) if key in values else posting
+            merged_attributes[name] = merged
+        return SearchIndex(np.concatenate([self.ids, ids]), merged_skills, merged_attributes)
+
+    def search(
+        self, skills: List[str], match: str, filters: Dict[str, Optional[str]], after: Optional[int], limit: int
+    ) -> Tuple[List[int], Optional[int], int]:
+        """(ids of the page, cursor for the next page or None, total matches)"""
+        postings = []
+        if skills:
+            skill_postings = [self.skills.get(skill, _EMPTY) for skill in skills]
+            postings.append(_intersect(skill_postings) if match == "all" else _union(skill_postings))
+        for name, value in filters.items():
+            key = normalize_value(value)
+            if key is not None:
+                postings.append(self.attributes[name].get(key, _EMPTY))
+        matches = _intersect(postings) if postings else self.ids
+
+        start = int(np.searchsorted(matches, after, side="right")) if after is not None else 0
+        page = matches[start:start + limit]
+        next_after = int(page[-1]) if start + limit < len(matches) else None
+        return page.tolist(), next_after, len(matches)
+
+
+class SearchIndexCache:
+    """Search indexes by (entity, cohort), kept for the most recently searched cohorts.
+
+    Each index remembers the version stamps it reflects. After appends (a
+    newer `stamp`) the next search merges just the new rows into it; after
+    existing rows changed (a newer `generation`, e.g. an upload) it is
+    rebuilt. Concurrent searches of the same stale index update it once,
+    while indexes of other cohorts or entities update in parallel.
+    """
+
+    def __init__(self, max_entries: int = SEARCH_INDEX_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Stamp, Stamp, SearchIndex]]" = OrderedDict()
+        self._build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, key: Tuple[str, str]) -> Optional[Tuple[Stamp, Stamp, SearchIndex]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _build_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            return self._build_locks.setdefault(key, threading.Lock())
+
+    def get(self, db: Session, target: SearchTarget, cohort_id: str, stamp: Stamp, generation: Stamp) -> SearchIndex:
+        key = (target.name, cohort_id)
+        entry = self._entry(key)
+        if entry is not None and entry[:2] == (generation, stamp):
+            return entry[2]
+        with self._build_lock(key):
+            entry = self._entry(key)
+            if entry is not None and entry[:2] == (generation, stamp):
+                return entry[2]
+            if entry is not None and entry[0] == generation:
+                with timed("search_index_update"):
+                    index = entry[2].extended(db, target, cohort_id)
+            else:
+                with timed("search_index_build"):
+                    index = SearchIndex.build(db, target, cohort_id)
+                logger.info(
+                    f"Built {target.name} search index of cohort {cohort_id}: "
+                    f"{len(index.ids)} rows, {len(index.skills)} skills"
+                )
+            with self._lock:
+                self._entries[key] = (generation, stamp, index)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._build_locks.pop(evicted, None)
+        return index
+
+
+search_indexes = SearchIndexCache()
@@ -0,0 +1,222 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from typing import List, Dict, Any, Optional, Tuple
+import os
+import time
+import logging
+
+from core.schemas import AllocationParams
+from services.allocation import Allocator, AllocationState, CandidateScorer, assign, company_capacity
+from services.candidates import Candidates
+from services.loader import column, take
+from services.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Students scored per dense block inside a shard
+BLOCK_ROWS = 4096
+
+OTHER_REGION = "__other__"
+
+
+def region_key(state: Optional[str], regions: Optional[Dict[str, str]]) -> str:
+    """Shard key for a state: its configured region, or the state itself when no regions are configured"""
+    key = (state or "").strip().lower()
+    if regions is None:
+        return key or OTHER_REGION
+    return regions.get(key, OTHER_REGION)
+
+
+def _region_lookup(shard_regions: Optional[Dict[str, List[str]]]) -> Optional[Dict[str, str]]:
+    if shard_regions is None:
+        return None
+    return {state.strip().lower(): region for region, states in shard_regions.items() for state in states}
+
+
+SharedHandle = Tuple[str, Tuple[int, ...], str]
+
+
+def share_array(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, SharedHandle]:
+    """Copy an array into a new shared memory block; the caller closes and unlinks the block"""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def attach_array(handle: SharedHandle, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """Private copy of a shared array (or of the given rows) from a worker process"""
+    name, shape, dtype = handle
+    block = shared_memory.SharedMemory(name=name)
+    shared = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    try:
+        return (shared if rows is None else shared[rows]).copy()
+    finally:
+        del shared
+        block.close()
+
+
+def best_pairs(scorer: CandidateScorer, rows: np.ndarray, columns: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """All finite-score (row, column) pairs between the given students and positions, scored block by block"""
+    student_idx, company_idx, scores = [], [], []
+    for start in range(0, len(rows), BLOCK_ROWS):
+        block_rows = rows[start:start + BLOCK_ROWS]
+        block = scorer.score_block(block_rows, columns)
+        local_s, local_c = np.nonzero(np.isfinite(block))
+        student_idx.append(block_rows[local_s])
+        company_idx.append(columns[local_c])
+        scores.append(block[local_s, local_c])
+    if not student_idx:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return np.concatenate(student_idx), np.concatenate(company_idx), np.concatenate(scores)
+
+
+def _allocate_shard(task: Dict[str, Any]) -> Tuple[np.ndarray, ...]:
+    """Worker: allocation of one region shard over embeddings read from shared memory.
+
+    Returns the placed (student row, company row, score) triples and the
+    shard's top candidate pairs, both in global rows.
+    """
+    student_rows = task["student_rows"]
+    company_rows = task["company_rows"]
+    scorer = CandidateScorer(
+        task["students"],
+        task["companies"],
+        attach_array(task["student_embeddings"], student_rows),
+        attach_array(task["company_embeddings"], company_rows),
+        task["company_has_text"],
+        task["params"],
+    )
+    student_idx, company_idx, scores = best_pairs(scorer, np.arange(len(student_rows)), np.arange(len(company_rows)))
+    assignment, assigned_scores = assign(
+        task["params"], student_idx, company_idx, scores, company_capacity(task["companies"]), len(student_rows)
+    )
+    placed = assignment >= 0
+    candidate_s, candidate_c, candidate_scores = Candidates.from_pairs(
+        student_idx, company_idx, scores, len(student_rows)
+    ).pairs()
+    return (
+        student_rows[placed], company_rows[assignment[placed]], assigned_scores[placed],
+        student_rows[candidate_s], company_rows[candidate_c], candidate_scores,
+    )
+
+
+def shard_tasks(
+    students: List[Dict[str, Any]],
+    companies: List[Dict[str, Any]],
+    student_region: np.ndarray,
+    company_region: np.ndarray,
+    company_has_text: np.ndarray,
+    student_handle: SharedHandle,
+    company_handle: SharedHandle,
+    params: AllocationParams,
+) -> List[Dict[str, Any]]:
+    """One worker task per region with both students and positions.
+
+    Each task carries only its shard's rows (`take` copies them out of a
+    Records table), so the pickled tasks add up to the cohort once however
+    many shards there are; embeddings travel through shared memory.
+    """
+    tasks = []
+    for region in sorted(set(student_region) & set(company_region)):
+        student_rows = np.nonzero(student_region == region)[0]
+        company_rows = np.nonzero(company_region == region)[0]
+        tasks.append({
+            "student_rows": student_rows,
+            "company_rows": company_rows,
+            "students": take(students, student_rows),
+            "companies": take(companies, company_rows),
+            "company_has_text": company_has_text[company_rows],
+            "student_embeddings": student_handle,
+            "company_embeddings": company_handle,
+            "params": params,
+        })
+    return tasks
+
+
+def allocate_sharded(
+    allocator: Allocator, students: List[Dict[str, Any]], companies: List[Dict[str, Any]], params: AllocationParams
+) -> AllocationState:
+    """Allocate each region shard in a separate worker process, then reconcile leftovers globally.
+
+    Students are only matched to positions in their own region inside a
+    shard; students left unassigned afterwards compete for the remaining
+    seats anywhere in a final global pass. Embeddings are computed once here
+    and shared with the workers through shared memory. Shards use the
+    selected algorithm with score-derived preferences; explicit student
+    rankings only apply to unsharded runs.
+    """
+    if params.quotas:
+        raise ValueError("Quotas are not supported with sharded allocation.")
+    if params.rescorer:
+        raise ValueError("Re-scoring is not supported with sharded allocation.")
+    start_time = time.time()
+    embeddings = allocator.prepare(students, companies)
+    student_embeddings, company_embeddings = embeddings.students, embeddings.companies
+    company_has_text = embeddings.company_has_text
+    capacity = company_capacity(companies)
+
+    regions = _region_lookup(params.shard_regions)
+    student_region = np.array([region_key(state, regions) for state in column(students, "state")], dtype=object)
+    company_region = np.array([region_key(state, regions) for state in column(companies, "location_state")], dtype=object)
+
+    assignment = np.full(len(students), -1, dtype=np.int64)
+    assigned_scores = np.zeros(len(students), dtype=np.float32)
+    # Candidate (student row, company row, score) pairs of the shards and the reconciliation pass
+    candidate_pairs = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))]
+
+    student_block, student_handle = share_array(student_embeddings)
+    company_block, company_handle = share_array(company_embeddings)
+    try:
+        tasks = shard_tasks(
+            students, companies, student_region, company_region, company_has_text, student_handle, company_handle, params
+        )
+        workers = min(params.shard_workers or os.cpu_count() or 1, max(len(tasks), 1))
+        # spawn rather than fork: the server has torch loaded, and forked torch thread pools can deadlock
+        with timed("shard_workers", len(students)), ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            for rows, columns, scores, *candidates in pool.map(_allocate_shard, tasks):
+                assignment[rows] = columns
+                assigned_scores[rows] = scores
+                candidate_pairs.append(candidates)
+    finally:
+        for block in (student_block, company_block):
+            block.close()
+            block.unlink()
+    shard_time = time.time() - start_time
+
+    # Global reconciliation: unassigned students against positions with seats left, in any region
+    remaining = capacity - np.bincount(assignment[assignment >= 0], minlength=len(capacity))
+    free_students = np.nonzero(assignment < 0)[0]
+    free_columns = np.nonzero(remaining > 0)[0]
+    if len(free_students) and len(free_columns):
+        scorer = CandidateScorer(
+            take(students, free_students),
+            take(companies, free_columns),
+            student_embeddings[free_students],
+            company_embeddings[free_columns],
+            company_has_text[free_columns],
+            params,
+        )
+        with timed("scoring"):
+            local_s, local_c, scores = best_pairs(scorer, np.arange(len(free_students)), np.arange(len(free_columns)))
+        local_assignment, local_scores = assign(
+            params, local_s, local_c, scores, remaining[free_columns], len(free_students)
+        )
+        placed = local_assignment >= 0
+        assignment[free_students[placed]] = free_columns[local_assignment[placed]]
+        assigned_scores[free_students[placed]] = local_scores[placed]
+        candidate_pairs.append((free_students[local_s], free_columns[local_c], scores))
+
+    # The sharded run keeps no global scorer, so a later incremental request re-runs in full
+    allocator.state = AllocationState(students, companies, None, capacity, assignment, assigned_scores, params)
+    student_idx, company_idx, scores = (np.concatenate(part) for part in zip(*candidate_pairs))
+    # A student left over from a shard may meet the same position again in reconciliation; keep the shard's pair
+    _, first = np.unique(student_idx * len(companies) + company_idx, return_index=True)
+    student_idx, company_idx, scores = student_idx[first], company_idx[first], scores[first]
+    allocator.state.candidates = Candidates.from_pairs(student_idx, company_idx, scores, len(students))
+    logger.info(
+        f"Sharded allocation: {len(tasks)} shards on {workers} workers in {shard_time:.2f} seconds, "
+        f"{int((assignment >= 0).sum())} of {len(students)} students placed after reconciliation "
+        f"in {time.time() - start_time:.2f} seconds"
+    )
+    return allocator.state
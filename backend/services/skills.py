@@ -0,0 +1,148 @@
+import numpy as np
+import scipy.sparse as sp
+import re
+from typing import List, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SKILL_SEPARATORS = re.compile(r"[,;|\n]")
+
+
+def parse_skills(text: Optional[str]) -> List[str]:
+    """Split a free-text skills field ('Python, Django, SQL') into normalised skill names"""
+    if not text:
+        return []
+    skills = (" ".join(part.lower().split()) for part in _SKILL_SEPARATORS.split(text))
+    return list(dict.fromkeys(skill for skill in skills if skill))
+
+
+class SkillIndex:
+    """Inverted skill index over students and positions as sparse matrices.
+
+    `student_skills` is a binary (n_students, n_skills) CSR matrix and
+    `position_skills` a binary (n_skills, n_positions) CSC matrix, so the
+    number of shared skills for every pair is one sparse matmul and only pairs
+    with at least one skill in common are ever materialised.
+    """
+
+    def __init__(self, student_texts: List[Optional[str]], position_texts: List[Optional[str]]):
+        self.vocabulary: Dict[str, int] = {}
+        self.student_skills = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.position_skills = sp.csc_matrix((0, 0), dtype=np.float32)
+        self.add_students(student_texts)
+        self.add_positions(position_texts)
+        logger.info(
+            f"Skill index: {len(self.vocabulary)} skills, {self.student_skills.nnz} student and "
+            f"{self.position_skills.nnz} position skill entries"
+        )
+
+    def _incidence(self, texts: List[Optional[str]]) -> sp.csr_matrix:
+        skill_lists = [parse_skills(t) for t in texts]
+        for skills in skill_lists:
+            for skill in skills:
+                self.vocabulary.setdefault(skill, len(self.vocabulary))
+        indptr = np.zeros(len(skill_lists) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(skills) for skills in skill_lists])
+        indices = np.fromiter(
+            (self.vocabulary[skill] for skills in skill_lists for skill in skills), dtype=np.int32, count=int(indptr[-1])
+        )
+        data = np.ones(len(indices), dtype=np.float32)
+        return sp.csr_matrix((data, indices, indptr), shape=(len(skill_lists), len(self.vocabulary)))
+
+    def _sync_vocabulary(self):
+        n_skills = len(self.vocabulary)
+        if self.student_skills.shape[1] != n_skills:
+            self.student_skills.resize((self.student_skills.shape[0], n_skills))
+        if self.position_skills.shape[0] != n_skills:
+            self.position_skills.resize((n_skills, self.position_skills.shape[1]))
+
+    def add_students(self, texts: List[Optional[str]]):
+        """Append student rows; new skills extend the shared vocabulary"""
+        rows = self._incidence(texts)
+        self._sync_vocabulary()
+        self.student_skills = sp.vstack([self.student_skills, rows], format="csr")
+        self.student_counts = np.asarray(self.student_skills.sum(axis=1)).ravel()
+        self._overlap = None
+
+    def add_positions(self, texts: List[Optional[str]]):
+        """Append position columns; new skills extend the shared vocabulary"""
+        columns = self._incidence(texts).T.tocsc()
+        self._sync_vocabulary()
+        self.position_skills = sp.hstack([self.position_skills, columns], format="csc")
+        self.position_counts = np.asarray(self.position_skills.sum(axis=0)).ravel()
+        self._overlap = None
+
+    def overlap(self, rows: Optional[np.ndarray] = None, columns: Optional[np.ndarray] = None) -> sp.csr_matrix:
+        """(n_students, n_positions) count of shared skills, non-zero only where skills overlap
+
+        `rows` and `columns` restrict the computation to a subset of students and positions.
+        """
+        if rows is None and columns is None:
+            if self._overlap is None:
+                self._overlap = (self.student_skills @ self.position_skills).tocsr()
+            return self._overlap
+        student_skills = self.student_skills if rows is None else self.student_skills[rows]
+        position_skills = self.position_skills if columns is None else self.position_skills[:, columns]
+        return (student_skills @ position_skills).tocsr()
+
+    def similarity(
+        self, metric: str = "jaccard", rows: Optional[np.ndarray] = None, columns: Optional[np.ndarray] = None
+    ) -> sp.csr_matrix:
+        """Sparse skill similarity for all pairs sharing at least one skill.
+
+        `jaccard` is |S ∩ P| / |S ∪ P|; `weighted` is the IDF-weighted share
+        of the position's required skills that the student has. `rows` and
+        `columns` restrict the result to a subset of students and positions.
+        """
+        if metric == "jaccard":
+            overlap = self.overlap(rows, columns).tocoo()
+            student_counts = self.student_counts if rows is None else self.student_counts[rows]
+            position_counts = self.position_counts if columns is None else self.position_counts[columns]
+            union = student_counts[overlap.row] + position_counts[overlap.col] - overlap.data
+            values = overlap.data / np.maximum(union, 1)
+            return sp.csr_matrix((values.astype(np.float32), (overlap.row, overlap.col)), shape=overlap.shape)
+        if metric == "weighted":
+            student_skills = self.student_skills if rows is None else self.student_skills[rows]
+            weighted = self._idf_weighted_positions()
+            if columns is not None:
+                weighted = weighted[:, columns]
+            return (student_skills @ weighted).tocsr()
+        raise ValueError(f"Unknown skill metric: {metric}")
+
+    def _idf_weighted_positions(self) -> sp.csc_matrix:
+        """Position skill columns weighted by IDF and normalised to sum to one"""
+        n_students = self.student_skills.shape[0]
+        document_frequency = np.asarray((self.student_skills > 0).sum(axis=0)).ravel()
+        idf = np.log((1 + n_students) / (1 + document_frequency)) + 1.0
+        weighted = sp.diags(idf.astype(np.float32)) @ self.position_skills
+        totals = np.asarray(weighted.sum(axis=0)).ravel()
+        return (weighted @ sp.diags((1.0 / np.maximum(totals, 1e-8)).astype(np.float32))).tocsc()
+
+    def pair_overlap(self, student_idx: np.ndarray, position_idx: np.ndarray) -> np.ndarray:
+        """Shared-skill counts for explicit pairs, without building the full overlap matrix"""
+        return self._pair_dot(self.student_skills, self.position_skills, student_idx, position_idx)
+
+    def pair_similarity(self, student_idx: np.ndarray, position_idx: np.ndarray, metric: str = "jaccard") -> np.ndarray:
+        """Skill similarity for explicit pairs, O(number of pairs x skills per student)"""
+        if metric == "jaccard":
+            overlap = self.pair_overlap(student_idx, position_idx)
+            union = self.student_counts[student_idx] + self.position_counts[position_idx] - overlap
+            return (overlap / np.maximum(union, 1)).astype(np.float32)
+        if metric == "weighted":
+            return self._pair_dot(self.student_skills, self._idf_weighted_positions(), student_idx, position_idx)
+        raise ValueError(f"Unknown skill metric: {metric}")
+
+    @staticmethod
+    def _pair_dot(students: sp.csr_matrix, positions: sp.csc_matrix, student_idx: np.ndarray, position_idx: np.ndarray) -> np.ndarray:
+        if len(student_idx) == 0:
+            return np.zeros(0, dtype=np.float32)
+        products = students[student_idx].multiply(positions.T.tocsr()[position_idx])
+        return np.asarray(products.sum(axis=1)).ravel().astype(np.float32)
+
+    def candidate_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(student_idx, position_idx) of every pair sharing at least one skill"""
+        overlap = self.overlap().tocoo()
+        order = np.lexsort((overlap.col, overlap.row))
+        return overlap.row[order].astype(np.int64), overlap.col[order].astype(np.int64)
+
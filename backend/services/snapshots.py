@@ -0,0 +1,163 @@
+import numpy as np
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+import hashlib
+import os
+import shutil
+import time
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+from services.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Directory for memory-mapped embedding snapshots shared by all workers; empty disables snapshots
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "")
+
+# Snapshot versions kept on disk besides the one just published
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "2"))
+
+_LOCK = ".builder.lock"
+# Held shared while a snapshot is mapped and exclusively while old ones are removed
+_PRUNE_LOCK = ".prune.lock"
+
+
+def snapshot_key(model_name: str, student_texts: List[str], company_texts: List[str]) -> str:
+    """Content hash of everything the embeddings depend on: the model and the texts, in row order"""
+    digest = hashlib.blake2b(model_name.encode(), digest_size=16)
+    for texts in (student_texts, company_texts):
+        digest.update(b"\x1e")
+        for text in texts:
+            digest.update(text.encode())
+            digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class Embeddings:
+    """Encoded cohort: student and company matrices and the FAISS index over companies with text.
+
+    Index positions map to `indexed_rows`, the company rows that have text.
+    The arrays are plain in-memory arrays or read-only memory maps of a
+    snapshot; callers never modify them in place.
+    """
+
+    def __init__(self, students: np.ndarray, companies: np.ndarray, company_has_text: np.ndarray, index=None, key: Optional[str] = None):
+        self.students = students
+        self.companies = companies
+        self.company_has_text = company_has_text
+        self.index = index
+        self.key = key
+
+    @property
+    def indexed_rows(self) -> np.ndarray:
+        return np.nonzero(self.company_has_text)[0]
+
+
+class SnapshotStore:
+    """Versioned, memory-mapped embedding snapshots shared by the workers of one host.
+
+    Each snapshot is a directory named by its content key holding the
+    student and company matrices as .npy files and the FAISS index. Workers
+    map the files read-only, so the page cache holds one copy however many
+    workers there are. The first worker that needs a missing snapshot becomes
+    its builder under an exclusive file lock; the others wait on the lock and
+    then map what it wrote. Snapshots are written to a temporary directory
+    and renamed into place, so a reader never sees a partial one. Old
+    versions are pruned; existing mappings outlive the unlinked files, and a
+    prune waits for loads in progress, so a snapshot is never removed
+    half-mapped.
+    """
+
+    def __init__(self, directory: str, keep: int = SNAPSHOT_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self.mapped: Optional[Embeddings] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def load(self, key: str) -> Optional[Embeddings]:
+        """Map a published snapshot read-only, or None if it does not exist (or was pruned meanwhile)"""
+        path = self._path(key)
+        with self._file_lock(_PRUNE_LOCK, shared=True):
+            if not os.path.isdir(path):
+                return None
+            import faiss
+            with timed("snapshot_load"):
+                embeddings = Embeddings(
+                    np.load(os.path.join(path, "students.npy"), mmap_mode="r"),
+                    np.load(os.path.join(path, "companies.npy"), mmap_mode="r"),
+                    np.load(os.path.join(path, "company_has_text.npy")),
+                    faiss.read_index(os.path.join(path, "index.faiss"), faiss.IO_FLAG_MMAP),
+                    key,
+                )
+        return embeddings
+
+    @contextmanager
+    def _file_lock(self, name: str, shared: bool = False) -> Iterator[None]:
+        """flock on a file of the directory, across the processes sharing it"""
+        with open(os.path.join(self.directory, name), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def builder_lock(self):
+        """Exclusive across the processes sharing the directory"""
+        return self._file_lock(_LOCK)
+
+    def publish(self, key: str, embeddings: Embeddings):
+        """Write a snapshot under a temporary name and rename it into place"""
+        import faiss
+        with timed("snapshot_write"):
+            staging = os.path.join(self.directory, f".{key}.{os.getpid()}.tmp")
+            os.makedirs(staging, exist_ok=True)
+            np.save(os.path.join(staging, "students.npy"), np.ascontiguousarray(embeddings.students, dtype=np.float32))
+            np.save(os.path.join(staging, "companies.npy"), np.ascontiguousarray(embeddings.companies, dtype=np.float32))
+            np.save(os.path.join(staging, "company_has_text.npy"), np.asarray(embeddings.company_has_text, dtype=bool))
+            faiss.write_index(embeddings.index, os.path.join(staging, "index.faiss"))
+            if os.path.isdir(self._path(key)):
+                shutil.rmtree(staging)
+            else:
+                os.rename(staging, self._path(key))
+        self.prune(key)
+
+    def prune(self, current: str):
+        """Remove all but the newest `keep` snapshots besides `current`, once no other process is mapping one"""
+        with self._file_lock(_PRUNE_LOCK):
+            versions = [
+                name for name in os.listdir(self.directory)
+                if name != current and not name.startswith(".") and os.path.isdir(self._path(name))
+            ]
+            versions.sort(key=lambda name: os.path.getmtime(self._path(name)), reverse=True)
+            for name in versions[self.keep:]:
+                shutil.rmtree(self._path(name), ignore_errors=True)
+
+    def get_or_build(self, key: str, build: Callable[[], Embeddings]) -> Embeddings:
+        """The snapshot for `key`, mapped from disk or built once by whichever worker gets the lock first"""
+        if self.mapped is not None and self.mapped.key == key:
+            return self.mapped
+        embeddings = self.load(key)
+        if embeddings is None:
+            start_time = time.time()
+            with self.builder_lock():
+                embeddings = self.load(key)
+                if embeddings is None:
+                    self.publish(key, build())
+                    embeddings = self.load(key)
+                    logger.info(f"Built embedding snapshot {key} in {time.time() - start_time:.2f} seconds")
+        logger.info(
+            f"Mapped embedding snapshot {key}: {embeddings.students.shape[0]} students, "
+            f"{embeddings.companies.shape[0]} positions"
+        )
+        self.mapped = embeddings
+        return embeddings
@@ -0,0 +1,106 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from typing import Dict, Optional, Set, Tuple
+from datetime import datetime
+import os
+import threading
+import time
+import logging
+
+from core.models import DEFAULT_COHORT, DatasetVersion
+
+logger = logging.getLogger(__name__)
+
+STUDENTS = "students"
+COMPANIES = "companies"
+# Bumped whenever a cohort's current allocation run changes (publish, or runs deleted by an upload)
+ALLOCATIONS = "allocations"
+# Bumped when existing students or positions of a cohort change (replaced by an upload, skills
+# backfilled), as opposed to rows being appended; search indexes rebuild instead of extending
+STUDENTS_REPLACED = "students_replaced"
+COMPANIES_REPLACED = "companies_replaced"
+
+# Seconds a process reuses version stamps read from the database; writes made by this
+# process invalidate them at once, writes made by other workers show up within this delay
+VERSION_TTL_SECONDS = float(os.getenv("VERSION_TTL_SECONDS", "1.0"))
+
+# Session.info key of the cohorts whose cached stamps are dropped when the session commits
+_PENDING_INVALIDATIONS = "version_stamp_invalidations"
+
+# (version, updated_at) of one dataset; (0, None) for a dataset never written
+Stamp = Tuple[int, Optional[datetime]]
+
+
+def bump_version(db: Session, *names: str, cohort_id: str = DEFAULT_COHORT):
+    """Increment the version counter of the named datasets of a cohort; committed with the caller's transaction.
+
+    The cohort's cached stamps are dropped once that transaction commits,
+    so a stamp read in the meantime cannot outlive the write.
+    """
+    for name in names:
+        updated = db.query(DatasetVersion).filter(
+            DatasetVersion.cohort_id == cohort_id, DatasetVersion.name == name
+        ).update(
+            {DatasetVersion.version: DatasetVersion.version + 1, DatasetVersion.updated_at: datetime.utcnow()},
+            synchronize_session=False,
+        )
+        if not updated:
+            db.add(DatasetVersion(cohort_id=cohort_id, name=name, version=1))
+            db.flush()
+    db.info.setdefault(_PENDING_INVALIDATIONS, set()).add(cohort_id)
+
+
+def dataset_version(db: Session, cohort_id: str = DEFAULT_COHORT) -> Tuple[int, int]:
+    """Current (students, companies) version counters of a cohort; 0 for a dataset never written"""
+    versions = dict(
+        db.query(DatasetVersion.name, DatasetVersion.version).filter(DatasetVersion.cohort_id == cohort_id)
+    )
+    return versions.get(STUDENTS, 0), versions.get(COMPANIES, 0)
+
+
+class VersionStamps:
+    """Per-cohort version stamps of every dataset, read with one query and reused for a short TTL.
+
+    Conditional GETs compare against these stamps, so a poll that finds
+    nothing changed answers without touching the database.
+    """
+
+    def __init__(self, ttl: float = VERSION_TTL_SECONDS):
+        self.ttl = ttl
+        self._stamps: Dict[str, Tuple[float, Dict[str, Stamp]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, cohort_id: str, name: str) -> Stamp:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._stamps.get(cohort_id)
+        if entry is None or now - entry[0] > self.ttl:
+            stamps = {
+                row_name: (version, updated_at)
+                for row_name, version, updated_at in db.query(
+                    DatasetVersion.name, DatasetVersion.version, DatasetVersion.updated_at
+                ).filter(DatasetVersion.cohort_id == cohort_id)
+            }
+            entry = (now, stamps)
+            with self._lock:
+                self._stamps[cohort_id] = entry
+        return entry[1].get(name, (0, None))
+
+    def invalidate(self, cohort_id: str):
+        with self._lock:
+            self._stamps.pop(cohort_id, None)
+
+
+version_stamps = VersionStamps()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(db: Session):
+    cohort_ids: Set[str] = db.info.pop(_PENDING_INVALIDATIONS, set())
+    for cohort_id in cohort_ids:
+        version_stamps.invalidate(cohort_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(db: Session):
+    db.info.pop(_PENDING_INVALIDATIONS, None)
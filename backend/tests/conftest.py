@@ -0,0 +1,51 @@
+import csv
+import os
+import tempfile
+import uuid
+from typing import Dict, List, Optional
+
+import pytest
+
+# The app reads its configuration at import time: point it at a scratch
+# database and candidate directory before any test imports it
+_SCRATCH = tempfile.mkdtemp(prefix="skillsync-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_SCRATCH, 'test.db')}"
+os.environ["CANDIDATE_DIR"] = os.path.join(_SCRATCH, "candidates")
+os.environ["SNAPSHOT_DIR"] = ""
+os.environ["MODEL_PRELOAD"] = "off"
+os.environ["PROFILE_REQUESTS"] = "off"
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+
+
+def read_rows(filename: str) -> List[Dict[str, Optional[str]]]:
+    """Raw rows of a data/*.csv file, with None for empty cells like the upload endpoints"""
+    with open(os.path.join(DATA_DIR, filename), newline="") as f:
+        return [{key: value if value != "" else None for key, value in row.items()} for row in csv.DictReader(f)]
+
+
+@pytest.fixture(scope="session")
+def student_rows():
+    return read_rows("students_profiles_with_city.csv")
+
+
+@pytest.fixture(scope="session")
+def company_rows():
+    return read_rows("company_positions.csv")
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client of the app over the scratch database"""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def cohort():
+    """URL prefix of a cohort of its own, so each test starts from empty data and caches"""
+    return f"/cohorts/test-{uuid.uuid4().hex[:12]}"
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from services.admission import HEAVY, LIGHT, PRIORITIES, AdmissionGate, Rejected, endpoint_class
+
+
+def test_endpoint_classes():
+    assert endpoint_class("POST", "/allocate/") == HEAVY
+    assert endpoint_class("POST", "/cohorts/spring/allocate/scenarios") == HEAVY
+    assert endpoint_class("POST", "/upload/students") == HEAVY
+    assert endpoint_class("GET", "/allocate/") == LIGHT
+    assert endpoint_class("GET", "/cohorts/spring/students/search") == LIGHT
+    assert endpoint_class("GET", "/health") is None
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    async def scenario():
+        gate = AdmissionGate("test", limit=1, queue_size=4, timeout=5)
+        await gate.acquire(PRIORITIES["normal"])
+        served = []
+
+        async def wait(name, priority):
+            await gate.acquire(priority)
+            served.append(name)
+
+        tasks = [
+            asyncio.ensure_future(wait("low", PRIORITIES["low"])),
+            asyncio.ensure_future(wait("normal-1", PRIORITIES["normal"])),
+            asyncio.ensure_future(wait("high", PRIORITIES["high"])),
+            asyncio.ensure_future(wait("normal-2", PRIORITIES["normal"])),
+        ]
+        await asyncio.sleep(0)
+        assert gate.depth == 4
+        for _ in tasks:
+            gate.release(0.1)
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        gate.release(0.1)
+        assert gate.active == 0
+        return served
+
+    assert asyncio.run(scenario()) == ["high", "normal-1", "normal-2", "low"]
+
+
+def test_full_queue_evicts_worse_waiter_or_rejects():
+    async def scenario():
+        gate = AdmissionGate("test", limit=1, queue_size=1, timeout=5)
+        await gate.acquire(PRIORITIES["normal"])
+        low = asyncio.ensure_future(gate.acquire(PRIORITIES["low"]))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected, match="queue_full"):
+            await gate.acquire(PRIORITIES["low"])
+        high = asyncio.ensure_future(gate.acquire(PRIORITIES["high"]))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected, match="evicted"):
+            await low
+        gate.release()
+        await high
+        assert gate.retry_after() >= 1
+
+    asyncio.run(scenario())
+
+
+def test_wait_times_out():
+    async def scenario():
+        gate = AdmissionGate("test", limit=1, queue_size=1, timeout=0.05)
+        await gate.acquire(PRIORITIES["normal"])
+        with pytest.raises(Rejected, match="timeout"):
+            await gate.acquire(PRIORITIES["high"])
+        assert gate.depth == 0
+
+    asyncio.run(scenario())
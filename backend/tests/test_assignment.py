@@ -0,0 +1,56 @@
+import numpy as np
+
+from services.assignment import greedy_assign, stable_assign
+
+
+def random_pairs(seed: int, n_students: int = 40, n_companies: int = 8, density: float = 0.5):
+    rng = np.random.default_rng(seed)
+    student_idx, company_idx = [a.ravel() for a in np.indices((n_students, n_companies))]
+    keep = rng.random(len(student_idx)) < density
+    scores = rng.random(int(keep.sum())).astype(np.float32)
+    capacity = rng.integers(1, 4, n_companies)
+    return student_idx[keep], company_idx[keep], scores, capacity, n_students
+
+
+def assert_within_capacity(assignment, capacity):
+    counts = np.bincount(assignment[assignment >= 0], minlength=len(capacity))
+    assert (counts <= capacity).all()
+
+
+def test_greedy_respects_capacity_and_takes_best_pair_first():
+    student_idx, company_idx, scores, capacity, n = random_pairs(0)
+    assignment, assigned = greedy_assign(student_idx, company_idx, scores, capacity, n)
+    assert_within_capacity(assignment, capacity)
+    best = int(np.argmax(scores))
+    assert assignment[student_idx[best]] == company_idx[best]
+    assert assigned[student_idx[best]] == scores[best]
+
+
+def test_stable_assignment_has_no_blocking_pair():
+    for seed in range(5):
+        student_idx, company_idx, scores, capacity, n = random_pairs(seed)
+        assignment, assigned = stable_assign(student_idx, company_idx, scores, capacity, n)
+        assert_within_capacity(assignment, capacity)
+        counts = np.bincount(assignment[assignment >= 0], minlength=len(capacity))
+        for s, c, score in zip(student_idx, company_idx, scores):
+            prefers = assignment[s] < 0 or score > assigned[s]
+            if not prefers:
+                continue
+            holders = np.nonzero(assignment == c)[0]
+            # The company is full and every holder scores at least as high as the student
+            assert counts[c] == capacity[c]
+            assert all(assigned[h] >= score for h in holders)
+
+
+def test_stable_follows_explicit_preference():
+    student_idx = np.array([0, 0, 1, 1])
+    company_idx = np.array([0, 1, 0, 1])
+    scores = np.array([0.9, 0.2, 0.8, 0.1], dtype=np.float32)
+    capacity = np.array([1, 1])
+    # By score both students want position 0, which keeps student 0
+    assignment, _ = stable_assign(student_idx, company_idx, scores, capacity, 2)
+    assert assignment.tolist() == [0, 1]
+    # Both rank position 1 first, which keeps student 0 instead
+    preference = np.array([1, 0, 1, 0], dtype=np.float32)
+    assignment, _ = stable_assign(student_idx, company_idx, scores, capacity, 2, preference)
+    assert assignment.tolist() == [1, 0]
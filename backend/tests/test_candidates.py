@@ -0,0 +1,97 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from services.candidates import CandidateStore, Candidates, run_key
+
+CREATED = datetime(2025, 1, 1, 12, 0, 0, 123456)
+
+
+def table_data(offset: int):
+    student_ids = np.array([1, 2, 3])
+    company_ids = np.array([[10, 11], [11, -1], [12, 10]]) + offset
+    scores = np.array([[0.9, 0.5], [0.7, -np.inf], [0.8, 0.1]], dtype=np.float32)
+    return student_ids, company_ids, scores
+
+
+def test_from_pairs_keeps_top_k_per_student_best_first():
+    student_idx = np.array([0, 0, 0, 1, 2, 2])
+    company_idx = np.array([0, 1, 2, 0, 1, 2])
+    scores = np.array([0.1, 0.9, 0.5, 0.3, 0.2, 0.4], dtype=np.float32)
+    candidates = Candidates.from_pairs(student_idx, company_idx, scores, 4, top_k=2)
+    assert candidates.rows.tolist() == [[1, 2], [0, -1], [2, 1], [-1, -1]]
+    assert candidates.scores[0].tolist() == pytest.approx([0.9, 0.5])
+
+
+def test_merge_and_without_columns():
+    candidates = Candidates.from_pairs(np.array([0, 0]), np.array([0, 1]), np.array([0.5, 0.4], dtype=np.float32), 1, 2)
+    merged = candidates.merge(np.array([0, 1]), np.array([2, 0]), np.array([0.8, 0.6], dtype=np.float32), 2)
+    assert merged.rows.tolist() == [[2, 0], [0, -1]]
+    assert merged.without_columns(np.array([2])).rows.tolist() == [[0, -1], [0, -1]]
+
+
+def test_table_lookup(tmp_path):
+    store = CandidateStore(str(tmp_path))
+    store.write(run_key(1, CREATED), *table_data(0))
+    table = store.table(run_key(1, CREATED))
+    assert [c for c, _ in table.get(1)] == [10, 11]
+    assert [c for c, _ in table.get(2)] == [11]
+    assert table.get(4) is None
+    student_ids, company_ids, _ = table.pairs()
+    assert sorted(zip(student_ids.tolist(), company_ids.tolist())) == [(1, 10), (1, 11), (2, 11), (3, 10), (3, 12)]
+
+
+def test_reused_run_id_does_not_serve_the_old_table(tmp_path):
+    store = CandidateStore(str(tmp_path))
+    old_key, new_key = run_key(1, CREATED), run_key(1, CREATED + timedelta(minutes=5))
+    store.write(old_key, *table_data(0))
+    assert store.table(old_key).get(1)[0][0] == 10
+    store.write(new_key, *table_data(100))
+    assert store.table(new_key).get(1)[0][0] == 110
+
+
+def test_write_replaces_an_existing_table(tmp_path):
+    store = CandidateStore(str(tmp_path))
+    key = run_key(1, CREATED)
+    store.write(key, *table_data(0))
+    assert store.table(key).get(1)[0][0] == 10
+    store.write(key, *table_data(100))
+    assert store.table(key).get(1)[0][0] == 110
+    assert CandidateStore(str(tmp_path)).table(key).get(1)[0][0] == 110
+
+
+def test_prune_keeps_newest_runs_and_clear_removes_all(tmp_path):
+    store = CandidateStore(str(tmp_path), keep=2)
+    os.makedirs(tmp_path / "run-7")
+    keys = [run_key(run_id, CREATED + timedelta(seconds=run_id)) for run_id in (3, 1, 2)]
+    for key in keys:
+        store.write(key, *table_data(0))
+    assert sorted(os.listdir(tmp_path)) == sorted(f"run-{key}" for key in keys if not key.startswith("1-"))
+    store.clear()
+    assert os.listdir(tmp_path) == []
+
+
+def test_reuploaded_companies_get_the_new_runs_candidates(client, cohort):
+    pytest.importorskip("faiss")
+    pytest.importorskip("sentence_transformers")
+    data = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+    with open(os.path.join(data, "students_profiles_with_city.csv"), "rb") as f:
+        assert client.post(f"{cohort}/upload/students", files={"file": ("s.csv", f, "text/csv")}).status_code == 200
+    with open(os.path.join(data, "company_positions.csv"), "rb") as f:
+        header, *rows = f.read().decode().splitlines()
+    assert client.post(f"{cohort}/upload/companies", files={"file": ("c.csv", "\n".join([header] + rows), "text/csv")}).status_code == 200
+    assert client.post(f"{cohort}/allocate/", json={}).status_code == 200
+    first = client.get(f"{cohort}/allocate/students/1/candidates").json()
+
+    # Re-uploading deletes the cohort's runs, so the next run may get the same run id
+    reversed_csv = "\n".join([header] + rows[::-1])
+    assert client.post(f"{cohort}/upload/companies", files={"file": ("c.csv", reversed_csv, "text/csv")}).status_code == 200
+    assert client.post(f"{cohort}/allocate/", json={}).status_code == 200
+    second = client.get(f"{cohort}/allocate/students/1/candidates").json()
+
+    # Same students and positions under new ids: the same named positions with the same scores
+    assert sorted((c["company_name"], round(c["score"], 3)) for c in second["candidates"]) == sorted(
+        (c["company_name"], round(c["score"], 3)) for c in first["candidates"]
+    )
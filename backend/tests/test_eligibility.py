@@ -0,0 +1,94 @@
+import numpy as np
+
+from core.schemas import AllocationParams
+from services.allocation import AllocationState
+from services.eligibility import EligibilityConstraints
+from services.ingest import INTERNSHIP_EXPERIENCE_YEARS, company_from_row, student_from_row
+
+
+def sample_data(student_rows, company_rows):
+    return [student_from_row(row) for row in student_rows], [company_from_row(row) for row in company_rows]
+
+
+def test_student_experience_derived_from_internships(student_rows):
+    for row in student_rows:
+        student = student_from_row(row)
+        assert student["experience_years"] == int(row["internships_count"]) * INTERNSHIP_EXPERIENCE_YEARS
+
+
+def test_explicit_experience_column_wins():
+    student = student_from_row({"name": "A B", "internships_count": "3", "experience_years": "0.5"})
+    assert student["experience_years"] == 0.5
+
+
+def test_mask_enforces_every_experience_minimum_on_sample_data(student_rows, company_rows):
+    students, companies = sample_data(student_rows, company_rows)
+    constraints = EligibilityConstraints(students, companies)
+    mask = constraints.mask()
+    experience = np.array([s["experience_years"] for s in students])
+    required = np.array([c["min_experience_years"] for c in companies])
+
+    assert 0 < mask.sum() < mask.size
+    assert np.array_equal(mask, experience[:, None] >= required[None, :])
+    # Positions nobody meets stay closed and are reported
+    unfillable = constraints.unfillable()
+    assert unfillable.any()
+    assert np.array_equal(unfillable, ~mask.any(axis=0))
+
+
+def test_enforcement_does_not_depend_on_who_is_in_the_cohort():
+    companies = [{"min_cgpa": None, "min_experience_years": 5.0, "location_state": None}]
+    constraints = EligibilityConstraints([{"cgpa": None, "experience_years": 0.0, "state": None}], companies)
+    assert not constraints.mask().any()
+    constraints.add_students([{"cgpa": None, "experience_years": 6.0, "state": None}])
+    assert constraints.mask()[:, 0].tolist() == [False, True]
+    assert constraints.unfillable().tolist() == [False]
+    assert constraints.unfillable(np.array([True, False])).tolist() == [True]
+
+
+def test_unknown_student_values_fail_only_when_strict():
+    students = [{"cgpa": None, "experience_years": None, "state": None}] * 2
+    companies = [{"min_cgpa": 7.0, "min_experience_years": 1.0, "location_state": None}]
+    assert EligibilityConstraints(students, companies).mask().all()
+    strict = EligibilityConstraints(students, companies, strict=True)
+    assert not strict.mask().any()
+    assert strict.unfillable().tolist() == [True]
+
+
+def test_unfillable_needs_one_student_meeting_both_minimums():
+    students = [
+        {"cgpa": 9.0, "experience_years": 0.0, "state": None},
+        {"cgpa": 6.0, "experience_years": 3.0, "state": None},
+    ]
+    companies = [
+        {"min_cgpa": 8.0, "min_experience_years": 2.0, "location_state": None},
+        {"min_cgpa": 8.0, "min_experience_years": None, "location_state": None},
+        {"min_cgpa": None, "min_experience_years": 2.0, "location_state": None},
+        {"min_cgpa": 9.5, "min_experience_years": None, "location_state": None},
+    ]
+    constraints = EligibilityConstraints(students, companies)
+    assert constraints.unfillable().tolist() == [True, False, False, True]
+    assert np.array_equal(constraints.unfillable(), ~constraints.mask().any(axis=0))
+
+
+def test_pair_mask_matches_dense_mask(student_rows, company_rows):
+    students, companies = sample_data(student_rows, company_rows)
+    constraints = EligibilityConstraints(students, companies, require_same_state=True)
+    mask = constraints.mask()
+    student_idx, company_idx = np.nonzero(np.ones_like(mask))
+    assert np.array_equal(constraints.pair_mask(student_idx, company_idx), mask[student_idx, company_idx])
+
+
+def test_allocation_state_reports_unfillable_positions():
+    students = [{"student_id": 1, "cgpa": 7.0, "experience_years": 0.5, "state": None}]
+    companies = [
+        {"company_id": 10, "min_cgpa": 6.0, "min_experience_years": None, "location_state": None},
+        {"company_id": 11, "min_cgpa": None, "min_experience_years": 2.0, "location_state": None},
+    ]
+    state = AllocationState(
+        students, companies, None, np.ones(2, dtype=np.int64), np.array([0]), np.ones(1, dtype=np.float32),
+        AllocationParams(),
+    )
+    assert [c["company_id"] for c in state.unfillable()] == [11]
+    state.params = AllocationParams(enforce_eligibility=False)
+    assert state.unfillable() == []
@@ -0,0 +1,50 @@
+from core.database import SessionLocal
+from services.versioning import STUDENTS, bump_version, version_stamps
+
+
+def test_unchanged_poll_answers_304_until_a_write(client, cohort):
+    student = {"first_name": "Asha", "last_name": "Rao", "skills_text": "Python"}
+    assert client.post(f"{cohort}/students/", json=student).status_code == 200
+
+    first = client.get(f"{cohort}/students/")
+    assert first.status_code == 200
+    tag = first.headers["ETag"]
+    again = client.get(f"{cohort}/students/", headers={"If-None-Match": tag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == tag
+    assert client.get(f"{cohort}/students/", headers={"If-None-Match": f'"other", {tag.replace("W/", "")}'}).status_code == 304
+
+    assert client.post(f"{cohort}/students/", json={**student, "first_name": "Ravi"}).status_code == 200
+    changed = client.get(f"{cohort}/students/", headers={"If-None-Match": tag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != tag
+    assert len(changed.json()) == 2
+
+
+def test_cohorts_have_separate_validators(client, cohort):
+    other = f"{cohort}-other"
+    assert client.post(f"{cohort}/students/", json={"first_name": "A", "last_name": "B"}).status_code == 200
+    tag = client.get(f"{cohort}/students/").headers["ETag"]
+    assert client.post(f"{other}/students/", json={"first_name": "C", "last_name": "D"}).status_code == 200
+    assert client.get(f"{cohort}/students/", headers={"If-None-Match": tag}).status_code == 304
+    assert client.get(f"{other}/students/", headers={"If-None-Match": tag}).status_code == 200
+
+
+def test_stamps_read_before_a_commit_are_dropped_by_it(client, cohort):
+    cohort_id = cohort.rsplit("/", 1)[-1]
+    writer, reader = SessionLocal(), SessionLocal()
+    try:
+        bump_version(writer, STUDENTS, cohort_id=cohort_id)
+        # A concurrent request caches the stamp from before the write...
+        before = version_stamps.get(reader, cohort_id, STUDENTS)
+        reader.rollback()
+        writer.commit()
+        # ...and sees the write as soon as it commits, not only after the TTL
+        assert version_stamps.get(reader, cohort_id, STUDENTS)[0] == before[0] + 1
+
+        bump_version(writer, STUDENTS, cohort_id=cohort_id)
+        writer.rollback()
+        assert version_stamps.get(reader, cohort_id, STUDENTS)[0] == before[0] + 1
+    finally:
+        writer.close()
+        reader.close()
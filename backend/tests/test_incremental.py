@@ -0,0 +1,180 @@
+import os
+import zlib
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+from core.schemas import AllocationParams, QuotaRule
+from services.ai_engine import AIAllocationEngine
+from services.allocation import Allocator
+from services.ingest import company_from_row, student_from_row
+
+
+class HashingEngine(AIAllocationEngine):
+    """Bag-of-words hashing embeddings, so allocations run without the model; scored on the dense path"""
+
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        embeddings = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().replace(",", " ").replace("|", " ").split():
+                embeddings[row, zlib.crc32(word.encode()) % 64] += 1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms > 0, norms, 1.0)
+
+    def build_index(self, embeddings: np.ndarray):
+        return None
+
+
+def student(student_id: int, skills: str, **fields: Any) -> Dict[str, Any]:
+    return {"student_id": student_id, "first_name": f"S{student_id}", "last_name": "", "skills_text": skills, **fields}
+
+
+def company(company_id: int, skills: str, openings: int = 1) -> Dict[str, Any]:
+    return {
+        "company_id": company_id, "company_name": f"C{company_id}", "position_title": skills,
+        "req_skills_text": skills, "openings": openings,
+    }
+
+
+def sample_data(student_rows, company_rows):
+    students = [dict(student_from_row(row), student_id=i + 1) for i, row in enumerate(student_rows)]
+    companies = [dict(company_from_row(row), company_id=j + 1) for j, row in enumerate(company_rows)]
+    return students, companies
+
+
+def assignments(state) -> Dict[int, int]:
+    return {s["student_id"]: c["company_id"] for s, c, _ in state.matches()}
+
+
+def check_invariants(state, removed_student_ids=(), removed_company_ids=()):
+    """Capacities respected, removed rows hold nothing and every kept score is the pair's current score"""
+    counts: Dict[int, int] = {}
+    for s, c, score in state.matches():
+        assert s["student_id"] not in removed_student_ids
+        assert c["company_id"] not in removed_company_ids
+        counts[c["company_id"]] = counts.get(c["company_id"], 0) + 1
+        row, col = state.student_row[s["student_id"]], state.company_row[c["company_id"]]
+        expected = state.scorer.score(np.array([row]), np.array([col]))[0]
+        assert score == pytest.approx(float(expected), abs=1e-5)
+    for c in state.companies:
+        assert counts.get(c["company_id"], 0) <= (c.get("openings") or 1)
+
+
+def test_newcomer_displaces_weaker_holder_like_a_full_run():
+    params = AllocationParams(location_weight=0.0)
+    students = [student(1, "python sql"), student(2, "cooking baking")]
+    companies = [company(10, "python sql django"), company(11, "cooking baking pastry")]
+    allocator = Allocator(HashingEngine())
+    assert assignments(allocator.allocate(students, companies, params)) == {1: 10, 2: 11}
+
+    # A stronger match for position 10 arrives; student 1 falls back to the remaining position
+    newcomer = student(3, "python sql django")
+    changed = allocator.reallocate([newcomer], [], [], [])
+    assert sorted(changed) == [1, 3]
+    repaired = assignments(allocator.state)
+    check_invariants(allocator.state)
+
+    full = Allocator(HashingEngine()).allocate(students + [newcomer], companies, params)
+    assert repaired == assignments(full)
+
+
+def test_students_of_removed_position_move_to_free_seats():
+    params = AllocationParams(location_weight=0.0)
+    students = [student(1, "python sql"), student(2, "java spring")]
+    companies = [company(10, "python sql"), company(11, "java spring"), company(12, "python java", openings=2)]
+    allocator = Allocator(HashingEngine())
+    assert assignments(allocator.allocate(students, companies, params)) == {1: 10, 2: 11}
+
+    changed = allocator.reallocate([], [], [], [10])
+    assert changed == [1]
+    assert assignments(allocator.state) == {1: 12, 2: 11}
+    check_invariants(allocator.state, removed_company_ids={10})
+
+
+def test_new_position_is_offered_to_unassigned_students():
+    params = AllocationParams(location_weight=0.0)
+    students = [student(1, "python sql"), student(2, "python sql")]
+    allocator = Allocator(HashingEngine())
+    state = allocator.allocate(students, [company(10, "python sql")], params)
+    assert len(list(state.unallocated())) == 1
+
+    changed = allocator.reallocate([], [], [company(11, "python sql")], [])
+    assert len(changed) == 1
+    assert sorted(assignments(allocator.state).values()) == [10, 11]
+    # The candidate lists gained the new position too
+    student_ids, company_ids, _ = allocator.state.candidate_table()
+    assert all(11 in row for row in company_ids.tolist())
+    assert student_ids.tolist() == [1, 2]
+
+
+def test_repair_on_sample_data_keeps_invariants_and_unaffected_students(student_rows, company_rows):
+    students, companies = sample_data(student_rows, company_rows)
+    params = AllocationParams()
+    allocator = Allocator(HashingEngine())
+    before = assignments(allocator.allocate(students[:-3], companies, params))
+    assert before
+
+    removed_student = next(iter(before))
+    removed_company = before[next(sid for sid in before if sid != removed_student)]
+    changed = allocator.reallocate(students[-3:], [removed_student], [], [removed_company])
+    after = assignments(allocator.state)
+    check_invariants(allocator.state, {removed_student}, {removed_company})
+    assert removed_student not in after
+    # Students outside the changed set keep their positions
+    for sid, cid in before.items():
+        if sid not in changed and sid != removed_student:
+            assert after[sid] == cid
+    assert allocator.state.total_students == len(students) - 1
+    assert allocator.state.total_companies == len(companies) - 1
+
+
+def test_reallocation_needs_matching_repairable_params():
+    allocator = Allocator(HashingEngine())
+    assert not allocator.can_reallocate(AllocationParams(incremental=True))
+    allocator.allocate([student(1, "python")], [company(10, "python")], AllocationParams(location_weight=0.0))
+
+    assert allocator.can_reallocate(AllocationParams(location_weight=0.0, incremental=True))
+    assert not allocator.can_reallocate(AllocationParams(location_weight=0.5, incremental=True))
+    assert not allocator.can_reallocate(AllocationParams(algorithm="stable", incremental=True))
+    assert not allocator.can_reallocate(
+        AllocationParams(quotas=[QuotaRule(attribute="gender", category="Female", min_share=0.5)], incremental=True)
+    )
+    assert not allocator.can_reallocate(AllocationParams(rescorer="features", incremental=True))
+    allocator.reset()
+    assert not allocator.can_reallocate(AllocationParams(location_weight=0.0, incremental=True))
+
+
+def test_only_small_changes_are_repaired(student_rows, company_rows):
+    students, companies = sample_data(student_rows, company_rows)
+    allocator = Allocator(HashingEngine())
+    allocator.allocate(students, companies, AllocationParams())
+    assert allocator.is_small_change(1, 0)
+    assert not allocator.is_small_change(len(students) // 2, 0)
+
+    added, removed, added_companies, removed_companies = allocator.diff(
+        [s["student_id"] for s in students[1:]] + [9999], [c["company_id"] for c in companies]
+    )
+    assert (added, removed, added_companies, removed_companies) == ([9999], [1], [], [])
+
+
+def test_incremental_api_run_publishes_the_repair(client, cohort):
+    pytest.importorskip("faiss")
+    pytest.importorskip("sentence_transformers")
+    data = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+    for kind, filename in (("students", "students_profiles_with_city.csv"), ("companies", "company_positions.csv")):
+        with open(os.path.join(data, filename), "rb") as f:
+            assert client.post(f"{cohort}/upload/{kind}", files={"file": (filename, f, "text/csv")}).status_code == 200
+    full = client.post(f"{cohort}/allocate/", json={}).json()
+
+    late = {"first_name": "Late", "last_name": "Student", "skills_text": "Python, SQL", "state": "Karnataka"}
+    late_id = client.post(f"{cohort}/students/", json=late).json()["student_id"]
+    repaired = client.post(f"{cohort}/allocate/", json={"incremental": True}).json()
+    assert repaired["total_students"] == full["total_students"] + 1
+
+    published = client.get(f"{cohort}/allocate/").json()
+    placed = {a["student_id"]: a["company_id"] for a in published}
+    assert placed == {a["student_id"]: a["company_id"] for a in repaired["allocations"]}
+    assert len(placed) == len(repaired["allocations"])
+    if late_id not in placed:
+        assert late_id in {s["student_id"] for s in repaired["unallocated_students"]}
@@ -0,0 +1,44 @@
+import asyncio
+import os
+
+import httpx
+
+from services.profiling import PROFILE_SUFFIX, ProfilingMiddleware, list_profiles, prune_profiles
+
+
+async def hello(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def request(app, path: str = "/hello", headers=None):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get(path, headers=headers)
+    return asyncio.run(run())
+
+
+def test_prune_keeps_newest(tmp_path):
+    for i in range(5):
+        (tmp_path / f"2025010{i}T000000000000_GET_x{PROFILE_SUFFIX}").write_text("main 1\n")
+    prune_profiles(str(tmp_path), keep=2)
+    assert [p["name"][:9] for p in list_profiles(str(tmp_path))] == ["20250104T", "20250103T"]
+
+
+def test_profiles_are_capped_and_report_concurrency(tmp_path):
+    app = ProfilingMiddleware(hello, mode="all", directory=str(tmp_path), interval=0.001, keep=2)
+    names = [request(app).headers["x-profile-id"] for _ in range(3)]
+    assert sorted(os.listdir(tmp_path)) == sorted(names[1:])
+    assert request(app).headers["x-profile-concurrent"] == "0"
+
+
+def test_header_mode_only_profiles_opted_in_requests(tmp_path):
+    app = ProfilingMiddleware(hello, mode="header", directory=str(tmp_path), interval=0.001)
+    assert "x-profile-id" not in request(app).headers
+    assert "x-profile-id" in request(app, headers={"X-Profile": "1"}).headers
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_debug_routes_not_mounted_when_profiling_is_off(client):
+    assert client.get("/debug/profiles").status_code == 404
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from core.schemas import AllocationParams, QuotaRule
+from services.assignment import greedy_assign, quota_assign
+from services.ingest import company_from_row, student_from_row
+from services.quotas import QuotaBuckets, apportion
+
+
+def test_apportion_reserves_share_of_single_opening_positions():
+    capacity = np.ones(10, dtype=np.int64)
+    seats = apportion(0.3, capacity, np.ones(10, dtype=bool), capacity)
+    assert seats.sum() == 3
+    assert seats.max() == 1
+
+
+def test_apportion_gives_remaining_seats_to_largest_remainders():
+    capacity = np.array([3, 5, 2], dtype=np.int64)
+    # Exact shares 0.9, 1.5, 0.6: floors 0, 1, 0 plus ceil(3.0) - 1 = 2 by remainder
+    seats = apportion(0.3, capacity, np.ones(3, dtype=bool), capacity)
+    assert seats.tolist() == [1, 1, 1]
+
+
+def test_apportion_respects_headroom_left_by_earlier_rules():
+    capacity = np.ones(4, dtype=np.int64)
+    first = apportion(0.5, capacity, np.ones(4, dtype=bool), capacity)
+    second = apportion(0.5, capacity, np.ones(4, dtype=bool), capacity - first)
+    assert (first + second).tolist() == [1, 1, 1, 1]
+
+
+def test_rule_reserving_no_seats_is_rejected():
+    students = [{"caste": "SC"}]
+    companies = [{"company_id": 1}, {"company_id": 2}]
+    rule = QuotaRule(attribute="caste", category="SC", min_share=0.3, company_ids=[99])
+    with pytest.raises(ValueError, match="reserves no seats"):
+        QuotaBuckets([rule], students, companies, np.ones(2, dtype=np.int64))
+
+
+def test_thirty_percent_rule_places_category_on_uploaded_data(student_rows, company_rows):
+    students = [student_from_row(row) for row in student_rows]
+    companies = [company_from_row(row) for row in company_rows]
+    # Uploads always store one opening per position
+    capacity = np.array([c["openings"] for c in companies], dtype=np.int64)
+    assert (capacity == 1).all()
+    rule = QuotaRule(attribute="caste", category="SC", min_share=0.3)
+    quotas = QuotaBuckets([rule], students, companies, capacity)
+    assert quotas.reserved.sum() == 30
+
+    # Every pair scored, with members of the category always scoring lowest
+    student_idx, company_idx = [a.ravel() for a in np.indices((len(students), len(companies)))]
+    rng = np.random.default_rng(0)
+    members = quotas.groups[:, 0]
+    scores = (rng.random(len(student_idx)) + np.where(members[student_idx], 0.0, 1.0)).astype(np.float32)
+
+    plain, _ = greedy_assign(student_idx, company_idx, scores, capacity, len(students))
+    assert members[plain >= 0].sum() == 0
+
+    assignment, _ = quota_assign(
+        student_idx, company_idx, scores, capacity, len(students), quotas.groups, quotas.reserved, quotas.global_reserved
+    )
+    assert (assignment >= 0).sum() == capacity.sum()
+    assert members[assignment >= 0].sum() == 30
+    assert quotas.summary(assignment)[0]["allocated"] == 30
+
+
+def test_shares_add_up_per_attribute():
+    caste = QuotaRule(attribute="caste", category="SC", min_share=0.7)
+    gender = QuotaRule(attribute="gender", category="Female", min_share=0.5)
+    assert len(AllocationParams(quotas=[caste, gender]).quotas) == 2
+    with pytest.raises(ValueError, match="caste"):
+        AllocationParams(quotas=[caste, QuotaRule(attribute="caste", category="ST", min_share=0.4)])
+
+
+def test_reservations_on_different_attributes_overlap():
+    # A general man, a general woman, an SC man and an SC woman, in descending merit
+    students = [
+        {"caste": "General", "gender": "Male"}, {"caste": "General", "gender": "Female"},
+        {"caste": "SC", "gender": "Male"}, {"caste": "SC", "gender": "Female"},
+    ]
+    companies = [{"company_id": 1}, {"company_id": 2}]
+    capacity = np.ones(2, dtype=np.int64)
+    rules = [
+        QuotaRule(attribute="caste", category="SC", min_share=0.5),
+        QuotaRule(attribute="gender", category="Female", min_share=0.5),
+    ]
+    quotas = QuotaBuckets(rules, students, companies, capacity)
+    # Both rules reserve the first position's seat instead of splitting the seats between them
+    assert quotas.reserved.tolist() == [[1, 1], [0, 0]]
+
+    student_idx, company_idx = [a.ravel() for a in np.indices((4, 2))]
+    scores = (1.0 - 0.1 * student_idx - 0.01 * company_idx).astype(np.float32)
+    assignment, _ = quota_assign(
+        student_idx, company_idx, scores, capacity, 4, quotas.groups, quotas.reserved, quotas.global_reserved,
+        layers=quotas.layers,
+    )
+    # Only the SC woman holds both reservations of the shared seat
+    assert assignment.tolist() == [1, -1, -1, 0]
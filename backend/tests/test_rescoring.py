@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from core.schemas import AllocationParams
+from services.rescoring import Rescorer, rescore_shortlist, to_first_stage_range
+
+
+def test_second_stage_mapped_onto_each_students_first_stage_range():
+    student_idx = np.array([0, 0, 0, 1, 1, 2])
+    first = np.array([0.9, 0.8, 0.7, 0.3, 0.2, 0.5], dtype=np.float32)
+    second = np.array([1.0, 5.0, 3.0, 7.0, 7.0, 9.0], dtype=np.float32)
+    mapped = to_first_stage_range(student_idx, first, second)
+    assert np.allclose(mapped, [0.7, 0.9, 0.8, 0.3, 0.2, 0.5])
+
+
+def test_budget_cut_does_not_lift_rescored_students_over_the_rest():
+    # Four students with two candidates each, all competing for position 0
+    student_idx = np.repeat(np.arange(4), 2)
+    company_idx = np.tile([0, 1], 4)
+    scores = np.array([0.90, 0.10, 0.80, 0.79, 0.70, 0.69, 0.60, 0.20], dtype=np.float32)
+    params = AllocationParams(rescorer="features", rescore_weight=1.0, rescore_max_pairs=4)
+
+    # A second stage on its own, much larger scale that prefers position 1
+    def score(s, c):
+        return np.where(c == 1, 100.0, 50.0).astype(np.float32)
+
+    blended, summary = rescore_shortlist(score, student_idx, company_idx, scores, 4, 2, params)
+    assert summary["rescored_students"] == 2 and summary["budget_exhausted"]
+    # The closest calls (students 1 and 2) were re-scored and now prefer position 1...
+    assert blended[3] > blended[2] and blended[5] > blended[4]
+    # ...but stay within their own first-stage range, below student 0's untouched 0.9
+    for student in range(4):
+        pairs = student_idx == student
+        assert blended[pairs].max() <= scores[pairs].max() + 1e-6
+        assert blended[pairs].min() >= scores[pairs].min() - 1e-6
+    assert blended[0] == scores[0] and blended[6] == scores[6]
+
+
+def test_rescorer_without_bind_fails_at_construction():
+    class Unbound(Rescorer):
+        name = "unbound"
+
+    with pytest.raises(TypeError):
+        Unbound()
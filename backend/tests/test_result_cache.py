@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from services.result_cache import SingleFlightCache
+
+
+def cached(cache, key, value):
+    async def compute():
+        return value
+    return asyncio.run(cache.get_or_compute(key, compute))
+
+
+def test_evicts_least_recent_until_within_weight():
+    cache = SingleFlightCache(max_entries=10, max_weight=100, weigh=len)
+    cached(cache, "a", "x" * 60)
+    cached(cache, "b", "x" * 30)
+    cached(cache, "c", "x" * 30)
+    assert list(cache._entries) == ["b", "c"]
+    assert cache.weight == 60
+
+
+def test_oversized_result_is_returned_but_not_kept():
+    cache = SingleFlightCache(max_entries=10, max_weight=10, weigh=len)
+    cached(cache, "small", "x" * 5)
+    assert cached(cache, "big", "x" * 50) == "x" * 50
+    assert list(cache._entries) == ["small"]
+    assert cache.weight == 5
+
+
+def test_discard_releases_weight():
+    cache = SingleFlightCache(max_weight=100, weigh=len)
+    cached(cache, "a", "x" * 40)
+    cache.discard("a")
+    cache.discard("a")
+    assert cache.weight == 0
+
+
+def test_concurrent_identical_requests_compute_once():
+    cache = SingleFlightCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert len(calls) == 1
+
+
+def test_failures_are_not_cached():
+    cache = SingleFlightCache()
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute("key", fail))
+    assert cached(cache, "key", "ok") == "ok"
@@ -0,0 +1,179 @@
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.models import Base, Student, StudentSkill
+from services.search import (
+    STUDENT_SEARCH,
+    SearchIndex,
+    SearchIndexCache,
+    SkillIndexBackfill,
+    index_skills,
+    skill_backfill,
+)
+from services.versioning import Stamp
+
+
+def _scratch_sessions():
+    """Session factory over a database of its own, so the skill tables start empty"""
+    path = os.path.join(tempfile.mkdtemp(prefix="skillsync-backfill-"), "backfill.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_backfill_fills_empty_skill_tables_once():
+    sessions = _scratch_sessions()
+    db = sessions()
+    db.add_all([
+        Student(cohort_id="a", first_name="A", last_name="One", skills_text="Python, SQL"),
+        Student(cohort_id="b", first_name="B", last_name="Two", skills_text="Java"),
+    ])
+    db.commit()
+    db.close()
+
+    backfill = SkillIndexBackfill()
+    assert backfill.status == "pending"
+    backfill.run(sessions)
+    assert backfill.status == "done"
+
+    db = sessions()
+    try:
+        skills = sorted((row.cohort_id, row.skill) for row in db.query(StudentSkill))
+        assert [cohort for cohort, _ in skills] == ["a", "a", "b"]
+        # A second run finds the tables filled and leaves them alone
+        SkillIndexBackfill().run(sessions)
+        assert db.query(StudentSkill).count() == 3
+    finally:
+        db.close()
+
+
+def test_ready_reports_the_backfill(client):
+    deadline = time.time() + 10
+    while skill_backfill.status in ("pending", "running") and time.time() < deadline:
+        time.sleep(0.05)
+    response = client.get("/ready")
+    assert response.json()["search_index"] == "done"
+    assert response.status_code == 200
+
+    previous = skill_backfill.status
+    skill_backfill.status = "running"
+    try:
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["search_index"] == "running"
+        assert client.get("/health").status_code == 200
+    finally:
+        skill_backfill.status = previous
+
+
+def test_index_builds_of_different_cohorts_run_in_parallel(monkeypatch):
+    running = []
+    overlapped = threading.Event()
+    lock = threading.Lock()
+
+    def slow_build(db, target, cohort_id):
+        with lock:
+            running.append(cohort_id)
+            if len(running) > 1:
+                overlapped.set()
+        overlapped.wait(2)
+        with lock:
+            running.remove(cohort_id)
+        return SearchIndex(ids=np.empty(0, dtype=np.int64), skills={}, attributes={})
+
+    monkeypatch.setattr(SearchIndex, "build", staticmethod(slow_build))
+    cache = SearchIndexCache()
+    stamp: Stamp = (1, None)
+    threads = [
+        threading.Thread(target=cache.get, args=(None, STUDENT_SEARCH, cohort_id, stamp, stamp))
+        for cohort_id in ("a", "b")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlapped.is_set()
+
+
+def test_concurrent_searches_of_one_index_build_it_once(monkeypatch):
+    builds = []
+
+    def slow_build(db, target, cohort_id):
+        builds.append(cohort_id)
+        time.sleep(0.1)
+        return SearchIndex(ids=np.empty(0, dtype=np.int64), skills={}, attributes={})
+
+    monkeypatch.setattr(SearchIndex, "build", staticmethod(slow_build))
+    cache = SearchIndexCache()
+    stamp: Stamp = (1, None)
+    threads = [threading.Thread(target=cache.get, args=(None, STUDENT_SEARCH, "a", stamp, stamp)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert builds == ["a"]
+
+
+def test_appended_rows_extend_the_index_and_replacements_rebuild_it(monkeypatch):
+    sessions = _scratch_sessions()
+    db = sessions()
+    builds = []
+    build = SearchIndex.build.__func__
+    monkeypatch.setattr(SearchIndex, "build", classmethod(lambda cls, *args: builds.append(args[2]) or build(cls, *args)))
+
+    def add(first_name, skills):
+        student = Student(cohort_id="a", first_name=first_name, last_name="", skills_text=skills, state="Kerala")
+        db.add(student)
+        db.flush()
+        index_skills(db, STUDENT_SEARCH, "a", [(student.student_id, skills)])
+        db.commit()
+        return student.student_id
+
+    try:
+        first = add("A", "Python, SQL")
+        cache = SearchIndexCache()
+        index = cache.get(db, STUDENT_SEARCH, "a", (1, None), (0, None))
+        second, third = add("B", "Python"), add("C", "Java, SQL")
+
+        extended = cache.get(db, STUDENT_SEARCH, "a", (3, None), (0, None))
+        assert builds == ["a"]
+        assert extended.ids.tolist() == [first, second, third]
+        assert extended.search(["python"], "all", {}, None, 10)[0] == [first, second]
+        assert extended.search(["sql"], "all", {"state": "kerala"}, None, 10)[0] == [first, third]
+        # The earlier index is left as it was for searches still using it
+        assert index.ids.tolist() == [first]
+
+        assert cache.get(db, STUDENT_SEARCH, "a", (3, None), (1, None)).ids.tolist() == [first, second, third]
+        assert builds == ["a", "a"]
+    finally:
+        db.close()
+
+
+def test_search_api_filters_and_pages(client, cohort):
+    students = [
+        {"first_name": "A", "last_name": "One", "skills_text": "Python, SQL", "state": "Karnataka"},
+        {"first_name": "B", "last_name": "Two", "skills_text": "python", "state": "karnataka "},
+        {"first_name": "C", "last_name": "Three", "skills_text": "Java, SQL", "state": "Kerala"},
+    ]
+    ids = [client.post(f"{cohort}/students/", json=s).json()["student_id"] for s in students]
+
+    page = client.get(f"{cohort}/students/search", params={"skills": "Python,SQL"}).json()
+    assert [s["student_id"] for s in page["items"]] == ids[:1]
+    page = client.get(f"{cohort}/students/search", params={"skills": "python,sql", "match": "any"}).json()
+    assert page["total"] == 3
+    page = client.get(f"{cohort}/students/search", params={"state": "KARNATAKA", "limit": 1}).json()
+    assert [s["student_id"] for s in page["items"]] == ids[:1]
+    assert page["total"] == 2
+    page = client.get(f"{cohort}/students/search", params={"state": "Karnataka", "after": page["next_after"]}).json()
+    assert [s["student_id"] for s in page["items"]] == ids[1:2]
+    assert page["next_after"] is None
+
+    # A create shows up in the next search
+    client.post(f"{cohort}/students/", json={"first_name": "D", "last_name": "Four", "skills_text": "Python, SQL"})
+    assert client.get(f"{cohort}/students/search", params={"skills": "python,sql"}).json()["total"] == 2
@@ -0,0 +1,49 @@
+import pickle
+
+import numpy as np
+
+from core.schemas import AllocationParams
+from services.loader import Records, take
+from services.sharding import shard_tasks
+
+
+def cohort(n: int) -> Records:
+    return Records({
+        "student_id": np.arange(1, n + 1, dtype=np.int64),
+        "skills_text": [f"python sql skill{i}" for i in range(n)],
+        "state": ["Kerala" if i < 10 else "Goa" for i in range(n)],
+    })
+
+
+def test_take_copies_only_the_rows():
+    records = cohort(100)
+    rows = take(records, [3, 1])
+    assert isinstance(rows, Records)
+    assert [r["student_id"] for r in rows] == [4, 2]
+    assert rows[0]["skills_text"] == "python sql skill3"
+    assert take([{"a": 1}, {"a": 2}], [1]) == [{"a": 2}]
+
+
+def test_pickled_record_is_just_its_row():
+    records = cohort(100_000)
+    assert len(pickle.dumps(records[5])) < 200
+    assert pickle.loads(pickle.dumps(records[5])) == dict(records[5])
+
+
+def test_shard_task_size_does_not_grow_with_the_cohort():
+    def small_shard_bytes(n: int) -> int:
+        students = cohort(n)
+        companies = Records({"company_id": np.arange(1, 3, dtype=np.int64), "location_state": ["Kerala", "Goa"]})
+        tasks = shard_tasks(
+            students, companies,
+            np.array([s.lower() for s in students.column("state")], dtype=object),
+            np.array(["kerala", "goa"], dtype=object),
+            np.ones(2, dtype=bool), ("s", (n, 4), "<f4"), ("c", (2, 4), "<f4"), AllocationParams(),
+        )
+        (kerala,) = [task for task in tasks if task["companies"][0]["location_state"] == "Kerala"]
+        assert len(kerala["students"]) == 10
+        return len(pickle.dumps(kerala))
+
+    # The 10-student shard pickles to the same size whether the cohort has 1,000 or 100,000 students
+    assert small_shard_bytes(100_000) < 1.1 * small_shard_bytes(1_000)
+    assert small_shard_bytes(100_000) < 5_000
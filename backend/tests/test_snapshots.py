@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from services import snapshots
+from services.snapshots import Embeddings, SnapshotStore, snapshot_key
+
+faiss = pytest.importorskip("faiss")
+
+
+def embeddings(seed: int) -> Embeddings:
+    rng = np.random.default_rng(seed)
+    companies = rng.random((4, 8), dtype=np.float32)
+    index = faiss.IndexFlatIP(8)
+    index.add(companies)
+    return Embeddings(rng.random((3, 8), dtype=np.float32), companies, np.ones(4, dtype=bool), index)
+
+
+def test_snapshot_key_depends_on_model_and_texts():
+    key = snapshot_key("model", ["a", "b"], ["c"])
+    assert key == snapshot_key("model", ["a", "b"], ["c"])
+    assert key != snapshot_key("other", ["a", "b"], ["c"])
+    assert key != snapshot_key("model", ["ab"], ["c"])
+
+
+def test_get_or_build_builds_once_and_maps(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    built = []
+    source = embeddings(0)
+    mapped = store.get_or_build("k1", lambda: built.append(1) or source)
+    assert built == [1]
+    assert np.array_equal(mapped.students, source.students)
+    assert SnapshotStore(str(tmp_path)).get_or_build("k1", lambda: pytest.fail("rebuilt")).key == "k1"
+
+
+def test_prune_keeps_newest(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=1)
+    for i in range(4):
+        store.publish(f"k{i}", embeddings(i))
+        os.utime(tmp_path / f"k{i}", (i, i))
+    store.prune("k3")
+    assert sorted(name for name in os.listdir(tmp_path) if not name.startswith(".")) == ["k2", "k3"]
+
+
+def test_prune_waits_for_load_in_progress(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path), keep=0)
+    store.publish("old", embeddings(0))
+    loading = threading.Event()
+    original_load = np.load
+
+    def slow_load(*args, **kwargs):
+        loading.set()
+        time.sleep(0.2)
+        return original_load(*args, **kwargs)
+
+    monkeypatch.setattr(snapshots.np, "load", slow_load)
+    result = {}
+    reader = threading.Thread(target=lambda: result.setdefault("embeddings", store.load("old")))
+    reader.start()
+    loading.wait()
+    store.prune("new")
+    reader.join()
+    assert result["embeddings"] is not None
+    assert not os.path.exists(tmp_path / "old")
+    assert store.load("old") is None